@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the SKU API.
+
+For each catalog size, the suite seeds a database (seed_catalog.py), then
+drives the app in two ways:
+- in-process, through httpx's ASGI transport (no network or server
+  overhead, so it isolates the app)
+- as a uvicorn subprocess over HTTP (what a client sees)
+
+Each scenario runs on its own with a fixed number of concurrent clients:
+get, search, create, duplicates, export and ocr. The suite reports
+throughput and p50/p95/p99 latency for each. Results are written as one
+JSON file per run, with the git commit and environment, so runs can be
+compared over time.
+
+SQLite databases live in --data-dir, one file per size, and are reused
+by later runs (seeding 1M rows takes a while); rows added by the create
+scenario are deleted first. With --database-url pointing at PostgreSQL, the tables are
+emptied and reseeded for each size. The OCR scenario needs the tesseract
+binary and is skipped without it.
+
+Usage (from backend/):
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_suite.py --sizes 10000,100000 --label baseline
+    python benchmarks/bench_suite.py --sizes 1000000 --modes uvicorn --workers 4
+    python benchmarks/bench_suite.py --database-url postgresql://localhost/sku_bench --sizes 100000
+    python benchmarks/bench_suite.py compare results/a.json results/b.json
+
+The "seed" and "drive" subcommands are run by the suite in subprocesses.
+models.py binds DATABASE_URL at import, so every size gets a fresh
+interpreter.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from load_benchmark import SEARCH_TERMS, percentile
+
+# Requests and concurrent clients per scenario, before --scale
+SCENARIOS = {
+    "get": (2000, 32),
+    "search": (1000, 16),
+    "create": (500, 8),
+    "duplicates": (20, 2),
+    "export": (5, 1),
+    "ocr": (20, 4),
+}
+SIZES = (10_000, 100_000, 1_000_000)
+MODES = ("asgi", "uvicorn")
+
+STEMS = ["Lisino", "Atorva", "Amoxi", "Fluco", "Metopr", "Losar", "Adali", "Simva", "Metfor", "Omepra"]
+SUFFIXES = ["pril", "statin", "cillin", "azole", "olol", "sartan", "mab", "min", "zole"]
+FORMS = ["tablet", "capsule", "solution", "injection"]
+MANUFACTURERS = ["Pfizer", "Teva", "Merck", "Novartis", "Roche", "Sandoz", "Mylan", "Lupin", "Cipla", "Apotex"]
+
+
+# --- seeding (runs in a subprocess with DATABASE_URL set) ---
+
+def seed(count):
+    from sqlalchemy import delete, func, select, text
+
+    from models import DrugSKU, engine, init_db
+    from seed_catalog import generate_catalog, load_catalog
+
+    init_db()
+    with engine.begin() as conn:
+        existing = conn.scalar(select(func.count()).select_from(DrugSKU).where(DrugSKU.id <= count))
+        if existing == count:
+            # Reuse the catalog, dropping what earlier create scenarios added
+            conn.execute(delete(DrugSKU).where(DrugSKU.id > count))
+            return {"seeded": 0, "rows": count, "seconds": 0.0}
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("TRUNCATE drug_skus, sku_changes RESTART IDENTITY"))
+        else:
+            conn.execute(text("DELETE FROM drug_skus"))
+            conn.execute(text("DELETE FROM sku_changes"))
+            conn.execute(text("DELETE FROM sqlite_sequence WHERE name IN ('drug_skus', 'sku_changes')"))
+    report = load_catalog(engine, generate_catalog(count, seed=24))
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return {"seeded": report["inserted"], "rows": count, "seconds": round(time.perf_counter() - started, 1)}
+
+
+# --- driving (runs in a subprocess, in-process app or against a URL) ---
+
+def label_images(count, seed=24):
+    """PNG drug labels with distinct text, so the OCR cache never answers"""
+    import io
+
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    images = []
+    for i in range(count):
+        image = Image.new("L", (900, 300), 255)
+        draw = ImageDraw.Draw(image)
+        lines = [
+            f"NDC {rng.randrange(10 ** 5):05d}-{rng.randrange(1000):03d}-{rng.randrange(100):02d}",
+            f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {rng.randint(1, 500)} mg {rng.choice(FORMS)}s",
+            f"{rng.choice([30, 60, 90, 100])} count  {rng.choice(MANUFACTURERS)}",
+        ]
+        for row, line in enumerate(lines):
+            draw.text((30, 40 + row * 80), line, fill=0)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        images.append(buffer.getvalue())
+    return images
+
+
+class Context:
+    def __init__(self, rows, run_id):
+        self.rows = rows
+        self.run_id = run_id
+        self.created = 0
+        self.images = []
+
+
+async def do_get(client, ctx, rng):
+    response = await client.get(f"/api/skus/{rng.randint(1, ctx.rows)}")
+    return response.status_code, len(response.content)
+
+
+async def do_search(client, ctx, rng):
+    response = await client.get("/api/skus", params={"name": rng.choice(SEARCH_TERMS), "pageSize": 50})
+    return response.status_code, len(response.content)
+
+
+async def do_create(client, ctx, rng):
+    ctx.created += 1
+    strength = f"{rng.randint(1, 500)}mg"
+    response = await client.post("/api/skus", json={
+        "ndc": f"B{ctx.run_id}-{ctx.created:06d}",
+        "name": f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {strength}",
+        "manufacturer": rng.choice(MANUFACTURERS),
+        "dosage_form": rng.choice(FORMS),
+        "strength": strength,
+        "package_size": "30 units",
+        "status": "DRAFT",
+    })
+    return response.status_code, len(response.content)
+
+
+async def do_duplicates(client, ctx, rng):
+    response = await client.get("/api/skus/duplicates", params={"pageSize": 20, "page": rng.randrange(5)})
+    return response.status_code, len(response.content)
+
+
+async def do_export(client, ctx, rng):
+    size = 0
+    async with client.stream("GET", "/api/skus/export", params={"format": "ndjson"}) as response:
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+    return response.status_code, size
+
+
+async def do_ocr(client, ctx, rng):
+    image = ctx.images.pop() if ctx.images else label_images(1, rng.random())[0]
+    response = await client.post("/api/extract-ocr", files={"file": ("label.png", image, "image/png")})
+    return response.status_code, len(response.content)
+
+
+REQUESTS = {
+    "get": do_get,
+    "search": do_search,
+    "create": do_create,
+    "duplicates": do_duplicates,
+    "export": do_export,
+    "ocr": do_ocr,
+}
+
+
+async def run_scenario(client, name, requests, concurrency, ctx, seed=24):
+    """Closed loop: ``concurrency`` clients send ``requests`` requests in total"""
+    request = REQUESTS[name]
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    transferred = 0
+    remaining = requests
+
+    # One untimed request warms connections, caches of compiled SQL and the OCR pool
+    await request(client, ctx, rng)
+
+    async def worker():
+        nonlocal remaining, errors, transferred
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status, size = await request(client, ctx, rng)
+                transferred += size
+                if status >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "bytes_per_request": round(transferred / len(latencies)) if latencies else 0,
+    }
+
+
+def scenario_plan(names, scale):
+    return {
+        name: (max(1, int(SCENARIOS[name][0] * scale)), SCENARIOS[name][1])
+        for name in names
+    }
+
+
+async def drive(url, rows, names, scale):
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=600)
+        app_module = None
+    else:
+        import main as app_module
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench", timeout=600,
+        )
+
+    ctx = Context(rows, run_id=f"{os.getpid() % 10000:04d}{int(time.time()) % 100000:05d}")
+    results = {}
+    try:
+        async with client:
+            for name, (requests, concurrency) in scenario_plan(names, scale).items():
+                if name == "ocr":
+                    if not shutil.which("tesseract"):
+                        results[name] = {"skipped": "tesseract not installed"}
+                        continue
+                    ctx.images = label_images(requests + 1)
+                results[name] = await run_scenario(client, name, requests, concurrency, ctx)
+                print(f"  {name:<11}{results[name]['throughput_rps']:>9} req/s  "
+                      f"p50 {results[name]['p50_ms']} ms  p99 {results[name]['p99_ms']} ms", file=sys.stderr)
+    finally:
+        if app_module is not None:
+            app_module.ocr_pool.shutdown()
+            # Pooled aiosqlite connections each hold a non-daemon thread
+            await app_module.async_engine.dispose()
+            app_module.engine.dispose()
+    return results
+
+
+# --- orchestration ---
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def subprocess_json(args, env):
+    """Run this script with ``args``; its last stdout line is the JSON result"""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, check=True, text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def start_uvicorn(env, workers):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 300
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            if httpx.get(f"{url}/api/cache/stats", timeout=1).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 300 s")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def database_url(args, size):
+    if args.database_url:
+        return args.database_url
+    return f"sqlite:///{os.path.join(os.path.abspath(args.data_dir), f'bench-{size}.db')}"
+
+
+def run_suite(args):
+    names = [name.strip() for name in args.scenarios.split(",")]
+    sizes = [int(size) for size in args.sizes.split(",")]
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    report = {
+        "label": args.label,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": "postgresql" if args.database_url else "sqlite",
+        "workers": args.workers,
+        "cache": args.cache,
+        "scale": args.scale,
+        "plan": scenario_plan(names, args.scale),
+        "runs": [],
+    }
+    for size in sizes:
+        env = {
+            **os.environ,
+            "DATABASE_URL": database_url(args, size),
+            "SKU_CACHE_BACKEND": args.cache,
+            # Pool sizing reads it, and the memory cache refuses several workers
+            "WEB_CONCURRENCY": str(args.workers),
+            # The suggest index is not benchmarked here; skip building it at startup
+            "SUGGEST_INDEX_ENABLED": "0",
+            "LOG_LEVEL": "WARNING",
+        }
+        print(f"Seeding {size} SKUs", file=sys.stderr)
+        seeded = subprocess_json(["seed", "--count", str(size)], env)
+        for mode in modes:
+            print(f"{size} SKUs, {mode}", file=sys.stderr)
+            drive_args = ["drive", "--rows", str(size), "--scenarios", ",".join(names), "--scale", str(args.scale)]
+            if mode == "uvicorn":
+                server, url = start_uvicorn(env, args.workers)
+                try:
+                    results = subprocess_json([*drive_args, "--url", url], env)
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+            else:
+                results = subprocess_json(drive_args, env)
+            report["runs"].append({"size": size, "mode": mode, "seed": seeded, "scenarios": results})
+
+    output = args.output or os.path.join(
+        BENCH_DIR, "results", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{args.label}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\nSaved results to {output}")
+
+
+def print_report(report):
+    print(f"\n{report['label']} @ {report['commit']} ({report['database']}, {report['started_at']})")
+    print(f"{'size':>9} {'mode':<8}{'scenario':<12}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for run in report["runs"]:
+        for name, stats in run["scenarios"].items():
+            if "skipped" in stats:
+                print(f"{run['size']:>9} {run['mode']:<8}{name:<12}  skipped: {stats['skipped']}")
+                continue
+            print(f"{run['size']:>9} {run['mode']:<8}{name:<12}{stats['throughput_rps']:>9}"
+                  f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['errors']:>8}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def index(report):
+        return {
+            (run["size"], run["mode"], name): stats
+            for run in report["runs"] for name, stats in run["scenarios"].items() if "skipped" not in stats
+        }
+
+    old, new = index(before), index(after)
+    print(f"{before['label']} @ {before['commit']}  vs  {after['label']} @ {after['commit']}")
+    print(f"{'size':>9} {'mode':<8}{'scenario':<12}{'metric':<8}{'before':>10}{'after':>10}{'change':>9}")
+    for key in sorted(set(old) & set(new)):
+        for metric in ("throughput_rps", "p50_ms", "p99_ms"):
+            a, b = old[key][metric], new[key][metric]
+            change = f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+            print(f"{key[0]:>9} {key[1]:<8}{key[2]:<12}{metric.split('_')[0]:<8}{a:>10}{b:>10}{change:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite for the SKU API")
+    sub = parser.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="Seed, drive and save results (default)")
+    compare_parser = sub.add_parser("compare", help="Compare two saved result files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    seed_parser = sub.add_parser("seed")
+    seed_parser.add_argument("--count", type=int, required=True)
+    drive_parser = sub.add_parser("drive")
+    drive_parser.add_argument("--url")
+    drive_parser.add_argument("--rows", type=int, required=True)
+    drive_parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    drive_parser.add_argument("--scale", type=float, default=1.0)
+
+    for target in (parser, run):
+        target.add_argument("--sizes", default=",".join(str(size) for size in SIZES))
+        target.add_argument("--modes", default=",".join(MODES))
+        target.add_argument("--scenarios", default=",".join(SCENARIOS))
+        target.add_argument("--scale", type=float, default=1.0, help="Multiply every scenario's request count")
+        target.add_argument("--database-url", help="PostgreSQL URL to seed and use (default: SQLite files)")
+        target.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "sku-bench"),
+                            help="Where SQLite catalogs are kept between runs")
+        target.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+        target.add_argument("--cache", default="none", help="SKU_CACHE_BACKEND for the app (default: none)")
+        target.add_argument("--label", default="run")
+        target.add_argument("--output", help="Result file (default: benchmarks/results/<time>-<label>.json)")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        print(json.dumps(seed(args.count)))
+    elif args.command == "drive":
+        names = [name.strip() for name in args.scenarios.split(",")]
+        print(json.dumps(asyncio.run(drive(args.url, args.rows, names, args.scale))))
+    elif args.command == "compare":
+        compare(args.before, args.after)
+    else:
+        run_suite(args)
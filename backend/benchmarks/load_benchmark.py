@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Concurrent load benchmark for the SKU API.
+
+Fires a mixed workload (mostly GET /api/skus/{id}, plus substring searches
+and duplicate scans) at the API with a fixed number of concurrent clients
+and reports p50/p95/p99 latency per endpoint. Because a blocking query
+stalls every request sharing the event loop, the fast GETs' tail latency
+is the number to watch when comparing the sync and async database layers.
+
+Usage (from backend/):
+    # in-process, against DATABASE_URL, seeding 20k synthetic rows first
+    python benchmarks/load_benchmark.py --seed 20000 --label after --output after.json
+
+    # against a running server, e.g. one started from an older checkout
+    python benchmarks/load_benchmark.py --url http://localhost:5000 --label before --output before.json
+
+    # side-by-side table of two runs
+    python benchmarks/load_benchmark.py --compare before.json after.json
+
+Requires httpx (pip install -r benchmarks/requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from statistics import quantiles
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEARCH_TERMS = ["pril", "statin", "cillin", "azole", "olol", "sartan", "mab"]
+
+
+def percentile(samples, pct):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def seed_catalog(count):
+    """Insert count synthetic SKUs through the sync engine"""
+    from models import DrugSKU, SessionLocal, init_db
+
+    init_db()
+    stems = ["Lisino", "Atorva", "Amoxi", "Fluco", "Metopr", "Losar", "Adali"]
+    suffixes = ["pril", "statin", "cillin", "azole", "olol", "sartan", "mab"]
+    rows = [
+        {
+            "ndc": f"BENCH-{i:07d}",
+            "name": f"{random.choice(stems)}{random.choice(suffixes)} {random.randint(1, 500)}mg",
+            "manufacturer": random.choice(["Pfizer", "Teva", "Merck", "Novartis", "Roche"]),
+            "dosage_form": random.choice(["tablet", "capsule", "solution"]),
+            "strength": f"{random.randint(1, 500)}mg",
+            "package_size": f"{random.choice([30, 60, 90, 100])} units",
+            "status": random.choice(["DRAFT", "PENDING_REVIEW", "APPROVED"]),
+        }
+        for i in range(count)
+    ]
+    with SessionLocal() as db:
+        db.query(DrugSKU).filter(DrugSKU.ndc.like("BENCH-%")).delete(synchronize_session=False)
+        db.bulk_insert_mappings(DrugSKU, rows)
+        db.commit()
+    print(f"Seeded {count} synthetic SKUs")
+
+
+def make_client(url):
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=60)
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+
+async def pick_ids(client, limit=200):
+    response = await client.get("/api/skus", params={"pageSize": limit})
+    response.raise_for_status()
+    return [item["id"] for item in response.json()["items"]] or [1]
+
+
+def next_request(ids, mix):
+    roll = random.random()
+    if roll < mix["search"]:
+        return "search", "/api/skus", {"name": random.choice(SEARCH_TERMS), "pageSize": 50}
+    if roll < mix["search"] + mix["duplicates"]:
+        return "duplicates", "/api/skus/duplicates", {"pageSize": 20}
+    return "get", f"/api/skus/{random.choice(ids)}", None
+
+
+async def run_load(client, total, concurrency, mix):
+    ids = await pick_ids(client)
+    samples = {}
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            endpoint, path, params = next_request(ids, mix)
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            samples.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return samples, errors, elapsed
+
+
+def summarize(samples, errors, elapsed, args):
+    endpoints = {}
+    for endpoint, latencies in sorted(samples.items()):
+        endpoints[endpoint] = {
+            "count": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+        }
+    return {
+        "label": args.label,
+        "target": args.url or "in-process",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 1) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report):
+    print(f"\n{report['label']} ({report['target']}): {report['requests']} requests, "
+          f"concurrency {report['concurrency']}, {report['throughput_rps']} req/s, "
+          f"{report['errors']} errors")
+    print(f"{'endpoint':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<12}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{'endpoint':<12}{'metric':>8}{before['label']:>12}{after['label']:>12}{'change':>10}")
+    for endpoint in sorted(set(before["endpoints"]) | set(after["endpoints"])):
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            old = before["endpoints"].get(endpoint, {}).get(metric)
+            new = after["endpoints"].get(endpoint, {}).get(metric)
+            change = f"{(new - old) / old * 100:+.0f}%" if old and new is not None else "n/a"
+            print(f"{endpoint:<12}{metric[:3]:>8}{str(old):>12}{str(new):>12}{change:>10}")
+    print(f"{'throughput':<12}{'rps':>8}{before['throughput_rps']:>12}{after['throughput_rps']:>12}")
+
+
+async def main(args):
+    if args.seed:
+        seed_catalog(args.seed)
+    mix = {"search": args.search_ratio, "duplicates": args.duplicates_ratio}
+    async with make_client(args.url) as client:
+        samples, errors, elapsed = await run_load(client, args.requests, args.concurrency, mix)
+    report = summarize(samples, errors, elapsed, args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark for the SKU API")
+    parser.add_argument("--url", help="Base URL of a running server (default: drive the app in-process)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--search-ratio", type=float, default=0.2)
+    parser.add_argument("--duplicates-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic SKUs first")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two saved JSON reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        asyncio.run(main(args))
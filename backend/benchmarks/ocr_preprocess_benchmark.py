@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compare OCR latency and field-extraction accuracy with and without the
+preprocessing stage (see ocr_preprocess.py).
+
+Every image in a folder is run through the OCR pipeline once per
+configuration, sequentially and in-process, so timings are per image on one
+core. Accuracy needs a ground-truth file mapping image file names to the
+expected fields, e.g.:
+
+    {"lipitor.jpg": {"ndc": "0071-0155-23", "strength": "20 mg", "manufacturer": "Pfizer"}}
+
+Only the fields listed for an image are scored; comparison ignores case and
+whitespace. Without ground truth, the share of non-empty fields is reported.
+
+Usage (from backend/, requires the tesseract binary):
+    python benchmarks/ocr_preprocess_benchmark.py --images ./samples --truth ./samples/truth.json
+    python benchmarks/ocr_preprocess_benchmark.py --images ./samples --crop --output ocr.json
+"""
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict, replace
+from statistics import mean, median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr import IMAGE_EXTENSIONS, run_ocr
+from ocr_preprocess import PreprocessConfig
+
+
+def normalize(value):
+    return "".join(str(value or "").split()).lower()
+
+
+def score(sku_data, expected):
+    """(matched, checked) field counts for one image"""
+    if expected:
+        matched = sum(1 for field, value in expected.items() if normalize(sku_data.get(field)) == normalize(value))
+        return matched, len(expected)
+    filled = sum(1 for value in sku_data.values() if value and value.strip())
+    return filled, len(sku_data)
+
+
+def benchmark(images, truth, config):
+    per_image = []
+    matched_total = checked_total = 0
+    for path in images:
+        with open(path, "rb") as f:
+            contents = f.read()
+        name = os.path.basename(path)
+        try:
+            result = run_ocr(contents, config)
+        except Exception as e:
+            per_image.append({"image": name, "error": str(e)})
+            continue
+        if truth and name not in truth:
+            matched, checked = 0, 0
+        else:
+            matched, checked = score(result["sku_data"], truth.get(name))
+        matched_total += matched
+        checked_total += checked
+        timings = result["timings"]
+        per_image.append({
+            "image": name,
+            "total_ms": round(sum(timings.values()), 2),
+            **timings,
+            "matched": matched,
+            "checked": checked,
+        })
+
+    totals = [row["total_ms"] for row in per_image if "total_ms" in row]
+    return {
+        "config": asdict(config),
+        "images": len(images),
+        "errors": sum(1 for row in per_image if "error" in row),
+        "mean_ms": round(mean(totals), 2) if totals else None,
+        "median_ms": round(median(totals), 2) if totals else None,
+        "max_ms": round(max(totals), 2) if totals else None,
+        "accuracy": round(matched_total / checked_total, 4) if checked_total else None,
+        "scored_against": "ground truth" if truth else "non-empty fields",
+        "per_image": per_image,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR preprocessing")
+    parser.add_argument("--images", required=True, help="Folder of sample label images")
+    parser.add_argument("--truth", help="JSON file of expected fields per image file name")
+    parser.add_argument("--crop", action="store_true", help="Also crop to the detected label region")
+    parser.add_argument("--no-deskew", action="store_true")
+    parser.add_argument("--max-side", type=int, default=PreprocessConfig.max_side)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    images = sorted(
+        os.path.join(args.images, name)
+        for name in os.listdir(args.images)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    if not images:
+        sys.exit(f"No images found in {args.images}")
+
+    truth = {}
+    if args.truth:
+        with open(args.truth) as f:
+            truth = json.load(f)
+
+    preprocessed = replace(
+        PreprocessConfig(), crop=args.crop, deskew=not args.no_deskew, max_side=args.max_side
+    )
+    configs = {"raw": PreprocessConfig(enabled=False), "preprocessed": preprocessed}
+
+    reports = {}
+    for label, config in configs.items():
+        print(f"Running {label} over {len(images)} images...")
+        reports[label] = benchmark(images, truth, config)
+
+    print(f"\n{'config':<14}{'mean ms':>10}{'median ms':>11}{'max ms':>10}{'accuracy':>10}{'errors':>8}")
+    for label, report in reports.items():
+        accuracy = f"{report['accuracy']:.1%}" if report["accuracy"] is not None else "n/a"
+        print(f"{label:<14}{str(report['mean_ms']):>10}{str(report['median_ms']):>11}"
+              f"{str(report['max_ms']):>10}{accuracy:>10}{report['errors']:>8}")
+    print(f"(accuracy scored against {reports['raw']['scored_against']})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
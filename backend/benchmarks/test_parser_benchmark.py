@@ -0,0 +1,180 @@
+"""
+Benchmarks for the OCR text parser (sku_text_parser.py).
+
+Compares the compiled parser with the original per-field implementation,
+kept below as legacy_parse, over a synthetic corpus of OCR output: short
+clean labels, long noisy scans, text with very long uppercase runs (the
+original name heuristic's quadratic case) and a dictionary of thousands of
+manufacturers. The equivalence test checks both parsers agree on every text.
+
+Usage (from backend/):
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks/test_parser_benchmark.py
+"""
+import os
+import random
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sku_text_parser import DOSAGE_FORMS, MANUFACTURERS, SKUTextParser
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAVE_BENCHMARK = True
+except ImportError:
+    HAVE_BENCHMARK = False
+
+needs_benchmark = pytest.mark.skipif(not HAVE_BENCHMARK, reason="pytest-benchmark is not installed")
+
+
+def legacy_parse(text, dosage_forms=DOSAGE_FORMS, manufacturers=MANUFACTURERS):
+    """The parser as it was before sku_text_parser.py, with the lists as arguments"""
+    sku_data = {
+        "ndc": "",
+        "name": "",
+        "manufacturer": "",
+        "dosage_form": "",
+        "strength": "",
+        "package_size": ""
+    }
+    text_upper = text.upper()
+
+    ndc_match = re.search(r'\b\d{4,5}-\d{2,4}-\d{1,2}\b', text)
+    if ndc_match:
+        sku_data["ndc"] = ndc_match.group()
+
+    for form in dosage_forms:
+        if form in text_upper:
+            sku_data["dosage_form"] = form.lower()
+            break
+
+    strength_match = re.search(r'\b\d+\.?\d*\s?(mg|mcg|g|ml|%)\b', text, re.IGNORECASE)
+    if strength_match:
+        sku_data["strength"] = strength_match.group()
+
+    for mfg in manufacturers:
+        if mfg in text_upper:
+            sku_data["manufacturer"] = mfg.title()
+            break
+
+    words = text.split()
+    potential_names = []
+    for i, word in enumerate(words):
+        if word.isupper() and len(word) > 3:
+            name_parts = [word]
+            j = i + 1
+            while j < len(words) and (words[j].isupper() or words[j].isdigit()):
+                name_parts.append(words[j])
+                j += 1
+            if len(name_parts) >= 2:
+                potential_names.append(" ".join(name_parts))
+
+    if potential_names:
+        sku_data["name"] = max(potential_names, key=len)
+
+    return sku_data
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+DRUG_STEMS = ["LISINOPRIL", "ATORVASTATIN", "AMOXICILLIN", "METFORMIN", "OMEPRAZOLE", "Sertraline", "ibuprofen"]
+FILLER = ["Rx", "only", "Store", "at", "20", "to", "25C", "Keep", "out", "of", "reach", "children", "Lot", "EXP",
+          "Each", "contains", "USP", "Dispense", "in", "tight", "container", "See", "package", "insert"]
+
+
+def make_label(rng, manufacturers):
+    ndc = f"{rng.randint(1000, 99999)}-{rng.randint(10, 9999)}-{rng.randint(1, 99)}"
+    lines = [
+        " ".join([rng.choice(DRUG_STEMS).upper(), "TABLETS", "USP", str(rng.choice([5, 10, 20, 40]))]),
+        f"NDC {ndc}",
+        f"{rng.choice([5, 10, 20, 250, 500])} {rng.choice(['mg', 'mcg', 'ml'])} per {rng.choice(DOSAGE_FORMS).lower()}",
+        f"Manufactured by {rng.choice(manufacturers).title()} Inc",
+    ]
+    return "\n".join(lines)
+
+
+def make_noisy_scan(rng, manufacturers, words=400):
+    tokens = [rng.choice(FILLER) for _ in range(words)]
+    for _ in range(words // 20):
+        tokens.insert(rng.randrange(len(tokens)), rng.choice(DRUG_STEMS + list(DOSAGE_FORMS) + list(manufacturers)))
+    tokens.insert(rng.randrange(len(tokens)), f"{rng.randint(1000, 99999)}-{rng.randint(10, 999)}-{rng.randint(1, 9)}")
+    return " ".join(tokens)
+
+
+def make_uppercase_run(rng, words=2000):
+    """Worst case for the original name heuristic: one huge uppercase run"""
+    return " ".join(rng.choice(["WARNING", "DO", "NOT", "EXCEED", "DOSE", "12", "TABLETS", "DAILY"]) for _ in range(words))
+
+
+def make_manufacturers(count, rng):
+    syllables = ["AL", "BRO", "CEN", "DAX", "EVO", "FAR", "GEN", "HEL", "IRA", "JUN", "KEM", "LOR", "MED", "NOV"]
+    names = set(MANUFACTURERS)
+    while len(names) < count:
+        names.add("".join(rng.choice(syllables) for _ in range(3)) + rng.choice(["", " PHARMA", " LABS"]))
+    return sorted(names)
+
+
+RNG = random.Random(20240501)
+BIG_MANUFACTURERS = make_manufacturers(5000, RNG)
+
+CORPORA = {
+    "labels": [make_label(RNG, MANUFACTURERS) for _ in range(200)],
+    "noisy_scans": [make_noisy_scan(RNG, MANUFACTURERS) for _ in range(50)],
+    "uppercase_runs": [make_uppercase_run(RNG) for _ in range(5)],
+}
+BIG_DICTIONARY_CORPUS = [make_noisy_scan(RNG, BIG_MANUFACTURERS) for _ in range(50)]
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+def test_matches_legacy_parser(corpus):
+    parser = SKUTextParser()
+    for text in CORPORA[corpus]:
+        assert parser.parse(text) == legacy_parse(text)
+
+
+def test_matches_legacy_parser_with_large_dictionary():
+    parser = SKUTextParser(manufacturers=BIG_MANUFACTURERS)
+    for text in BIG_DICTIONARY_CORPUS:
+        assert parser.parse(text) == legacy_parse(text, manufacturers=BIG_MANUFACTURERS)
+
+
+def _parse_all(parse, texts):
+    for text in texts:
+        parse(text)
+
+
+@needs_benchmark
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+def test_compiled_parser(benchmark, corpus):
+    benchmark.group = corpus
+    benchmark(_parse_all, SKUTextParser().parse, CORPORA[corpus])
+
+
+@needs_benchmark
+@pytest.mark.parametrize("corpus", sorted(CORPORA))
+def test_legacy_parser(benchmark, corpus):
+    benchmark.group = corpus
+    benchmark(_parse_all, legacy_parse, CORPORA[corpus])
+
+
+@needs_benchmark
+def test_compiled_parser_large_dictionary(benchmark):
+    benchmark.group = "5000_manufacturers"
+    parser = SKUTextParser(manufacturers=BIG_MANUFACTURERS)
+    benchmark(_parse_all, parser.parse, BIG_DICTIONARY_CORPUS)
+
+
+@needs_benchmark
+def test_legacy_parser_large_dictionary(benchmark):
+    benchmark.group = "5000_manufacturers"
+    benchmark(_parse_all, lambda text: legacy_parse(text, manufacturers=BIG_MANUFACTURERS), BIG_DICTIONARY_CORPUS)
@@ -0,0 +1,154 @@
+"""
+Benchmarks for search response serialization (fast_json.py).
+
+Compares GET /api/skus as it is now with the previous path. The current
+route selects column tuples and encodes them with orjson. The previous
+route loaded ORM objects and returned SKUSearchResponse(items=skus), so
+every row was validated through SKUResponse; it is kept below as
+legacy_app. Both run in-process against the same seeded SQLite database.
+The encode-only benchmarks leave out the query and HTTP overhead to show
+where the time goes. The equivalence test checks both paths produce the
+same items.
+
+Usage (from backend/):
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks/test_serialization_benchmark.py
+"""
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads DATABASE_URL on import
+_db_dir = tempfile.mkdtemp(prefix="sku-serialization-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("SKU_CACHE_BACKEND", "none")
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import main
+from fast_json import SKU_RESPONSE_COLUMNS, encode_json, sku_items
+from main import SKUSearchResponse, get_async_db
+from models import DrugSKU, SessionLocal, engine
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAVE_BENCHMARK = True
+except ImportError:
+    HAVE_BENCHMARK = False
+
+needs_benchmark = pytest.mark.skipif(not HAVE_BENCHMARK, reason="pytest-benchmark is not installed")
+
+CATALOG_ROWS = 5000
+PAGE_SIZES = [50, 500]
+
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/api/skus", response_model=SKUSearchResponse)
+async def legacy_search(page: int = 0, pageSize: int = 10, db: AsyncSession = Depends(get_async_db)):
+    """The search route's serialization before fast_json.py"""
+    query = select(DrugSKU).order_by(DrugSKU.id).offset(page * pageSize).limit(pageSize + 1)
+    rows = (await db.scalars(query)).all()
+    return SKUSearchResponse(items=rows[:pageSize], total=None, next_cursor=None)
+
+
+def seed_catalog(count):
+    rng = random.Random(17)
+    rows = [
+        {
+            "ndc": f"{i:05d}-{i % 1000:03d}-{i % 100:02d}",
+            "name": f"{rng.choice(['Lisinopril', 'Atorvastatin', 'Amoxicillin', 'Metformin'])} {rng.randint(1, 500)}mg",
+            "manufacturer": rng.choice(["Pfizer", "Teva", "Merck", "Novartis", "Roche"]),
+            "dosage_form": rng.choice(["tablet", "capsule", "solution"]),
+            "strength": f"{rng.randint(1, 500)}mg",
+            "package_size": f"{rng.choice([30, 60, 90, 100])} units",
+            "status": rng.choice(["DRAFT", "PENDING_REVIEW", "APPROVED"]),
+            "gtin": f"{rng.randrange(10 ** 13):014d}" if i % 3 else None,
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(DrugSKU), rows)
+
+
+@pytest.fixture(scope="module")
+def clients():
+    with TestClient(main.app) as current, TestClient(legacy_app) as legacy:
+        seed_catalog(CATALOG_ROWS)
+        yield current, legacy
+
+
+@pytest.fixture(scope="module")
+def loaded_page():
+    """(ORM objects, column tuples) for the first 500 rows"""
+    with SessionLocal() as db:
+        objects = db.scalars(select(DrugSKU).order_by(DrugSKU.id).limit(500)).all()
+        tuples = db.execute(select(*SKU_RESPONSE_COLUMNS).order_by(DrugSKU.id).limit(500)).all()
+        db.expunge_all()
+    return objects, tuples
+
+
+def _params(page_size, page):
+    return {"pageSize": page_size, "page": page, "include_total": "false"}
+
+
+def _pages(page_size):
+    # Cycle through pages so the SQLite page cache is warm for both paths alike
+    pages = CATALOG_ROWS // page_size
+    state = {"page": 0}
+
+    def next_page():
+        state["page"] = (state["page"] + 1) % pages
+        return state["page"]
+
+    return next_page
+
+
+@pytest.mark.parametrize("page_size", PAGE_SIZES)
+def test_same_items(clients, page_size):
+    current, legacy = clients
+    for page in range(3):
+        fast = current.get("/api/skus", params=_params(page_size, page))
+        slow = legacy.get("/api/skus", params=_params(page_size, page))
+        assert fast.status_code == slow.status_code == 200
+        assert fast.json()["items"] == slow.json()["items"]
+
+
+@needs_benchmark
+@pytest.mark.parametrize("page_size", PAGE_SIZES)
+def test_search_legacy(benchmark, clients, page_size):
+    benchmark.group = f"search pageSize={page_size}"
+    _, legacy = clients
+    next_page = _pages(page_size)
+    benchmark(lambda: legacy.get("/api/skus", params=_params(page_size, next_page())))
+
+
+@needs_benchmark
+@pytest.mark.parametrize("page_size", PAGE_SIZES)
+def test_search_fast(benchmark, clients, page_size):
+    benchmark.group = f"search pageSize={page_size}"
+    current, _ = clients
+    next_page = _pages(page_size)
+    benchmark(lambda: current.get("/api/skus", params=_params(page_size, next_page())))
+
+
+@needs_benchmark
+def test_encode_legacy(benchmark, loaded_page):
+    benchmark.group = "encode 500 rows"
+    objects, _ = loaded_page
+    benchmark(lambda: SKUSearchResponse(items=objects).model_dump_json().encode())
+
+
+@needs_benchmark
+def test_encode_fast(benchmark, loaded_page):
+    benchmark.group = "encode 500 rows"
+    _, tuples = loaded_page
+    benchmark(lambda: encode_json({"items": sku_items(tuples), "total": None, "next_cursor": None}))
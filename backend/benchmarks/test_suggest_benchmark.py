@@ -0,0 +1,115 @@
+"""
+Benchmarks for the typeahead prefix index (suggest_index.py).
+
+Loads a synthetic 100k-SKU catalog into a SuggestIndex, in memory with
+no database, and times lookups for short and long name prefixes, NDC
+prefixes and manufacturer prefixes. It also times in-place updates and
+the substring LIKE query that per-keystroke searches used to run
+(against an in-memory SQLite copy). The index's memory footprint is
+printed and stored in each benchmark's extra_info.
+
+Usage (from backend/):
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks/test_suggest_benchmark.py -s
+"""
+import os
+import random
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suggest_index import SuggestIndex
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAVE_BENCHMARK = True
+except ImportError:
+    HAVE_BENCHMARK = False
+
+needs_benchmark = pytest.mark.skipif(not HAVE_BENCHMARK, reason="pytest-benchmark is not installed")
+
+CATALOG_ROWS = 100_000
+STEMS = ["Lisino", "Atorva", "Amoxi", "Fluco", "Metopr", "Losar", "Adali", "Simva", "Metfor", "Omepra"]
+SUFFIXES = ["pril", "statin", "cillin", "azole", "olol", "sartan", "mab", "min", "zole"]
+FORMS = ["Tablets", "Capsules", "Oral Solution", "Injection"]
+MANUFACTURERS = ["Pfizer", "Teva", "Merck", "Novartis", "Roche", "Sandoz", "Mylan", "Lupin", "Cipla", "Apotex"]
+
+
+def synthetic_docs(count):
+    rng = random.Random(19)
+    return {
+        i: (
+            f"{rng.randrange(10 ** 5):05d}-{rng.randrange(1000):03d}-{rng.randrange(100):02d}",
+            f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {rng.randint(1, 500)}mg {rng.choice(FORMS)}",
+            rng.choice(MANUFACTURERS),
+            rng.choice(["DRAFT", "PENDING_REVIEW", "APPROVED"]),
+        )
+        for i in range(1, count + 1)
+    }
+
+
+@pytest.fixture(scope="module")
+def docs():
+    return synthetic_docs(CATALOG_ROWS)
+
+
+@pytest.fixture(scope="module")
+def index(docs):
+    index = SuggestIndex()
+    index.merge(docs)
+    index.ready = True
+    print(f"\nsuggest index: {len(index)} SKUs, {index.stats()['keys']} keys, "
+          f"{index.memory_bytes() / 2 ** 20:.1f} MiB")
+    return index
+
+
+@pytest.fixture(scope="module")
+def sqlite_catalog(docs):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE drug_skus (id INTEGER PRIMARY KEY, ndc TEXT, name TEXT, manufacturer TEXT, status TEXT)")
+    conn.executemany("INSERT INTO drug_skus VALUES (?, ?, ?, ?, ?)", ((i, *doc) for i, doc in docs.items()))
+    return conn
+
+
+def test_matches_are_prefixes(index, docs):
+    for item in index.suggest("atorva", 20):
+        assert item["name"].lower().startswith("atorva")
+    assert all(item["manufacturer"] == "Teva" for item in index.suggest("teva", 5))
+    ndc = docs[42][0]
+    assert 42 in [item["id"] for item in index.suggest(ndc, 50)]
+    assert 42 in [item["id"] for item in index.suggest(ndc.replace("-", ""), 50)]
+
+
+def test_updates_move_keys(index):
+    index.upsert(CATALOG_ROWS + 1, "99999-999-99", "Zzyzxamab 5mg", "Acme", "DRAFT")
+    assert [item["id"] for item in index.suggest("zzyzx")] == [CATALOG_ROWS + 1]
+    index.upsert(CATALOG_ROWS + 1, "99999-999-99", "Qqwertamab 5mg", "Acme", "DRAFT")
+    assert index.suggest("zzyzx") == []
+    index.remove(CATALOG_ROWS + 1)
+    assert index.suggest("qqwert") == []
+
+
+@needs_benchmark
+@pytest.mark.parametrize("prefix", ["l", "lisinopril", "lisinopril 2", "500mg", "teva", "0123"])
+def test_suggest(benchmark, index, prefix):
+    benchmark.group = "suggest top-10"
+    benchmark.extra_info["memory_bytes"] = index.memory_bytes()
+    benchmark(index.suggest, prefix, 10)
+
+
+@needs_benchmark
+def test_upsert_in_place(benchmark, index):
+    benchmark.group = "update"
+    names = iter(f"Renamed {i} 10mg" for i in range(10 ** 9))
+    benchmark(lambda: index.upsert(7, "00000-000-00", next(names), "Teva", "DRAFT"))
+
+
+@needs_benchmark
+@pytest.mark.parametrize("term", ["l", "lisinopril"])
+def test_like_scan(benchmark, sqlite_catalog, term):
+    benchmark.group = "LIKE scan top-10 (previous per-keystroke query)"
+    query = "SELECT id, ndc, name, manufacturer, status FROM drug_skus WHERE name LIKE ? LIMIT 10"
+    benchmark(lambda: sqlite_catalog.execute(query, (f"%{term}%",)).fetchall())
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Bulk SKU import from CSV, NDJSON or Parquet.
+
+Rows are validated one at a time and written in chunks: PostgreSQL COPYs
+each chunk into a temporary staging table and merges it with a single
+INSERT ... SELECT ... ON CONFLICT (ndc); SQLite uses one executemany
+INSERT ... ON CONFLICT per chunk. Other databases are refused. Either way a chunk costs a
+handful of round trips instead of three per row.
+
+Rows that fail validation, repeat an NDC seen earlier in the file, or (in
+``skip`` mode) collide with an existing NDC are reported individually and
+the rest of the import carries on. ``upsert`` mode replaces existing rows
+the way PUT does, omitted optional fields included; like PUT it leaves
+``image_url`` alone, which is only written for new rows. Each chunk
+commits on its own, so an import cut short by a malformed file can
+simply be re-run.
+
+Usage (from backend/):
+    python bulk_import.py feed.csv
+    python bulk_import.py feed.ndjson.gz --mode upsert --chunk-size 10000
+"""
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import column, literal_column, select, table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+import csv
+import gzip
+import io
+import json
+import os
+import time
+
+from models import DrugSKU, SKUStatus, bump_catalog_version, utcnow
+from change_feed import OP_CREATE, OP_UPDATE, record_changes
+
+BULK_IMPORT_CHUNK_ROWS = int(os.environ.get("BULK_IMPORT_CHUNK_ROWS", 5000))
+# Cap on per-row errors kept in the report; counts stay exact
+BULK_IMPORT_MAX_ERRORS = int(os.environ.get("BULK_IMPORT_MAX_ERRORS", 1000))
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMAT_PARQUET = "parquet"
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON, FORMAT_PARQUET)
+
+MODE_SKIP = "skip"
+MODE_UPSERT = "upsert"
+MODES = (MODE_SKIP, MODE_UPSERT)
+
+REQUIRED_FIELDS = ("ndc", "name", "manufacturer", "dosage_form", "strength", "package_size")
+OPTIONAL_FIELDS = ("gtin", "image_url", "created_by")
+IMPORT_COLUMNS = REQUIRED_FIELDS + ("status",) + OPTIONAL_FIELDS
+
+_EXTENSIONS = {
+    ".csv": FORMAT_CSV,
+    ".ndjson": FORMAT_NDJSON,
+    ".jsonl": FORMAT_NDJSON,
+    ".parquet": FORMAT_PARQUET,
+}
+
+
+class BulkImportError(ValueError):
+    """The file as a whole cannot be imported (unknown format, bad header...)"""
+
+
+def detect_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    if explicit:
+        fmt = explicit.lower()
+        if fmt == "jsonl":
+            fmt = FORMAT_NDJSON
+        if fmt not in FORMATS:
+            raise BulkImportError(f"Unsupported format '{explicit}', expected one of {', '.join(FORMATS)}")
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    fmt = _EXTENSIONS.get(os.path.splitext(name)[1])
+    if not fmt:
+        raise BulkImportError(f"Cannot tell the format of '{filename}'; pass format=csv|ndjson|parquet")
+    return fmt
+
+
+def _maybe_gunzip(stream: BinaryIO, filename: Optional[str]) -> BinaryIO:
+    if (filename or "").lower().endswith(".gz"):
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+
+def _iter_csv(stream: BinaryIO) -> Iterator[Any]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            raise BulkImportError("CSV file has no header row")
+        missing = [field for field in REQUIRED_FIELDS if field not in reader.fieldnames]
+        if missing:
+            raise BulkImportError(f"CSV header is missing columns: {', '.join(missing)}")
+        yield from reader
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def _iter_ndjson(stream: BinaryIO) -> Iterator[Any]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            # Reported against this row by validate_row
+            yield e
+
+
+def _iter_parquet(stream: BinaryIO) -> Iterator[Any]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise BulkImportError("Parquet import requires pyarrow (pip install pyarrow)")
+    parquet = pq.ParquetFile(stream)
+    columns = [name for name in IMPORT_COLUMNS if name in parquet.schema_arrow.names]
+    for batch in parquet.iter_batches(batch_size=BULK_IMPORT_CHUNK_ROWS, columns=columns):
+        yield from batch.to_pylist()
+
+
+def _reject_malformed(records: Iterator[Any], fmt: str) -> Iterator[Any]:
+    row = 0
+    try:
+        for row, record in enumerate(records, start=1):
+            yield record
+    except BulkImportError:
+        raise
+    except (UnicodeDecodeError, csv.Error, EOFError, OSError, ValueError) as e:
+        raise BulkImportError(f"Malformed {fmt} file after row {row}: {e}")
+
+
+def iter_records(stream: BinaryIO, fmt: str, filename: Optional[str] = None) -> Iterator[Any]:
+    """Raw records from an import file, streamed rather than loaded whole"""
+    if fmt == FORMAT_PARQUET:
+        # Parquet needs random access, which gzip streams do not offer
+        records = _iter_parquet(stream)
+    else:
+        stream = _maybe_gunzip(stream, filename)
+        records = _iter_csv(stream) if fmt == FORMAT_CSV else _iter_ndjson(stream)
+    return _reject_malformed(records, fmt)
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def validate_row(record: Any) -> Dict[str, Any]:
+    """Map one raw record onto drug_skus columns; raises ValueError if invalid"""
+    if isinstance(record, Exception):
+        raise ValueError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+
+    row = {}
+    missing = []
+    for field in REQUIRED_FIELDS:
+        row[field] = _clean(record.get(field))
+        if row[field] is None:
+            missing.append(field)
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    status = _clean(record.get("status")) or SKUStatus.DRAFT.value
+    try:
+        row["status"] = SKUStatus(status.upper()).value
+    except ValueError:
+        raise ValueError(f"Invalid status '{status}'")
+
+    for field in OPTIONAL_FIELDS:
+        row[field] = _clean(record.get(field))
+    return row
+
+
+class ImportReport:
+    def __init__(self, fmt: str, mode: str):
+        self.format = fmt
+        self.mode = mode
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+
+    def error(self, row: int, ndc: Optional[str], message: str, skipped: bool = False):
+        if skipped:
+            self.skipped += 1
+        else:
+            self.failed += 1
+        if len(self.errors) < BULK_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "ndc": ndc, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "format": self.format,
+            "mode": self.mode,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            # Conflicts are only found when a chunk is written
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": len(self.errors) < self.skipped + self.failed,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "rows_per_sec": round(self.rows / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+# A chunk is a list of (row number, validated row) pairs
+Chunk = List[Tuple[int, Dict[str, Any]]]
+
+
+# Kept from the existing row on upsert, as PUT does (SKUCreate has no image_url)
+_UPSERT_KEEP = ("ndc", "created_by", "image_url")
+
+
+def _upsert_values(excluded) -> Dict[str, Any]:
+    values = {name: excluded[name] for name in IMPORT_COLUMNS if name not in _UPSERT_KEEP}
+    values["last_modified"] = utcnow()
+    # ON CONFLICT DO UPDATE skips Column.onupdate
+    values["version"] = DrugSKU.__table__.c.version + 1
+    return values
+
+
+def _write_chunk_postgres(conn, chunk: Chunk, mode: str) -> Dict[str, bool]:
+    """COPY into a staging table and merge; returns {ndc: inserted?} for written rows"""
+    skus = DrugSKU.__table__
+    columns = ", ".join(IMPORT_COLUMNS)
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS drug_skus_staging ON COMMIT DROP AS "
+        f"SELECT {columns} FROM drug_skus WITH NO DATA"
+    )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for _, row in chunk:
+        writer.writerow([row[name] for name in IMPORT_COLUMNS])
+    buffer.seek(0)
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        # Unquoted empty fields load as NULL
+        cursor.copy_expert(f"COPY drug_skus_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+    staging = table("drug_skus_staging", *(column(name) for name in IMPORT_COLUMNS))
+    stmt = postgresql.insert(skus).from_select(list(IMPORT_COLUMNS), select(*staging.c))
+    if mode == MODE_UPSERT:
+        stmt = stmt.on_conflict_do_update(index_elements=["ndc"], set_=_upsert_values(stmt.excluded))
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["ndc"])
+    # xmax is 0 only for freshly inserted row versions
+    stmt = stmt.returning(skus.c.ndc, literal_column("(xmax = 0)"))
+    return {ndc: inserted for ndc, inserted in conn.execute(stmt)}
+
+
+def _write_chunk_sqlite(conn, chunk: Chunk, mode: str) -> Dict[str, bool]:
+    """executemany INSERT ... ON CONFLICT; returns {ndc: inserted?} for written rows"""
+    skus = DrugSKU.__table__
+    ndcs = [row["ndc"] for _, row in chunk]
+    existing = set(conn.scalars(select(skus.c.ndc).where(skus.c.ndc.in_(ndcs))))
+
+    stmt = sqlite.insert(skus)
+    if mode == MODE_UPSERT:
+        stmt = stmt.on_conflict_do_update(index_elements=["ndc"], set_=_upsert_values(stmt.excluded))
+        rows = [row for _, row in chunk]
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["ndc"])
+        rows = [row for _, row in chunk if row["ndc"] not in existing]
+    if rows:
+        conn.execute(stmt, rows)
+    return {row["ndc"]: row["ndc"] not in existing for row in rows}
+
+
+_CHUNK_WRITERS = {
+    "postgresql": _write_chunk_postgres,
+    "sqlite": _write_chunk_sqlite,
+}
+
+
+def _chunk_writer(engine: Engine):
+    writer = _CHUNK_WRITERS.get(engine.dialect.name)
+    if writer is None:
+        raise BulkImportError(f"Bulk import supports PostgreSQL and SQLite, not {engine.dialect.name}")
+    return writer
+
+
+def _write_chunk(engine: Engine, chunk: Chunk, mode: str, report: ImportReport):
+    writer = _chunk_writer(engine)
+    try:
+        with engine.begin() as conn:
+            # Lock the catalog_version row first so change offsets commit in order
+            conn.execute(bump_catalog_version())
+            written = writer(conn, chunk, mode)
+            created = [ndc for ndc, inserted in written.items() if inserted]
+            updated = [ndc for ndc, inserted in written.items() if not inserted]
+            if created:
+                conn.execute(record_changes(OP_CREATE, DrugSKU.ndc.in_(created)))
+            if updated:
+                conn.execute(record_changes(OP_UPDATE, DrugSKU.ndc.in_(updated)))
+    except DBAPIError as e:
+        if len(chunk) == 1:
+            row_number, row = chunk[0]
+            report.error(row_number, row["ndc"], f"Database error: {e.orig}")
+            return
+        # Retry row by row so one bad row does not sink the whole chunk
+        for item in chunk:
+            _write_chunk(engine, [item], mode, report)
+        return
+
+    for row_number, row in chunk:
+        if row["ndc"] not in written:
+            report.error(row_number, row["ndc"], "SKU with this NDC already exists", skipped=True)
+        elif written[row["ndc"]]:
+            report.inserted += 1
+        else:
+            report.updated += 1
+
+
+def import_records(
+    engine: Engine,
+    records: Iterable[Any],
+    fmt: str,
+    mode: str = MODE_SKIP,
+    chunk_size: int = BULK_IMPORT_CHUNK_ROWS,
+) -> Dict[str, Any]:
+    """Validate and write records in chunks, returning the import report"""
+    if mode not in MODES:
+        raise BulkImportError(f"Invalid mode '{mode}', expected 'skip' or 'upsert'")
+    # Fail before reading any rows
+    _chunk_writer(engine)
+    report = ImportReport(fmt, mode)
+    seen: Dict[str, int] = {}
+    chunk: Chunk = []
+
+    for row_number, record in enumerate(records, start=1):
+        report.rows += 1
+        try:
+            row = validate_row(record)
+        except ValueError as e:
+            ndc = _clean(record.get("ndc")) if isinstance(record, dict) else None
+            report.error(row_number, ndc, str(e))
+            continue
+        first = seen.setdefault(row["ndc"], row_number)
+        if first != row_number:
+            report.error(row_number, row["ndc"], f"Duplicate NDC, first seen at row {first}")
+            continue
+
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            _write_chunk(engine, chunk, mode, report)
+            chunk = []
+
+    if chunk:
+        _write_chunk(engine, chunk, mode, report)
+    return report.as_dict()
+
+
+def import_file(
+    engine: Engine,
+    stream: BinaryIO,
+    filename: Optional[str] = None,
+    fmt: Optional[str] = None,
+    mode: str = MODE_SKIP,
+    chunk_size: int = BULK_IMPORT_CHUNK_ROWS,
+) -> Dict[str, Any]:
+    fmt = detect_format(filename, fmt)
+    return import_records(engine, iter_records(stream, fmt, filename), fmt, mode, chunk_size)
+
+
+def main():
+    import argparse
+    from models import engine, init_db
+
+    parser = argparse.ArgumentParser(description="Bulk import SKUs from CSV, NDJSON or Parquet")
+    parser.add_argument("path", help="Import file (.csv, .ndjson/.jsonl, .parquet; .gz for CSV/NDJSON)")
+    parser.add_argument("--format", choices=FORMATS, help="Override format detection")
+    parser.add_argument("--mode", choices=MODES, default=MODE_SKIP,
+                        help="skip: leave existing NDCs alone; upsert: overwrite them")
+    parser.add_argument("--chunk-size", type=int, default=BULK_IMPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    init_db()
+    with open(args.path, "rb") as f:
+        report = import_file(engine, f, args.path, args.format, args.mode, args.chunk_size)
+
+    print(json.dumps(report, indent=2))
+    print(f"{report['rows']} rows in {report['elapsed_ms'] / 1000:.2f}s "
+          f"({report['rows_per_sec']} rows/sec): {report['inserted']} inserted, "
+          f"{report['updated']} updated, {report['skipped']} skipped, {report['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
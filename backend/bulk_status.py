@@ -0,0 +1,139 @@
+"""Bulk status transitions for the review workflow.
+
+The rows are read once, each one gets an outcome, and every row that
+passes moves in a single set-based UPDATE. The optimistic concurrency
+check works per row: a client either sends the ``last_modified`` it last
+saw for each ID, or a single ``as_of`` time that the matched rows must
+not have changed after. The UPDATE only matches rows whose ``version`` is
+still the one that was read, so a write landing in between is reported
+as a conflict rather than overwritten.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import os
+
+from models import DrugSKU, SKUStatus, bump_catalog_version, utcnow
+from change_feed import OP_UPDATE, record_changes
+
+BULK_UPDATE_MAX_ROWS = int(os.environ.get("BULK_UPDATE_MAX_ROWS", 10000))
+
+OUTCOME_UPDATED = "updated"
+OUTCOME_UNCHANGED = "unchanged"
+OUTCOME_NOT_FOUND = "not_found"
+OUTCOME_CONFLICT = "conflict"
+OUTCOME_STATUS_MISMATCH = "status_mismatch"
+
+# Marks "no version given" apart from an explicit null last_modified
+NO_VERSION = object()
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _same_version(current: Optional[datetime], expected: Optional[datetime]) -> bool:
+    return _utc_naive(current) == _utc_naive(expected)
+
+
+def _changed_after(current: Optional[datetime], created: Optional[datetime], as_of: datetime) -> bool:
+    stamp = _utc_naive(current or created)
+    return stamp is not None and stamp > _utc_naive(as_of)
+
+
+async def transition_status(
+    db: AsyncSession,
+    target: SKUStatus,
+    versions: Dict[int, Any],
+    filters: Sequence = (),
+    from_status: Optional[SKUStatus] = None,
+    as_of: Optional[datetime] = None,
+    reviewed_by: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Move SKUs to ``target``, returning one outcome per SKU in request order.
+
+    ``versions`` maps ID -> expected last_modified (or NO_VERSION to skip
+    the check). With no IDs, every row matching ``filters`` is a candidate.
+    Commits on success.
+    """
+    if len(versions) > BULK_UPDATE_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_UPDATE_MAX_ROWS} SKUs per request")
+
+    query = select(DrugSKU.id, DrugSKU.status, DrugSKU.last_modified, DrugSKU.created_at, DrugSKU.version)
+    if versions:
+        query = query.where(DrugSKU.id.in_(list(versions)))
+    else:
+        query = query.limit(BULK_UPDATE_MAX_ROWS + 1)
+    query = query.where(*filters).order_by(DrugSKU.id)
+    # Lock the catalog_version row before any SKU row, in the same order
+    # as main.commit_sku_write and bulk imports, so concurrent writers
+    # queue instead of deadlocking. It also keeps change offsets in
+    # commit order. On SQLite this takes the database write lock.
+    await db.execute(bump_catalog_version())
+    # Row locks on PostgreSQL. SQLite ignores FOR UPDATE, but the write
+    # lock taken above already keeps other writers out until commit
+    rows = {row.id: row for row in await db.execute(query.with_for_update())}
+    if len(rows) > BULK_UPDATE_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Filter matches more than {BULK_UPDATE_MAX_ROWS} SKUs; narrow it or pass ids",
+        )
+
+    ids = list(versions) if versions else list(rows)
+    outcomes: Dict[int, Dict[str, Any]] = {}
+    eligible = []
+    for sku_id in ids:
+        row = rows.get(sku_id)
+        if row is None:
+            outcomes[sku_id] = {"id": sku_id, "outcome": OUTCOME_NOT_FOUND}
+            continue
+        outcome = {"id": sku_id, "status": row.status.value, "last_modified": row.last_modified}
+        expected = versions.get(sku_id, NO_VERSION)
+        if expected is not NO_VERSION and not _same_version(row.last_modified, expected):
+            outcome["outcome"] = OUTCOME_CONFLICT
+        elif as_of is not None and _changed_after(row.last_modified, row.created_at, as_of):
+            outcome["outcome"] = OUTCOME_CONFLICT
+        elif from_status is not None and row.status != from_status:
+            outcome["outcome"] = OUTCOME_STATUS_MISMATCH
+        elif row.status == target:
+            # Leave last_modified alone for no-op transitions
+            outcome["outcome"] = OUTCOME_UNCHANGED
+        else:
+            outcome["outcome"] = OUTCOME_UPDATED
+            eligible.append(sku_id)
+        outcomes[sku_id] = outcome
+
+    if eligible:
+        by_version: Dict[int, List[int]] = {}
+        for sku_id in eligible:
+            by_version.setdefault(rows[sku_id].version, []).append(sku_id)
+        unchanged_since_read = or_(*(
+            and_(DrugSKU.id.in_(sku_ids), DrugSKU.version == version)
+            for version, sku_ids in by_version.items()
+        ))
+        values = {"status": target, "last_modified": utcnow(), "version": DrugSKU.version + 1}
+        if reviewed_by is not None:
+            values["reviewed_by"] = reviewed_by
+        stmt = (
+            update(DrugSKU)
+            .where(unchanged_since_read)
+            .values(**values)
+            .returning(DrugSKU.id, DrugSKU.last_modified)
+            .execution_options(synchronize_session=False)
+        )
+        updated = []
+        for sku_id, last_modified in await db.execute(stmt):
+            outcomes[sku_id].update(status=target.value, last_modified=last_modified)
+            updated.append(sku_id)
+        for sku_id in set(eligible).difference(updated):
+            # Written by someone else after it was read
+            outcomes[sku_id]["outcome"] = OUTCOME_CONFLICT
+        if updated:
+            await db.execute(record_changes(OP_UPDATE, DrugSKU.id.in_(updated)))
+    await db.commit()
+
+    return [outcomes[sku_id] for sku_id in ids]
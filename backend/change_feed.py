@@ -0,0 +1,203 @@
+"""Change feed over the sku_changes log.
+
+Every write to drug_skus appends (sku_id, op) rows to sku_changes in the
+same transaction, and each row's id is its offset in the feed. Clients
+load the catalog once and then apply deltas from
+GET /api/skus/changes/stream (Server-Sent Events) or
+GET /api/skus/changes (JSON pages).
+
+Both endpoints resume after any offset. SSE clients do this on their
+own through Last-Event-ID. Events carry the SKU's current state, not a
+diff. Deletes, and SKUs deleted since, have a null ``sku``, so applying
+events in order always converges.
+
+Streams in this process wake as soon as a write commits. Writes made by
+other workers are picked up on the next poll.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import json
+import logging
+import os
+import time
+
+from models import AsyncSessionLocal, DrugSKU, SKUChange
+from export import EXPORT_COLUMNS, EXPORT_FIELDS, plain_row
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_POLL_SECONDS = float(os.environ.get("CHANGE_FEED_POLL_SECONDS", 2))
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.environ.get("CHANGE_FEED_HEARTBEAT_SECONDS", 15))
+CHANGE_FEED_BATCH = int(os.environ.get("CHANGE_FEED_BATCH", 500))
+# 0 keeps the log forever
+CHANGE_LOG_RETENTION_DAYS = float(os.environ.get("CHANGE_LOG_RETENTION_DAYS", 7))
+# How often each worker prunes the log while it runs
+CHANGE_LOG_PRUNE_SECONDS = float(os.environ.get("CHANGE_LOG_PRUNE_SECONDS", 3600))
+
+OP_CREATE = "create"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+
+def record_change(sku_id: int, op: str):
+    """INSERT for one change; run it in the write's transaction"""
+    return insert(SKUChange).values(sku_id=sku_id, op=op)
+
+
+def record_changes(op: str, *where):
+    """Set-based INSERT ... SELECT logging every SKU matching ``where``"""
+    return insert(SKUChange).from_select(
+        ["sku_id", "op"],
+        select(DrugSKU.id, literal(op)).where(*where).order_by(DrugSKU.id),
+    )
+
+
+class ChangeNotifier:
+    """Wakes streams in this process as soon as a write commits"""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def current(self) -> asyncio.Event:
+        """Take this before polling, so a commit during the poll is not missed"""
+        return self._event
+
+    def notify(self):
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    @staticmethod
+    async def wait(event: asyncio.Event, timeout: float):
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def log_bounds(db: AsyncSession):
+    """(oldest, latest) offsets still in the log; (None, None) if empty"""
+    return (await db.execute(select(func.min(SKUChange.id), func.max(SKUChange.id)))).one()
+
+
+def is_gap(after: int, oldest: Optional[int], latest: Optional[int]) -> bool:
+    """True when the log cannot continue from ``after``.
+
+    Either changes after it have already been pruned, or it is past the
+    newest change (a stale or made-up offset, or one from another
+    database) and the client would otherwise wait forever. An empty log
+    tells neither apart, so it never reports a gap.
+    """
+    if oldest is None:
+        return False
+    return after < oldest - 1 or after > latest
+
+
+def restart_offset(oldest: Optional[int]) -> int:
+    """Where to continue after a gap: just before the oldest kept change"""
+    return oldest - 1 if oldest is not None else 0
+
+
+async def fetch_changes(db: AsyncSession, after: int, limit: int = CHANGE_FEED_BATCH) -> List[Dict[str, Any]]:
+    query = (
+        select(SKUChange.id, SKUChange.sku_id, SKUChange.op, SKUChange.changed_at, *EXPORT_COLUMNS)
+        .outerjoin(DrugSKU, DrugSKU.id == SKUChange.sku_id)
+        .where(SKUChange.id > after)
+        .order_by(SKUChange.id)
+        .limit(limit)
+    )
+    changes = []
+    for row in await db.execute(query):
+        offset, sku_id, op, changed_at, *sku = row
+        # The outer join yields NULLs once the SKU is gone. SQLite may hand
+        # a deleted id to a new row, so deletes never carry a row.
+        sku = dict(zip(EXPORT_FIELDS, plain_row(sku))) if sku[0] is not None and op != OP_DELETE else None
+        changes.append({
+            "offset": offset,
+            "op": op,
+            "sku_id": sku_id,
+            "changed_at": changed_at.isoformat() if changed_at else None,
+            "sku": sku,
+        })
+    return changes
+
+
+def _sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def iter_change_events(
+    after: Optional[int],
+    notifier: ChangeNotifier,
+    poll_interval: float = CHANGE_FEED_POLL_SECONDS,
+    heartbeat: float = CHANGE_FEED_HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """SSE stream of changes after ``after`` (None: only new changes).
+
+    A session is opened per poll, so idle streams hold no connection.
+    The first event is ``ready``, carrying the starting offset. ``reset``
+    means the log cannot continue from ``after`` (changes were pruned
+    before the client caught up, or the offset is past the newest change)
+    and the client should reload the catalog before applying further
+    events.
+    """
+    async with AsyncSessionLocal() as db:
+        oldest, latest = await log_bounds(db)
+    if after is None:
+        after = latest or 0
+
+    yield "retry: 3000\n" + _sse("ready", {"offset": after}, event_id=after)
+    if is_gap(after, oldest, latest):
+        yield _sse("reset", {"offset": after, "oldest": oldest})
+        after = restart_offset(oldest)
+
+    last_sent = time.monotonic()
+    while True:
+        wake = notifier.current()
+        async with AsyncSessionLocal() as db:
+            changes = await fetch_changes(db, after)
+        for change in changes:
+            after = change["offset"]
+            yield _sse(change["op"], change, event_id=after)
+        if changes:
+            last_sent = time.monotonic()
+            if len(changes) == CHANGE_FEED_BATCH:
+                continue
+        elif time.monotonic() - last_sent >= heartbeat:
+            # Comment line: keeps proxies from closing an idle stream
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+        await notifier.wait(wake, poll_interval)
+
+
+def prune_change_log(engine: Engine, retention_days: float = CHANGE_LOG_RETENTION_DAYS) -> int:
+    """Delete log rows older than the retention window; returns rows removed"""
+    if retention_days <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    if engine.dialect.name != "postgresql":
+        # SQLite stores naive UTC timestamps
+        cutoff = cutoff.replace(tzinfo=None)
+    with engine.begin() as conn:
+        removed = conn.execute(delete(SKUChange).where(SKUChange.changed_at < cutoff)).rowcount
+    if removed:
+        logger.info("Pruned %d change log rows older than %s days", removed, retention_days)
+    return removed
+
+
+async def prune_periodically(engine: Engine, interval: float = CHANGE_LOG_PRUNE_SECONDS):
+    """Run prune_change_log every ``interval`` seconds; run it as a background task"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(prune_change_log, engine)
+        except Exception as e:
+            logger.warning("Change log pruning failed: %s", e)
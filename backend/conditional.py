@@ -0,0 +1,96 @@
+"""HTTP conditional GET support (ETag / Last-Modified / 304).
+
+A single SKU's ETag is a hash of its serialized row, so any write that
+changes the SKU changes the tag; last_modified alone would not do, as
+SQLite stores it with one-second resolution. Last-Modified is its
+last_modified (or created_at for rows that were never updated). Search results are tagged
+with the catalog version counter, which every write bumps. The ETags
+are weak: they describe the data, not the exact bytes.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
+import json
+
+from models import CatalogVersion
+
+# Clients may keep a copy but must revalidate before each use
+CACHE_CONTROL = "no-cache"
+
+
+async def catalog_version(db: AsyncSession) -> int:
+    """Read before running a search, so the tag is never newer than the data"""
+    return await db.scalar(select(CatalogVersion.version).where(CatalogVersion.id == 1)) or 0
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        # SQLite timestamps are naive UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def sku_validators(sku: Dict[str, Any]):
+    """(etag, last_modified) for a serialized SKU"""
+    changed = sku.get("last_modified") or sku.get("created_at")
+    canonical = json.dumps(sku, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha1(canonical.encode()).hexdigest()[:16]
+    return f'W/"sku-{digest}"', _as_utc(changed)
+
+
+def search_etag(version: int) -> str:
+    return f'W/"catalog-{version}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same entity tag
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
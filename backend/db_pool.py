@@ -0,0 +1,233 @@
+"""Engine and connection pool configuration from the environment.
+
+models.py builds both engines through ``engine_options`` and
+``configure_engine``, so pool sizing, pre-ping, recycling and the SQLite
+pragmas are set in one place.
+
+Pool sizing: a PostgreSQL server has a connection limit shared by every
+uvicorn worker, and each worker holds two pools (the async engine for the
+routes and the sync engine for startup, bulk import and index builds). If
+DB_MAX_CONNECTIONS is set and DB_POOL_SIZE is not, the budget is divided
+by WEB_CONCURRENCY, the variable uvicorn's --workers reads. The sync
+engine gets DB_SYNC_POOL_SIZE of each worker's share, and the async engine
+gets the rest, with no overflow, so the whole deployment stays under the
+limit.
+
+SQLite: every connection runs in WAL mode with synchronous=NORMAL, so
+readers no longer block behind a writer and commits skip the per-commit
+fsync of the rollback journal. A file database also gets a real pool on
+the async engine. aiosqlite defaults to NullPool, which opens a new
+connection, and a new thread, on every request.
+
+Checkout counts, wait times and timeouts are kept per engine in
+POOL_METRICS and served by GET /api/db/pool/stats.
+"""
+from typing import Any, Dict, Optional
+import logging
+import os
+import time
+
+from sqlalchemy import event, exc, make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW")
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+# Seconds before a pooled connection is replaced (-1 = never). Defaults to
+# 1800 for server databases, ahead of typical firewall/proxy idle timeouts
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE")
+# Server connection budget shared by all workers (unset = no budget)
+DB_MAX_CONNECTIONS = _env_int("DB_MAX_CONNECTIONS")
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+DB_SYNC_POOL_SIZE = int(os.environ.get("DB_SYNC_POOL_SIZE", 2))
+
+# Applied to every SQLite connection on connect ("" leaves a pragma alone)
+DB_SQLITE_JOURNAL_MODE = os.environ.get("DB_SQLITE_JOURNAL_MODE", "WAL")
+DB_SQLITE_SYNCHRONOUS = os.environ.get("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+DB_SQLITE_MMAP_SIZE = os.environ.get("DB_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+# Negative = KiB per connection
+DB_SQLITE_CACHE_SIZE = os.environ.get("DB_SQLITE_CACHE_SIZE", "-16384")
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.5, 2.5, float("inf"))
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.pool: Optional[Pool] = None
+
+    def observe_wait(self, seconds: float):
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                self.wait_buckets[i] += 1
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.pool
+        waits = self.checkouts + self.timeouts
+        stats = {
+            "pool": type(pool).__name__.replace("Timed", "", 1) if pool is not None else None,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / waits, 6) if waits else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            # Cumulative, like a Prometheus histogram
+            "wait_seconds_buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): sum(self.wait_buckets[: i + 1])
+                for i, bound in enumerate(WAIT_BUCKETS)
+            },
+        }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return stats
+
+
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+
+
+def _timed_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """Subclass of ``base`` that times every checkout.
+
+    A subclass rather than an instance attribute, because the pool
+    recreates itself from its class after dispose() or invalidation.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = base.connect(self)
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            metrics.observe_wait(time.perf_counter() - start)
+            raise
+        metrics.checkouts += 1
+        metrics.observe_wait(time.perf_counter() - start)
+        metrics.pool = self
+        return connection
+
+    # Same module, so pool logging stays under sqlalchemy.pool
+    return type(f"Timed{base.__name__}", (base,), {"connect": connect, "__module__": base.__module__})
+
+
+def _pool_size(is_async: bool):
+    """(pool_size, max_overflow) for one engine of this worker"""
+    if DB_POOL_SIZE is None and DB_MAX_CONNECTIONS:
+        per_worker = max(2, DB_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY))
+        sync_size = min(DB_SYNC_POOL_SIZE, per_worker - 1)
+        return (per_worker - sync_size if is_async else sync_size), 0
+    return (DB_POOL_SIZE if DB_POOL_SIZE is not None else 5), (DB_MAX_OVERFLOW if DB_MAX_OVERFLOW is not None else 10)
+
+
+def engine_options(url, name: str, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments for create_engine / create_async_engine"""
+    url = make_url(url)
+    is_sqlite = url.get_backend_name() == "sqlite"
+    pool_class = url.get_dialect().get_pool_class(url)
+    if is_sqlite and pool_class is NullPool and is_async:
+        # aiosqlite on a file: pool connections instead of reopening them
+        pool_class = AsyncAdaptedQueuePool
+
+    metrics = POOL_METRICS.setdefault(name, PoolMetrics(name))
+    options: Dict[str, Any] = {
+        "poolclass": _timed_pool_class(pool_class, metrics),
+        # Test connections on checkout; a local SQLite file cannot go stale
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", not is_sqlite),
+        "pool_recycle": DB_POOL_RECYCLE if DB_POOL_RECYCLE is not None else (-1 if is_sqlite else 1800),
+    }
+    if issubclass(pool_class, QueuePool):
+        pool_size, max_overflow = _pool_size(is_async)
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT)
+    if is_sqlite and not is_async:
+        # The sync engine is also used from threadpool workers
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def _sqlite_pragmas():
+    pragmas = [
+        ("journal_mode", DB_SQLITE_JOURNAL_MODE),
+        ("synchronous", DB_SQLITE_SYNCHRONOUS),
+        ("mmap_size", DB_SQLITE_MMAP_SIZE),
+        ("cache_size", DB_SQLITE_CACHE_SIZE),
+    ]
+    return [(pragma, value) for pragma, value in pragmas if value]
+
+
+def configure_engine(engine, name: str):
+    """Install the SQLite pragmas and pool metrics listeners on an engine"""
+    sync_engine: Engine = getattr(engine, "sync_engine", engine)
+    metrics = POOL_METRICS.setdefault(name, PoolMetrics(name))
+    metrics.pool = sync_engine.pool
+
+    if sync_engine.dialect.name == "sqlite":
+        pragmas = _sqlite_pragmas()
+
+        @event.listens_for(sync_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma, value in pragmas:
+                    try:
+                        cursor.execute(f"PRAGMA {pragma} = {value}")
+                    except Exception as e:
+                        # e.g. WAL on a read-only or network file system
+                        logger.warning("Could not set PRAGMA %s = %s: %s", pragma, value, e)
+            finally:
+                cursor.close()
+
+    @event.listens_for(sync_engine, "connect")
+    def count_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def count_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def count_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    return engine
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: metrics.stats() for name, metrics in POOL_METRICS.items()}
@@ -0,0 +1,82 @@
+"""Duplicate SKU detection in a single windowed query"""
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from models import DrugSKU
+
+MATCH_EXACT = "exact"
+MATCH_FUZZY = "fuzzy"
+
+# Characters ignored when comparing names, strengths and manufacturers fuzzily,
+# so "Pfizer, Inc." matches "PFIZER INC" and "10 mg" matches "10mg"
+_NOISE_CHARS = (" ", ".", ",", "-", "_", "/")
+
+# Rows fetched per round trip while streaming groups
+STREAM_BATCH_SIZE = 500
+
+
+def _normalized(column):
+    expr = func.lower(func.trim(column))
+    for char in _NOISE_CHARS:
+        expr = func.replace(expr, char, "")
+    return type_coerce(expr, String)
+
+
+def duplicate_key(match: str):
+    """SQL expression that is equal for SKUs considered duplicates"""
+    if match == MATCH_EXACT:
+        return DrugSKU.name
+    if match == MATCH_FUZZY:
+        separator = "|"
+        return (
+            _normalized(DrugSKU.name) + separator
+            + _normalized(DrugSKU.strength) + separator
+            + _normalized(DrugSKU.manufacturer)
+        )
+    raise ValueError(f"Unknown duplicate match mode: {match}")
+
+
+async def iter_duplicate_groups(
+    db: AsyncSession,
+    match: str = MATCH_EXACT,
+    page: int = 0,
+    page_size: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, List[DrugSKU]]]:
+    """Yield (group_key, records) for every duplicate group, ordered by key.
+
+    Everything happens in one statement: a COUNT window finds keys shared by
+    more than one row and DENSE_RANK numbers the groups so a page of groups
+    can be selected without a second query. Rows are streamed in batches.
+    """
+    key = duplicate_key(match).label("group_key")
+
+    counted = select(
+        DrugSKU,
+        key,
+        func.count().over(partition_by=key).label("group_size"),
+    ).subquery()
+
+    ranked = select(
+        counted,
+        func.dense_rank().over(order_by=counted.c.group_key).label("group_no"),
+    ).where(counted.c.group_size > 1).subquery()
+
+    sku = aliased(DrugSKU, ranked)
+    stmt = select(sku, ranked.c.group_key)
+    if page_size is not None:
+        first = page * page_size + 1
+        stmt = stmt.where(ranked.c.group_no.between(first, first + page_size - 1))
+    stmt = stmt.order_by(ranked.c.group_no, ranked.c.id)
+
+    result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    group_key, records = None, []
+    async for record, row_key in result:
+        if records and row_key != group_key:
+            yield group_key, records
+            records = []
+        group_key = row_key
+        records.append(record)
+    if records:
+        yield group_key, records
@@ -0,0 +1,37 @@
+"""EXPLAIN as a SQLAlchemy construct, so plans can be requested for any
+select() with its bound parameters compiled by the active dialect"""
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement, format_json: bool = False):
+        self.statement = statement
+        self.format_json = format_json
+
+
+# Prefix that asks each dialect for a plan without running the statement
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN "}
+
+
+def explain_prefix(dialect_name: str) -> str:
+    """EXPLAIN prefix for raw SQL already compiled for ``dialect_name``"""
+    return EXPLAIN_PREFIXES.get(dialect_name, "EXPLAIN ")
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    prefix = "EXPLAIN (FORMAT JSON) " if element.format_json else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return explain_prefix("sqlite") + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain)
+def _explain_default(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
@@ -0,0 +1,134 @@
+"""Streaming catalog export as NDJSON or CSV, optionally gzipped.
+
+Rows are read with a server-side cursor (``yield_per``) as plain column
+tuples and written out one batch at a time, so memory stays flat however
+large the catalog is. The CSV header matches what bulk_import.py reads,
+so an export can be loaded straight back in.
+"""
+from datetime import datetime, timezone
+from enum import Enum
+from typing import AsyncIterator, Optional
+from sqlalchemy import DateTime, Enum as SQLEnum, func, select
+import csv
+import io
+import json
+import os
+import zlib
+
+from models import AsyncSessionLocal, DrugSKU, utcnow
+
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", 1000))
+
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+FORMATS = (FORMAT_NDJSON, FORMAT_CSV)
+MEDIA_TYPES = {FORMAT_NDJSON: "application/x-ndjson", FORMAT_CSV: "text/csv"}
+
+EXPORT_COLUMNS = [column for column in DrugSKU.__table__.columns]
+EXPORT_FIELDS = [column.name for column in EXPORT_COLUMNS]
+# Positions of the only values that are not already JSON/CSV friendly
+_ENUM_INDEXES = [i for i, column in enumerate(EXPORT_COLUMNS) if isinstance(column.type, SQLEnum)]
+_DATETIME_INDEXES = [i for i, column in enumerate(EXPORT_COLUMNS) if isinstance(column.type, DateTime)]
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# When a row last changed. last_modified is only set on update, so rows
+# never updated fall back to created_at. ix_drug_skus_changed_at indexes
+# exactly this expression.
+CHANGED_AT = func.coalesce(DrugSKU.last_modified, DrugSKU.created_at)
+
+
+def changed_since(since: datetime, dialect_name: str):
+    """Rows created or modified at or after ``since``.
+
+    The bound is inclusive because rows stamped by SQLite's
+    CURRENT_TIMESTAMP only have one-second resolution: re-sending a row is
+    harmless, missing one is not.
+    """
+    if dialect_name != "postgresql":
+        # SQLite stores naive UTC timestamps and compares them as text
+        since = _utc_naive(since)
+    return CHANGED_AT >= since
+
+
+def export_watermark() -> str:
+    """Clock reading to pass as ``since`` on the next pull.
+
+    Taken from the app's clock (models.utcnow), the one that stamps
+    created_at and last_modified, not the database's: comparing times from
+    two clocks would lose rows to any skew between them.
+    """
+    return utcnow().isoformat()
+
+
+def plain_row(row) -> list:
+    values = list(row)
+    for i in _ENUM_INDEXES:
+        if isinstance(values[i], Enum):
+            values[i] = values[i].value
+    for i in _DATETIME_INDEXES:
+        if values[i] is not None:
+            values[i] = values[i].isoformat()
+    return values
+
+
+def _ndjson_batch(rows) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_FIELDS, plain_row(row)))) + "\n" for row in rows)
+
+
+def _csv_batch(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(plain_row(row) for row in rows)
+    return buffer.getvalue()
+
+
+async def iter_export(
+    fmt: str = FORMAT_NDJSON,
+    since: Optional[datetime] = None,
+    compress: bool = False,
+    batch_size: int = EXPORT_BATCH_ROWS,
+) -> AsyncIterator[bytes]:
+    """Yield the encoded export, one chunk per batch of rows.
+
+    Opens its own session: the request's session is closed before a
+    streaming response body starts.
+    """
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    wrote_header = False
+
+    async with AsyncSessionLocal() as db:
+        query = select(*EXPORT_COLUMNS)
+        if since is None:
+            query = query.order_by(DrugSKU.id)
+        else:
+            # Change order lets the index drive both the filter and the sort
+            query = query.where(changed_since(since, db.bind.dialect.name)).order_by(CHANGED_AT, DrugSKU.id)
+
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            if fmt == FORMAT_CSV:
+                chunk = _csv_batch(rows, header=not wrote_header)
+                wrote_header = True
+            else:
+                chunk = _ndjson_batch(rows)
+            data = chunk.encode()
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+    if fmt == FORMAT_CSV and not wrote_header:
+        # Empty export: still a valid CSV file
+        data = _csv_batch([], header=True).encode()
+        yield compressor.compress(data) if compressor else data
+    if compressor:
+        yield compressor.flush()
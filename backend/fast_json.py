@@ -0,0 +1,105 @@
+"""Fast JSON encoding for SKU listings.
+
+Search pages used to be built from ORM objects, each validated through
+``SKUResponse`` and then JSON-encoded. On large pages that took most of
+the request's CPU time. Here the query selects only the response's
+columns as plain tuples and orjson encodes them directly. The output is
+the same JSON that SKUResponse produces.
+
+Listings also take sparse fieldsets. ``fields=ndc,name,status``, or a
+named set such as ``fields=summary``, narrows both the SELECT and the
+payload.
+
+orjson is optional. Without it the stdlib encoder is used, which is
+slower but produces the same output.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+import json
+
+from models import DrugSKU
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Same fields, in the same order, as main.SKUResponse
+SKU_RESPONSE_FIELDS = (
+    "id", "ndc", "name", "manufacturer", "dosage_form", "strength", "package_size",
+    "status", "gtin", "image_url", "created_at", "last_modified",
+)
+
+# Named fieldsets for common views; "summary" matches main.SKUSummary
+FIELD_SETS = {
+    "summary": ("id", "ndc", "name", "status"),
+}
+
+
+def sku_columns(fields: Sequence[str]) -> list:
+    return [getattr(DrugSKU, field) for field in fields]
+
+
+SKU_RESPONSE_COLUMNS = sku_columns(SKU_RESPONSE_FIELDS)
+
+
+def parse_fields(fields: Optional[str]) -> tuple:
+    """``fields`` query parameter -> response fields in canonical order.
+
+    id is always included. Unknown names are a 400.
+    """
+    if not fields:
+        return SKU_RESPONSE_FIELDS
+    if fields in FIELD_SETS:
+        return FIELD_SETS[fields]
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sorted(requested.difference(SKU_RESPONSE_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}; expected a subset of "
+            f"{', '.join(SKU_RESPONSE_FIELDS)} or one of: {', '.join(FIELD_SETS)}",
+        )
+    return tuple(field for field in SKU_RESPONSE_FIELDS if field == "id" or field in requested)
+
+# pydantic writes UTC as "Z"; OPT_UTC_Z makes orjson do the same
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        if value.tzinfo is not None and value.utcoffset() == timedelta(0):
+            text = text[:-6] + "Z"
+        return text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+    # SKUStatus is a str enum, so json writes its value
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def sku_items(rows: Sequence, fields: Sequence[str] = SKU_RESPONSE_FIELDS) -> List[Dict[str, Any]]:
+    """Rows selected with sku_columns(fields) -> SKUResponse-shaped dicts.
+
+    Columns after the last field, such as sort keys selected only for the
+    cursor, are left out.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes with orjson when it is installed.
+
+    Return it directly from a route. FastAPI skips response_model
+    validation for Response objects, but keeps response_model for the
+    OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
@@ -0,0 +1,96 @@
+"""Leveled, sampled, structured logging for the API.
+
+log_event() writes one record per event with its fields attached. Below
+WARNING, only a LOG_SAMPLE_RATE fraction of events is kept, so per-request
+debug lines can stay on in production without costing every request.
+Records go through a QueueHandler and a listener thread writes them out,
+so the event loop never blocks on stderr.
+
+LOG_LEVEL: root level (default INFO)
+LOG_FORMAT: "json" (one object per line) or "text" (default)
+LOG_SAMPLE_RATE: fraction of sub-WARNING events kept (default 0.01)
+"""
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.01))
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends a record's ``fields`` as key=value pairs, or emits JSON"""
+
+    def __init__(self, as_json: bool = False):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if not self.as_json:
+            line = super().format(record)
+            if fields:
+                line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+            return line
+
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **fields,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _LocalQueueHandler(QueueHandler):
+    """QueueHandler for a listener in the same process.
+
+    The stock prepare() formats the record, folding the traceback into
+    the message for pickling. This one only resolves the message, so the
+    formatter still sees exc_info and ``fields``.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def log_event(logger: logging.Logger, level: int, event: str, sampled: bool = True, **fields: Any):
+    """Log ``event`` with ``fields``; sub-WARNING events are sampled"""
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and level < logging.WARNING and random.random() >= LOG_SAMPLE_RATE:
+        return
+    logger.log(level, event, extra={"fields": fields})
+
+
+def configure_logging():
+    """Route the root logger through a background writer thread (once)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(as_json=LOG_FORMAT == "json"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(_LocalQueueHandler(records))
+    root.setLevel(LOG_LEVEL)
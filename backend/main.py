@@ -1,17 +1,48 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, status
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, BackgroundTasks, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, sessionmaker
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from datetime import datetime
-import os
-import sqlite3
+import asyncio
 import io
-import re
-from PIL import Image
-import pytesseract
-from models import DrugSKU, SKUStatus, engine, init_db
+import json
+import logging
+import time
+import zipfile
+from models import DrugSKU, SKUStatus, AsyncSessionLocal, async_engine, bump_catalog_version, engine, init_db
+from search_index import substring_filter
+from duplicates import MATCH_EXACT, MATCH_FUZZY, iter_duplicate_groups
+from pagination import sort_columns, encode_cursor, decode_cursor, keyset_filter, count_rows, estimate_count
+from ocr import (
+    OCR_BATCH_MAX_IMAGES, OCRWorkerPool, OCRPoolSaturated, UnreadableImage, is_archive, iter_archive_images,
+    read_batch_image,
+)
+from ocr_cache import OCRResultCache
+from uploads import UPLOAD_MAX_BYTES, make_thumbnail, save_upload, thumbnail_name
+from bulk_import import MODE_SKIP, BulkImportError, import_file
+from conditional import catalog_version, is_not_modified, not_modified, search_etag, set_validators, sku_validators
+from sku_cache import SKU_CACHE_MAX_PAGE_SIZE, create_cache
+from fast_json import SKU_RESPONSE_FIELDS, FastJSONResponse, parse_fields, sku_columns, sku_items
+from bulk_status import NO_VERSION, OUTCOME_UPDATED, transition_status
+from change_feed import (
+    CHANGE_FEED_BATCH, OP_CREATE, OP_DELETE, OP_UPDATE,
+    ChangeNotifier, fetch_changes, is_gap, iter_change_events, log_bounds, prune_change_log, prune_periodically,
+    record_change, restart_offset,
+)
+from suggest_index import SUGGEST_INDEX_ENABLED, SUGGEST_MAX_LIMIT, SuggestIndex
+from db_pool import pool_stats
+from logging_config import configure_logging, log_event
+from query_audit import QUERY_AUDIT, QueryAuditMiddleware, install_query_audit
+from metrics import MetricsMiddleware, StatsCollector, instrument_engine, observe_ocr, register_collector, render_metrics
+from export import FORMATS as EXPORT_FORMATS, MEDIA_TYPES as EXPORT_MEDIA_TYPES, export_watermark, iter_export
 from pydantic import BaseModel
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Drug SKU Management API")
 
 # Enable CORS
@@ -23,24 +54,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Per-route latency histograms and per-request query counts (GET /metrics)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine, "async")
+
+# Development only: log likely N+1s and slow queries with their plans
+if QUERY_AUDIT:
+    app.add_middleware(QueryAuditMiddleware)
+    install_query_audit(engine)
+    install_query_audit(async_engine)
+
+# OCR runs in worker processes, never on the event loop, and repeat
+# uploads of the same image are served from the result cache
+ocr_pool = OCRWorkerPool(cache=OCRResultCache())
+
+# Read-through cache for single SKUs and first search pages
+sku_cache = create_cache()
+
+# Wakes change-feed streams when a write commits
+change_notifier = ChangeNotifier()
+
+# Prefix index for /api/skus/suggest, kept current from the change log
+suggest_index = SuggestIndex()
+suggest_follower = None
+change_log_pruner = None
+
+# Cache hit rates and pool waits, read at scrape time
+register_collector(StatsCollector(sku_cache.stats, lambda: ocr_pool.cache.counters, pool_stats))
 
 # Initialize database
 init_db()
 
-# Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
+# Async database dependency used by the API routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
+    global suggest_follower, change_log_pruner
     init_db()
+    prune_change_log(engine)
+    change_log_pruner = asyncio.create_task(prune_periodically(engine))
+    if SUGGEST_INDEX_ENABLED:
+        await run_in_threadpool(suggest_index.build, engine)
+        suggest_follower = asyncio.create_task(suggest_index.follow(change_notifier))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    ocr_pool.shutdown()
+    await sku_cache.close()
+    if suggest_follower is not None:
+        suggest_follower.cancel()
+    if change_log_pruner is not None:
+        change_log_pruner.cancel()
+    # Pooled aiosqlite connections each hold a non-daemon thread that
+    # would keep the worker from exiting
+    await async_engine.dispose()
+    engine.dispose()
 
 # Pydantic Models for API
 class SKUSearchCriteria(BaseModel):
@@ -72,10 +145,18 @@ class SKUResponse(BaseModel):
     gtin: Optional[str] = None
     image_url: Optional[str] = None
     created_at: Optional[datetime] = None
+    last_modified: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class SKUSummary(BaseModel):
+    """Slim list / autocomplete row, returned for fields=summary"""
+    id: int
+    ndc: Optional[str] = None
+    name: str
+    status: str
+
 class SKUCreate(BaseModel):
     ndc: str
     name: str
@@ -88,144 +169,428 @@ class SKUCreate(BaseModel):
 
 class SKUSearchResponse(BaseModel):
     items: List[SKUResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class SKUSummarySearchResponse(BaseModel):
+    items: List[SKUSummary]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class SKUVersion(BaseModel):
+    id: int
+    # Omit to skip the concurrency check for this SKU; null means never modified
+    last_modified: Optional[datetime] = None
+
+class SKUBulkStatusUpdate(BaseModel):
+    status: SKUStatus
+    # Exactly one of ids, items (ids with the last_modified the client saw) or filter
+    ids: Optional[List[int]] = None
+    items: Optional[List[SKUVersion]] = None
+    filter: Optional[SKUSearchCriteria] = None
+    # Only move SKUs currently in this status
+    from_status: Optional[SKUStatus] = None
+    # With filter: skip SKUs modified after this time
+    as_of: Optional[datetime] = None
+    reviewed_by: Optional[str] = None
+
+class SKUStatusOutcome(BaseModel):
+    id: int
+    outcome: str
+    status: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+class SKUBulkStatusResponse(BaseModel):
+    status: str
+    requested: int
+    updated: int
+    results: List[SKUStatusOutcome]
+
+class DuplicateRecord(BaseModel):
+    id: int
+    ndc: Optional[str] = None
+    name: str
+    manufacturer: str
+    dosage_form: str
+    strength: str
+    package_size: str
+    gtin: Optional[str] = None
+    status: str
+    created_at: Optional[datetime] = None
+    last_modified: Optional[datetime] = None
+    created_by: Optional[str] = None
+    reviewed_by: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 class DuplicateGroup(BaseModel):
-    ndc: str
+    ndc: Optional[str] = None
     name: str
-    records: List[dict]
+    records: List[DuplicateRecord]
 
 # Routes
 @app.get("/api/skus/duplicates", response_model=List[DuplicateGroup])
-def find_duplicate_skus(db: Session = Depends(get_db)):
-    # Import func from SQLAlchemy
-    from sqlalchemy import func
-    
-    # First, find which names have duplicates
-    name_counts = db.query(DrugSKU.name, func.count("*").label("count")) \
-        .group_by(DrugSKU.name) \
-        .having(func.count("*") > 1) \
-        .all()
+async def find_duplicate_skus(
+    match: str = MATCH_EXACT,
+    page: int = 0,
+    pageSize: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List groups of SKUs that look like duplicates.
+
+    ``match=exact`` groups by identical name; ``match=fuzzy`` groups by
+    normalized name + strength + manufacturer. ``page``/``pageSize`` page
+    over groups rather than rows; omitting ``pageSize`` returns all groups.
+    """
+    if match not in (MATCH_EXACT, MATCH_FUZZY):
+        raise HTTPException(status_code=400, detail=f"Invalid match mode '{match}', expected 'exact' or 'fuzzy'")
     
-    if not name_counts:
-        return []
-        
-    # For each duplicate name, get the full records
-    duplicate_groups = []
-    for name_info in name_counts:
-        name = name_info.name
-        records = db.query(DrugSKU).filter(DrugSKU.name == name).all()
-        
-        # Convert to dictionary representation for response
-        records_dict = []
-        for record in records:
-            records_dict.append({
-                "id": record.id,
-                "ndc": record.ndc,
-                "name": record.name,
-                "manufacturer": record.manufacturer,
-                "dosage_form": record.dosage_form,
-                "strength": record.strength,
-                "package_size": record.package_size,
-                "gtin": record.gtin,
-                "status": record.status,
-                "created_at": record.created_at.isoformat() if record.created_at else None,
-                "last_modified": record.last_modified.isoformat() if record.last_modified else None,
-                "created_by": record.created_by,
-                "reviewed_by": record.reviewed_by
-            })
-            
-        # Use the first record's NDC for the group
-        duplicate_groups.append({
-            "ndc": records[0].ndc,
-            "name": name,
-            "records": records_dict
-        })
+    return [
+        DuplicateGroup(
+            # Use the first record's NDC for the group
+            ndc=records[0].ndc,
+            name=records[0].name,
+            records=records,
+        )
+        async for _, records in iter_duplicate_groups(db, match, page, pageSize)
+    ]
+
+@app.get("/api/skus/export")
+async def export_skus(
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    gzip: bool = False,
+):
+    """Stream the whole catalog (or rows changed after ``since``) as NDJSON or CSV.
+
+    Full exports are in id order; incremental ones in the order rows changed.
+
+    The ``X-Export-Watermark`` header carries the time at the start of the
+    export; pass it as ``since`` for the next incremental pull.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}', expected 'ndjson' or 'csv'")
     
-    return duplicate_groups
+    filename = f"skus-export.{format}" + (".gz" if gzip else "")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Export-Watermark": export_watermark(),
+    }
+    return StreamingResponse(
+        iter_export(format, since, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
 
-@app.get("/api/skus/{sku_id}", response_model=SKUResponse)
-async def get_sku(sku_id: str, db: Session = Depends(get_db)):
-    sku = db.query(DrugSKU).filter(DrugSKU.id == sku_id).first()
+@app.get("/api/skus/changes")
+async def list_changes(since: int = 0, limit: int = CHANGE_FEED_BATCH, db: AsyncSession = Depends(get_async_db)):
+    """Changes after offset ``since``, oldest first; poll again from ``next_offset``.
+
+    ``reset`` is true when the log cannot continue from ``since``: changes
+    after it were already pruned, or it is past the newest change. Reload
+    the catalog, then continue from ``next_offset``.
+    """
+    oldest, latest = await log_bounds(db)
+    reset = is_gap(since, oldest, latest)
+    if reset:
+        since = restart_offset(oldest)
+    changes = await fetch_changes(db, since, max(1, min(limit, CHANGE_FEED_BATCH)))
+    return {
+        "changes": changes,
+        "next_offset": changes[-1]["offset"] if changes else max(since, latest or 0),
+        "reset": reset,
+    }
+
+@app.get("/api/skus/changes/stream")
+async def stream_changes(request: Request, since: Optional[int] = None):
+    """Server-Sent Events feed of SKU changes.
+
+    Starts after ``since``, the ``Last-Event-ID`` of a reconnecting
+    EventSource, or (with neither) at the current end of the log. Event
+    types are create, update and delete, plus ready and reset (see
+    change_feed.py); each event's id is its offset.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        iter_change_events(since, change_notifier),
+        media_type="text/event-stream",
+        # Stop proxies such as nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/skus/suggest")
+async def suggest_skus(q: str, limit: int = 10, status: Optional[str] = None):
+    """Typeahead: up to ``limit`` SKUs whose name (or a word in it), NDC or
+    manufacturer starts with ``q``, best matches first.
+
+    Served from the in-memory prefix index, never the database. Writes
+    show up once the index has read them from the change log.
+    """
+    if not suggest_index.ready:
+        raise HTTPException(status_code=503, detail="Suggest index is not available")
+    return {"items": suggest_index.suggest(q, max(1, min(limit, SUGGEST_MAX_LIMIT)), status)}
+
+@app.get("/api/skus/suggest/stats")
+async def suggest_index_stats():
+    """Size, memory footprint and change-log position of the suggest index"""
+    return suggest_index.stats()
+
+async def get_sku_or_404(db: AsyncSession, sku_id: str) -> DrugSKU:
+    # IDs arrive as path strings; asyncpg will not coerce them to integers
+    try:
+        sku = await db.get(DrugSKU, int(sku_id))
+    except ValueError:
+        sku = None
     if not sku:
         raise HTTPException(status_code=404, detail="SKU not found")
     return sku
 
-@app.get("/api/skus", response_model=SKUSearchResponse)
+@app.get("/api/skus/{sku_id}", response_model=SKUResponse)
+async def get_sku(
+    sku_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Fetch one SKU. Honors If-None-Match / If-Modified-Since with 304.
+
+    ``fields`` (e.g. ``ndc,name,status`` or ``summary``) trims the payload.
+    """
+    fields = parse_fields(fields)
+    if not sku_id.isdigit():
+        return await get_sku_or_404(db, sku_id)
+    
+    # Cache hits never check out a database connection
+    cache_key, sku = await sku_cache.get_sku(int(sku_id))
+    if sku is None:
+        sku = SKUResponse.model_validate(await get_sku_or_404(db, sku_id)).model_dump(mode="json")
+        await sku_cache.set_sku(cache_key, sku)
+    
+    etag, last_modified = sku_validators(sku)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    if fields != SKU_RESPONSE_FIELDS:
+        # The cached entry is the full SKU; project it rather than caching views
+        sparse = FastJSONResponse({field: sku[field] for field in fields})
+        set_validators(sparse, etag, last_modified)
+        return sparse
+    set_validators(response, etag, last_modified)
+    return sku
+
+def sku_search_filters(ndc=None, name=None, manufacturer=None, status=None) -> list:
+    log_event(logger, logging.DEBUG, "sku search filters", ndc=ndc, name=name, manufacturer=manufacturer, status=status)
+    filters = []
+    if ndc:
+        filters.append(substring_filter(DrugSKU.ndc, ndc))
+    if name:
+        filters.append(substring_filter(DrugSKU.name, name, case_sensitive=False))
+    if manufacturer:
+        filters.append(substring_filter(DrugSKU.manufacturer, manufacturer))
+    if status:
+        filters.append(DrugSKU.status == status)
+    return filters
+
+@app.get("/api/skus", response_model=Union[SKUSearchResponse, SKUSummarySearchResponse])
 async def search_skus(
+    request: Request,
     ndc: Optional[str] = None,
     name: Optional[str] = None,
     manufacturer: Optional[str] = None,
     status: Optional[str] = None,
     page: int = 0,
     pageSize: int = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    include_total: bool = True,
+    estimate_total: bool = False,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(DrugSKU)
+    """Search SKUs with offset (page) or keyset (cursor) pagination.
+
+    Passing ``cursor`` (empty for the first page) switches to keyset mode,
+    where ``page`` is ignored and each page costs the same regardless of
+    depth. ``next_cursor`` is set whenever more rows follow. The ETag is
+    the catalog version, so polling with If-None-Match gets a 304 until
+    any SKU changes.
+
+    Rows are selected as column tuples and encoded straight to JSON (see
+    fast_json.py). response_model only documents the shape. ``fields``
+    (e.g. ``ndc,name,status`` or ``summary``) selects only those columns,
+    always including id.
+    """
+    columns = sort_columns(sort)
+    fields = parse_fields(fields)
     
-    if ndc:
-        print(f"Filtering by NDC: {ndc}")
-        query = query.filter(DrugSKU.ndc.contains(ndc))
-    if name:
-        print(f"Filtering by name: {name}")
-        query = query.filter(DrugSKU.name.ilike(f"%{name}%"))
-    if manufacturer:
-        print(f"Filtering by manufacturer: {manufacturer}")
-        query = query.filter(DrugSKU.manufacturer.contains(manufacturer))
-    if status:
-        print(f"Filtering by status: {status}")
-        query = query.filter(DrugSKU.status == status)
+    version = await catalog_version(db)
+    etag = search_etag(version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    # First pages of common filters are served from the cache. Keying on
+    # the catalog version keeps every worker from serving older pages.
+    cache_key = None
+    if page == 0 and not cursor and pageSize <= SKU_CACHE_MAX_PAGE_SIZE:
+        cache_key, cached = await sku_cache.get_search(dict(
+            ndc=ndc, name=name, manufacturer=manufacturer, status=status, pageSize=pageSize,
+            sort=sort, include_total=include_total, estimate_total=estimate_total, version=version,
+            fields=fields,
+        ))
+        if cached is not None:
+            # Cached as encoded JSON text, so a hit skips encoding too
+            cached_response = Response(content=cached, media_type="application/json")
+            set_validators(cached_response, etag)
+            return cached_response
     
-    total = query.count()
-    skus = query.offset(page * pageSize).limit(pageSize).all()
+    # Sort keys the projection leaves out are still selected for the cursor
+    selected = sku_columns(fields) + [column for column in columns if column.key not in fields]
+    query = select(*selected).where(*sku_search_filters(ndc, name, manufacturer, status))
     
-    return SKUSearchResponse(items=skus, total=total)
+    total = None
+    if include_total:
+        total = await (estimate_count(db, query) if estimate_total else count_rows(db, query))
+    
+    page_query = query.order_by(*columns)
+    if cursor is not None:
+        if cursor:
+            page_query = page_query.where(keyset_filter(columns, decode_cursor(cursor, sort)))
+    else:
+        page_query = page_query.offset(page * pageSize)
+    
+    # Fetch one extra row to learn whether another page follows
+    rows = (await db.execute(page_query.limit(pageSize + 1))).all()
+    skus = rows[:pageSize]
+    next_cursor = encode_cursor(sort, skus[-1]) if skus and len(rows) > pageSize else None
+    
+    response = FastJSONResponse({"items": sku_items(skus, fields), "total": total, "next_cursor": next_cursor})
+    set_validators(response, etag)
+    if cache_key is not None:
+        await sku_cache.set_search(cache_key, response.body.decode())
+    return response
+
+async def commit_sku_write(db: AsyncSession, sku_id: int, op: str):
+    """Commit a single-SKU write together with its change-log row, then
+    invalidate caches and wake change-feed streams."""
+    # The catalog_version row lock serializes writers, so taking it before
+    # the change row gets its id keeps feed offsets in commit order
+    await db.execute(bump_catalog_version())
+    await db.execute(record_change(sku_id, op))
+    await db.commit()
+    await sku_cache.invalidate_sku(sku_id)
+    change_notifier.notify()
 
 @app.post("/api/skus", response_model=SKUResponse)
-async def create_sku(sku_data: SKUCreate, db: Session = Depends(get_db)):
-    # Debug log
-    print(f"Received SKU data: {sku_data}")
+async def create_sku(sku_data: SKUCreate, db: AsyncSession = Depends(get_async_db)):
+    log_event(logger, logging.DEBUG, "create sku", ndc=sku_data.ndc, name=sku_data.name, status=sku_data.status)
     
     # Check if SKU already exists
-    existing = db.query(DrugSKU).filter(DrugSKU.ndc == sku_data.ndc).first()
+    existing = await db.scalar(select(DrugSKU.id).where(DrugSKU.ndc == sku_data.ndc))
     if existing:
         raise HTTPException(status_code=400, detail="SKU with this NDC already exists")
     
     try:
         # Use model_dump instead of deprecated dict method
         sku_dict = sku_data.model_dump(exclude_unset=False)
-        print(f"Converting to model: {sku_dict}")
         
         # Create new SKU instance
         sku = DrugSKU(**sku_dict)
         db.add(sku)
-        db.commit()
-        db.refresh(sku)
+        await db.flush()
+        await commit_sku_write(db, sku.id, OP_CREATE)
+        await db.refresh(sku)
         return sku
     except Exception as e:
-        db.rollback()
-        print(f"Error creating SKU: {str(e)}")
+        await db.rollback()
+        log_event(logger, logging.WARNING, "create sku failed", sampled=False, ndc=sku_data.ndc, error=str(e))
         raise HTTPException(status_code=400, detail=f"Error creating SKU: {str(e)}")
 
+@app.post("/api/skus/import")
+async def import_skus(file: UploadFile = File(...), format: Optional[str] = None, mode: str = MODE_SKIP):
+    """Bulk-load SKUs from a CSV, NDJSON or Parquet file (optionally .gz).
+
+    ``mode=skip`` leaves SKUs whose NDC already exists untouched and reports
+    them; ``mode=upsert`` overwrites them as PUT would, keeping image_url.
+    The response counts inserted,
+    updated, skipped and failed rows, lists per-row errors and gives the
+    throughput in rows/sec.
+    """
+    try:
+        # Chunked COPY/executemany on the sync engine, off the event loop
+        return await run_in_threadpool(import_file, engine, file.file, file.filename, format, mode)
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # Chunks commit as they go, so even a failed import may have written rows
+        await sku_cache.invalidate_all()
+        change_notifier.notify()
+
+@app.patch("/api/skus", response_model=SKUBulkStatusResponse)
+async def bulk_update_status(request: SKUBulkStatusUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Move many SKUs to a new status in one set-based UPDATE.
+
+    Target SKUs by ``ids``, by ``items`` (IDs plus the ``last_modified``
+    the client last saw) or by a search ``filter`` (optionally guarded by
+    ``as_of``). Each SKU gets an outcome: updated, unchanged, not_found,
+    conflict (changed since the client looked) or status_mismatch (not in
+    ``from_status``). Only updated SKUs are written.
+    """
+    selectors = [request.ids is not None, request.items is not None, request.filter is not None]
+    if sum(selectors) != 1:
+        raise HTTPException(status_code=400, detail="Pass exactly one of ids, items or filter")
+    
+    versions = {}
+    filters = []
+    if request.items is not None:
+        for item in request.items:
+            given = "last_modified" in item.model_fields_set
+            versions[item.id] = item.last_modified if given else NO_VERSION
+    elif request.ids is not None:
+        versions = dict.fromkeys(request.ids, NO_VERSION)
+    else:
+        filters = sku_search_filters(**request.filter.model_dump())
+        if not filters:
+            raise HTTPException(status_code=400, detail="Filter must set at least one criterion")
+    
+    if (request.ids is not None or request.items is not None) and not versions:
+        raise HTTPException(status_code=400, detail="No SKU ids given")
+    
+    results = await transition_status(
+        db,
+        request.status,
+        versions,
+        filters=filters,
+        from_status=request.from_status,
+        as_of=request.as_of,
+        reviewed_by=request.reviewed_by,
+    )
+    await sku_cache.invalidate_all()
+    change_notifier.notify()
+    return SKUBulkStatusResponse(
+        status=request.status.value,
+        requested=len(results),
+        updated=sum(1 for result in results if result["outcome"] == OUTCOME_UPDATED),
+        results=results,
+    )
+
 @app.put("/api/skus/{sku_id}", response_model=SKUResponse)
-async def update_sku(sku_id: str, sku_data: SKUCreate, db: Session = Depends(get_db)):
-    sku = db.query(DrugSKU).filter(DrugSKU.id == sku_id).first()
-    if not sku:
-        raise HTTPException(status_code=404, detail="SKU not found")
+async def update_sku(sku_id: str, sku_data: SKUCreate, db: AsyncSession = Depends(get_async_db)):
+    sku = await get_sku_or_404(db, sku_id)
     
     for key, value in sku_data.dict().items():
         if hasattr(sku, key):
             setattr(sku, key, value)
     
-    db.commit()
-    db.refresh(sku)
+    await commit_sku_write(db, sku.id, OP_UPDATE)
+    await db.refresh(sku)
     return sku
 
 @app.patch("/api/skus/{sku_id}", response_model=SKUResponse)
-async def partial_update_sku(sku_id: str, sku_data: SKUUpdate, db: Session = Depends(get_db)):
-    sku = db.query(DrugSKU).filter(DrugSKU.id == sku_id).first()
-    if not sku:
-        raise HTTPException(status_code=404, detail="SKU not found")
+async def partial_update_sku(sku_id: str, sku_data: SKUUpdate, db: AsyncSession = Depends(get_async_db)):
+    sku = await get_sku_or_404(db, sku_id)
     
     # Only update fields that are provided
     update_data = sku_data.model_dump(exclude_unset=True)
@@ -233,126 +598,152 @@ async def partial_update_sku(sku_id: str, sku_data: SKUUpdate, db: Session = Dep
         if hasattr(sku, key):
             setattr(sku, key, value)
     
-    db.commit()
-    db.refresh(sku)
+    await commit_sku_write(db, sku.id, OP_UPDATE)
+    await db.refresh(sku)
     return sku
 
 @app.delete("/api/skus/{sku_id}")
-async def delete_sku(sku_id: str, db: Session = Depends(get_db)):
-    sku = db.query(DrugSKU).filter(DrugSKU.id == sku_id).first()
-    if not sku:
-        raise HTTPException(status_code=404, detail="SKU not found")
+async def delete_sku(sku_id: str, db: AsyncSession = Depends(get_async_db)):
+    sku = await get_sku_or_404(db, sku_id)
     
-    db.delete(sku)
-    db.commit()
+    await db.delete(sku)
+    await commit_sku_write(db, sku.id, OP_DELETE)
     return {"message": "SKU deleted successfully"}
 
+@app.get("/api/cache/stats")
+async def sku_cache_stats():
+    """Hit rates of the SKU/search read-through cache"""
+    return sku_cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint (see metrics.py). Sync, so rendering runs off the event loop."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/api/db/pool/stats")
+async def db_pool_stats():
+    """Connection pool occupancy and checkout wait times, per engine"""
+    return pool_stats()
+
 @app.post("/api/upload")
-async def upload_image(file: UploadFile = File(...)):
-    # Create uploads directory if it doesn't exist
-    os.makedirs("uploads", exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join("uploads", filename)
+async def upload_image(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    # Stream to disk under the content hash; identical images share a file
+    filename, sha256, size, duplicate = await save_upload(file)
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Generate the list-view thumbnail after responding
+    background_tasks.add_task(make_thumbnail, filename)
     
     # Return the URL
-    return {"imageUrl": f"/uploads/{filename}"}
+    return {
+        "imageUrl": f"/uploads/{filename}",
+        "thumbnailUrl": f"/uploads/thumbs/{thumbnail_name(filename)}",
+        "sha256": sha256,
+        "size": size,
+        "duplicate": duplicate,
+    }
 
 @app.post("/api/extract-ocr")
 async def extract_text_from_image(file: UploadFile = File(...)):
     """Extract text and structured data from uploaded image using OCR"""
+    # Read image data
+    contents = await file.read()
+    
     try:
-        # Read image data
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        
-        # Perform OCR
-        extracted_text = pytesseract.image_to_string(image)
-        
-        # Parse OCR text to extract SKU information
-        sku_data = parse_sku_from_text(extracted_text)
-        
-        return {
-            "success": True,
-            "extracted_text": extracted_text,
-            "sku_data": sku_data,
-            "confidence": calculate_ocr_confidence(sku_data)
-        }
+        # Decode, OCR and parse in a worker process
+        result = await ocr_pool.submit(contents)
+        observe_ocr(result)
+    except OCRPoolSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"OCR is busy, retry shortly: {str(e)}",
+            headers={"Retry-After": "2"},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
-
-def parse_sku_from_text(text: str) -> Dict[str, Any]:
-    """Parse OCR text to extract SKU information"""
-    sku_data = {
-        "ndc": "",
-        "name": "",
-        "manufacturer": "",
-        "dosage_form": "",
-        "strength": "",
-        "package_size": ""
-    }
-    
-    lines = text.split('\n')
-    text_upper = text.upper()
-    
-    # Extract NDC (National Drug Code) - format: 12345-123-12 or similar
-    ndc_pattern = r'\b\d{4,5}-\d{2,4}-\d{1,2}\b'
-    ndc_match = re.search(ndc_pattern, text)
-    if ndc_match:
-        sku_data["ndc"] = ndc_match.group()
-    
-    # Extract dosage forms
-    dosage_forms = ["TABLET", "CAPSULE", "INJECTION", "SOLUTION", "CREAM", "OINTMENT", "DROPS", "SYRUP"]
-    for form in dosage_forms:
-        if form in text_upper:
-            sku_data["dosage_form"] = form.lower()
-            break
     
-    # Extract strength (mg, mcg, etc.)
-    strength_pattern = r'\b\d+\.?\d*\s?(mg|mcg|g|ml|%)\b'
-    strength_match = re.search(strength_pattern, text, re.IGNORECASE)
-    if strength_match:
-        sku_data["strength"] = strength_match.group()
+    return {"success": True, **result}
+
+@app.get("/api/extract-ocr/cache")
+async def ocr_cache_stats():
+    """Hit/miss counters and occupancy of the OCR result cache"""
+    return ocr_pool.cache.stats()
+
+@app.post("/api/extract-ocr/batch")
+async def extract_text_from_images(files: List[UploadFile] = File(...)):
+    """OCR many label images in parallel, streaming NDJSON results.
+
+    Accepts any mix of images and zip archives of images. One JSON line is
+    written per image as soon as it finishes (so lines arrive out of
+    order; use ``index``), followed by a final ``summary`` line.
+    """
+    if ocr_pool.saturated:
+        raise HTTPException(status_code=503, detail="OCR is busy, retry shortly", headers={"Retry-After": "5"})
     
-    # Extract manufacturer - look for common pharma company patterns
-    manufacturers = ["PFIZER", "MERCK", "ABBOTT", "NOVARTIS", "ROCHE", "GSK", "BRISTOL", "JOHNSON", "TEVA"]
-    for mfg in manufacturers:
-        if mfg in text_upper:
-            sku_data["manufacturer"] = mfg.title()
-            break
+    # FastAPI closes the form as soon as this handler returns, before the
+    # stream below runs, so take over each upload's spooled file (kept on
+    # disk past 1 MB) and leave a dummy to be closed. Images are read one
+    # at a time as workers free up; archives only have their directory
+    # read here, and members stay compressed until their turn.
+    handles = []
+    sources = []
+    try:
+        for upload in files:
+            handle, upload.file = upload.file, io.BytesIO()
+            handles.append(handle)
+            if is_archive(upload.filename, handle):
+                try:
+                    sources.extend(iter_archive_images(handle))
+                except zipfile.BadZipFile as e:
+                    raise HTTPException(status_code=400, detail=f"Invalid zip archive {upload.filename}: {str(e)}")
+            else:
+                sources.append((upload.filename, None, handle))
+        
+        if not sources:
+            raise HTTPException(status_code=400, detail="No images found in upload")
+        if len(sources) > OCR_BATCH_MAX_IMAGES:
+            raise HTTPException(status_code=413, detail=f"Batch has {len(sources)} images, limit is {OCR_BATCH_MAX_IMAGES}")
+    except BaseException:
+        for handle in handles:
+            handle.close()
+        raise
     
-    # Extract product name - usually the longest capitalized phrase
-    words = text.split()
-    potential_names = []
-    for i, word in enumerate(words):
-        if word.isupper() and len(word) > 3:
-            # Look for consecutive uppercase words
-            name_parts = [word]
-            j = i + 1
-            while j < len(words) and (words[j].isupper() or words[j].isdigit()):
-                name_parts.append(words[j])
-                j += 1
-            if len(name_parts) >= 2:
-                potential_names.append(" ".join(name_parts))
+    async def jobs():
+        for index, (filename, archive, source) in enumerate(sources):
+            try:
+                contents = await run_in_threadpool(read_batch_image, archive, source, UPLOAD_MAX_BYTES)
+            except UnreadableImage as e:
+                # Reported on its own line; the rest of the batch carries on
+                contents = e
+            yield (index, filename), contents
     
-    if potential_names:
-        # Choose the longest name that's not a manufacturer
-        sku_data["name"] = max(potential_names, key=len)
+    async def results():
+        started = time.perf_counter()
+        succeeded = 0
+        try:
+            async for (index, filename), result, error in ocr_pool.map_unordered(jobs()):
+                line = {"index": index, "filename": filename}
+                if error is None:
+                    succeeded += 1
+                    observe_ocr(result)
+                    line.update(success=True, **result)
+                elif isinstance(error, UnreadableImage):
+                    line.update(success=False, error=str(error))
+                else:
+                    line.update(success=False, error=f"OCR processing failed: {str(error)}")
+                yield json.dumps(line) + "\n"
+        finally:
+            for handle in handles:
+                handle.close()
+        
+        yield json.dumps({"summary": {
+            "images": len(sources),
+            "succeeded": succeeded,
+            "failed": len(sources) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }}) + "\n"
     
-    return sku_data
-
-def calculate_ocr_confidence(sku_data: Dict[str, Any]) -> float:
-    """Calculate confidence score based on extracted data completeness"""
-    filled_fields = sum(1 for value in sku_data.values() if value and value.strip())
-    total_fields = len(sku_data)
-    return filled_fields / total_fields
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
     import uvicorn
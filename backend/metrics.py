@@ -0,0 +1,221 @@
+"""Prometheus metrics for the API, served at GET /metrics.
+
+- Request latency per route template (not per raw path, so ids and
+  query strings do not blow up the label space), plus the number of
+  queries and the database time each request took.
+- Query count and time per engine, from SQLAlchemy cursor events.
+- OCR stage timings, taken from the timings each result already carries.
+- Cache hit rates and connection pool waits, read from the existing
+  stats() counters at scrape time rather than updated per request.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory so the histograms and counters are aggregated across workers.
+The scrape-time collectors only report the worker that answers the scrape.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from sqlalchemy import event
+
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# Seconds; the API's reads sit around a millisecond, OCR takes seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+OCR_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to answer a request, by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request",
+    ["method", "route"], buckets=QUERIES_PER_REQUEST_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["engine"])
+DB_QUERY_TIME = Histogram(
+    "db_query_duration_seconds", "Time to execute one SQL statement", ["engine"], buckets=QUERY_BUCKETS,
+)
+OCR_STAGE_TIME = Histogram(
+    "ocr_stage_duration_seconds", "Time spent in each OCR pipeline stage", ["stage"], buckets=OCR_BUCKETS,
+)
+OCR_RESULTS = Counter("ocr_results_total", "OCR results returned, by source", ["source"])
+
+
+class RequestStats:
+    """Per-request query counters, shared through a context variable"""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Plain ASGI rather than BaseHTTPMiddleware, which would buffer
+    streamed exports and add a task per request. For streamed responses
+    the time covers the whole body, so the SSE change feed records
+    the length of each connection.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            # FastAPI stores the matched route in the scope while routing
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, template, str(status[0])).observe(elapsed)
+            REQUEST_QUERIES.labels(method, template).observe(stats.queries)
+            REQUEST_DB_TIME.labels(method, template).observe(stats.db_seconds)
+
+
+def instrument_engine(engine, name: str):
+    """Count and time every statement an engine (sync or async) executes"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    queries = DB_QUERIES.labels(name)
+    query_time = DB_QUERY_TIME.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        queries.inc()
+        query_time.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def drop_timer(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+    return engine
+
+
+def observe_ocr(result: Dict[str, Any]):
+    """Record the stage timings of one OCR result (see ocr.run_ocr)"""
+    OCR_RESULTS.labels("cache" if result.get("cached") else "worker").inc()
+    for stage, ms in result.get("timings", {}).items():
+        OCR_STAGE_TIME.labels(stage[:-3] if stage.endswith("_ms") else stage).observe(ms / 1000)
+
+
+def _ratio(hits: float, lookups: float) -> float:
+    return hits / lookups if lookups else 0.0
+
+
+class StatsCollector:
+    """Exports the counters behind /api/cache/stats, /api/extract-ocr/cache
+    and /api/db/pool/stats at scrape time"""
+
+    def __init__(
+        self,
+        sku_cache_stats: Callable[[], Dict[str, Any]],
+        ocr_cache_counters: Callable[[], Dict[str, int]],
+        pool_stats: Callable[[], Dict[str, Dict[str, Any]]],
+    ):
+        self.sku_cache_stats = sku_cache_stats
+        self.ocr_cache_counters = ocr_cache_counters
+        self.pool_stats = pool_stats
+
+    def collect(self) -> Iterable:
+        sku = self.sku_cache_stats()
+        hits = CounterMetricFamily("sku_cache_hits", "SKU/search cache hits", labels=["namespace"])
+        misses = CounterMetricFamily("sku_cache_misses", "SKU/search cache misses", labels=["namespace"])
+        ratio = GaugeMetricFamily("sku_cache_hit_ratio", "SKU/search cache hit rate since start", labels=["namespace"])
+        for namespace in ("sku", "search"):
+            counts = sku[namespace]
+            hits.add_metric([namespace], counts["hits"])
+            misses.add_metric([namespace], counts["misses"])
+            ratio.add_metric([namespace], _ratio(counts["hits"], counts["hits"] + counts["misses"]))
+        yield hits
+        yield misses
+        yield ratio
+
+        ocr = self.ocr_cache_counters()
+        lookups = CounterMetricFamily("ocr_cache_lookups", "OCR result cache lookups", labels=["result"])
+        for result in ("memory_hits", "disk_hits", "misses"):
+            lookups.add_metric([result], ocr[result])
+        yield lookups
+        total = ocr["memory_hits"] + ocr["disk_hits"] + ocr["misses"]
+        yield GaugeMetricFamily(
+            "ocr_cache_hit_ratio", "OCR result cache hit rate since start",
+            value=_ratio(total - ocr["misses"], total),
+        )
+
+        checkouts = CounterMetricFamily("db_pool_checkouts", "Connections checked out of the pool", labels=["engine"])
+        timeouts = CounterMetricFamily("db_pool_timeouts", "Checkouts that gave up waiting", labels=["engine"])
+        in_use = GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out", labels=["engine"])
+        wait = HistogramMetricFamily("db_pool_wait_seconds", "Time to check a connection out", labels=["engine"])
+        for engine, stats in self.pool_stats().items():
+            checkouts.add_metric([engine], stats["checkouts"])
+            timeouts.add_metric([engine], stats["timeouts"])
+            in_use.add_metric([engine], stats.get("checked_out", 0))
+            wait.add_metric([engine], list(stats["wait_seconds_buckets"].items()), sum_value=stats["wait_seconds_total"])
+        yield checkouts
+        yield timeouts
+        yield in_use
+        yield wait
+
+
+# Collectors that read live objects; multiprocess scrapes add them by hand
+_scrape_time_collectors = []
+
+
+def register_collector(collector):
+    _scrape_time_collectors.append(collector)
+    REGISTRY.register(collector)
+
+
+def render_metrics():
+    """(body, content type) for GET /metrics"""
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _scrape_time_collectors:
+            registry.register(collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,59 @@
+"""Alembic environment: migrations run against models.DATABASE_URL.
+
+The app's init_db() still creates missing tables on a fresh database, and
+the migrations are written to be safe on top of that (they check before
+creating). Objects installed at startup by search_index.py (FTS5 shadow
+tables, trigram indexes) are not managed here.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from models import Base, engine
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Leave search_index.py's objects to search_index.py
+    if name and (name.startswith("drug_skus_fts") or name.endswith("_trgm")):
+        return False
+    return True
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout (alembic upgrade head --sql)"""
+    context.configure(
+        url=engine.url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite can only ALTER tables by copying them
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
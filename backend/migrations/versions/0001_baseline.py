@@ -0,0 +1,73 @@
+"""Baseline: the schema init_db() created before migrations existed
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+Databases created by init_db() or sql/postgres_schema.sql already have
+these tables, so each one is only created if it is missing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUSES = ("DRAFT", "PENDING_REVIEW", "APPROVED", "REJECTED", "DELETED")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("drug_skus"):
+        op.create_table(
+            "drug_skus",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("ndc", sa.String()),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("manufacturer", sa.String(), nullable=False),
+            sa.Column("dosage_form", sa.String(), nullable=False),
+            sa.Column("strength", sa.String(), nullable=False),
+            sa.Column("package_size", sa.String(), nullable=False),
+            sa.Column("gtin", sa.String()),
+            sa.Column("image_url", sa.String()),
+            sa.Column("status", sa.Enum(*STATUSES, name="skustatus"), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("last_modified", sa.DateTime(timezone=True)),
+            sa.Column("created_by", sa.String()),
+            sa.Column("reviewed_by", sa.String()),
+        )
+        op.create_index("ix_drug_skus_id", "drug_skus", ["id"])
+        op.create_index("ix_drug_skus_ndc", "drug_skus", ["ndc"], unique=True)
+        op.create_index("ix_drug_skus_name_id", "drug_skus", ["name", "id"])
+
+    if not inspector.has_table("catalog_version"):
+        op.create_table(
+            "catalog_version",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.BigInteger(), nullable=False),
+        )
+        op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 0)")
+
+    if not inspector.has_table("sku_changes"):
+        op.create_table(
+            "sku_changes",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("sku_id", sa.Integer(), nullable=False),
+            sa.Column("op", sa.String(), nullable=False),
+            sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sqlite_autoincrement=True,
+        )
+        op.create_index("ix_sku_changes_changed_at", "sku_changes", ["changed_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The baseline predates migrations; there is nothing older to return to
+    pass
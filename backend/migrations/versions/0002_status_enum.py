@@ -0,0 +1,60 @@
+"""Store drug_skus.status as the skustatus enum
+
+Revision ID: 0002_status_enum
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:10:00
+
+sql/postgres_schema.sql created the skustatus type but declared the
+column TEXT, so any string could be stored and every comparison was a
+text comparison. Values outside the enum are first mapped the way
+fix_status_values.py does it (ACTIVE -> APPROVED, anything else ->
+DRAFT). Then, on PostgreSQL, the column is converted in place. SQLite
+has no enum type: SQLAlchemy stores the enum as VARCHAR and validates
+it in Python, so only the data clean-up runs there.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_status_enum"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUSES = ("DRAFT", "PENDING_REVIEW", "APPROVED", "REJECTED", "DELETED")
+_VALID = ", ".join(f"'{status}'" for status in STATUSES)
+
+
+def _status_udt(bind) -> str:
+    return bind.execute(sa.text(
+        "SELECT udt_name FROM information_schema.columns "
+        "WHERE table_name = 'drug_skus' AND column_name = 'status' "
+        "AND table_schema = current_schema()"
+    )).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and _status_udt(bind) == "skustatus":
+        # Created by init_db(): already an enum, so no invalid values either
+        return
+
+    op.execute(
+        "UPDATE drug_skus SET status = CASE WHEN upper(status) = 'ACTIVE' THEN 'APPROVED' ELSE 'DRAFT' END "
+        f"WHERE status IS NULL OR status NOT IN ({_VALID})"
+    )
+
+    if bind.dialect.name == "postgresql":
+        sa.Enum(*STATUSES, name="skustatus").create(bind, checkfirst=True)
+        op.execute("ALTER TABLE drug_skus ALTER COLUMN status TYPE skustatus USING status::skustatus")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # The type stays: the original schema created it too
+        op.execute("ALTER TABLE drug_skus ALTER COLUMN status TYPE TEXT USING status::text")
@@ -0,0 +1,78 @@
+"""Indexes for the API's hot queries; drop redundant ones
+
+Revision ID: 0003_query_indexes
+Revises: 0002_status_enum
+Create Date: 2026-10-18 09:20:00
+
+Added:
+- (status, last_modified): status filters on search and bulk status
+  updates, and status-scoped "changed since" lookups.
+- (id) WHERE status = 'PENDING_REVIEW': the review queue, a small and
+  hot slice of the catalog, read in id order.
+- (coalesce(last_modified, created_at), id): incremental exports, which
+  filter and order by the time a row last changed (export.CHANGED_AT).
+- (name, id): keyset pagination by name and exact duplicate grouping.
+  init_db() already created it, but postgres_schema.sql did not.
+
+Dropped, because each one only slows writes:
+- ix_drug_skus_id, which duplicates the primary key.
+- idx_drug_skus_ndc, which duplicates the UNIQUE constraint.
+- idx_drug_skus_name, which is covered by (name, id).
+The last two come from postgres_schema.sql.
+
+On PostgreSQL the indexes are built CONCURRENTLY, so a live catalog
+keeps taking writes during the upgrade.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_query_indexes"
+down_revision: Union[str, Sequence[str], None] = "0002_status_enum"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING_REVIEW = sa.text("status = 'PENDING_REVIEW'")
+
+INDEXES = [
+    ("ix_drug_skus_name_id", ["name", "id"], {}),
+    ("ix_drug_skus_status_last_modified", ["status", "last_modified"], {}),
+    ("ix_drug_skus_pending_review", ["id"], {"postgresql_where": PENDING_REVIEW, "sqlite_where": PENDING_REVIEW}),
+    ("ix_drug_skus_changed_at", [sa.text("coalesce(last_modified, created_at)"), "id"], {}),
+]
+REDUNDANT = ["ix_drug_skus_id", "idx_drug_skus_ndc", "idx_drug_skus_name"]
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _is_postgresql():
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            for name, columns, kw in INDEXES:
+                op.create_index(name, "drug_skus", columns, if_not_exists=True, postgresql_concurrently=True, **kw)
+            for name in REDUNDANT:
+                op.drop_index(name, table_name="drug_skus", if_exists=True, postgresql_concurrently=True)
+        return
+
+    for name, columns, kw in INDEXES:
+        op.create_index(name, "drug_skus", columns, if_not_exists=True, **kw)
+    for name in REDUNDANT:
+        op.drop_index(name, table_name="drug_skus", if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # (name, id) predates this revision for init_db() databases, so it stays
+    for name, _, _ in INDEXES[1:]:
+        op.drop_index(name, table_name="drug_skus", if_exists=True)
+    op.create_index("ix_drug_skus_id", "drug_skus", ["id"], if_not_exists=True)
+    if _is_postgresql():
+        # Only databases built from postgres_schema.sql had these
+        op.create_index("idx_drug_skus_ndc", "drug_skus", ["ndc"], if_not_exists=True)
+        op.create_index("idx_drug_skus_name", "drug_skus", ["name"], if_not_exists=True)
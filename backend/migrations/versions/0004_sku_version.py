@@ -0,0 +1,44 @@
+"""Add drug_skus.version, a per-row counter bumped by every update
+
+Revision ID: 0004_sku_version
+Revises: 0003_query_indexes
+Create Date: 2026-10-18 11:40:00
+
+Bulk status updates re-check it in the UPDATE's WHERE clause, so a row
+written between their read and their write is reported as a conflict
+instead of being overwritten. last_modified cannot serve: rows written
+by SQLite's CURRENT_TIMESTAMP only have whole-second precision.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_sku_version"
+down_revision: Union[str, Sequence[str], None] = "0003_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_version() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns("drug_skus")
+    return any(column["name"] == "version" for column in columns)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if _has_version():
+        # Created by init_db()
+        return
+    op.add_column(
+        "drug_skus",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # A plain DROP COLUMN (SQLite 3.35+): a batch rebuild of the table
+    # would drop the search index triggers
+    op.drop_column("drug_skus", "version")
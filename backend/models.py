@@ -1,14 +1,27 @@
-from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, Integer, create_engine
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, Integer, BigInteger, Index, create_engine, literal_column, make_url, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
 import logging
+from search_index import install_search_index
+from db_pool import configure_engine, engine_options
 
 Base = declarative_base()
 
+def utcnow() -> datetime:
+    """The app's clock, used for created_at, last_modified and export
+    watermarks. It has sub-second precision on every database (SQLite's
+    CURRENT_TIMESTAMP stops at whole seconds). Incremental exports compare
+    coalesce(last_modified, created_at) with a watermark, so all three
+    must come from the same clock: a skew between the app and database
+    hosts would otherwise drop rows edited just before the watermark."""
+    return datetime.now(timezone.utc)
+
 class SKUStatus(str, Enum):
     DRAFT = "DRAFT"
     PENDING_REVIEW = "PENDING_REVIEW"
@@ -19,7 +32,7 @@ class SKUStatus(str, Enum):
 class DrugSKU(Base):
     __tablename__ = "drug_skus"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     ndc = Column(String, unique=True, index=True)  # National Drug Code
     name = Column(String, nullable=False)
     manufacturer = Column(String, nullable=False)
@@ -29,10 +42,60 @@ class DrugSKU(Base):
     gtin = Column(String)                        # Global Trade Item Number
     image_url = Column(String)
     status = Column(SQLEnum(SKUStatus), nullable=False, default=SKUStatus.DRAFT)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    last_modified = Column(DateTime(timezone=True), onupdate=func.now())
+    # server_default only covers rows inserted outside the app
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    last_modified = Column(DateTime(timezone=True), onupdate=utcnow)
     created_by = Column(String)
     reviewed_by = Column(String)
+    # Bumped by every UPDATE; bulk writes re-check it in their WHERE clause
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
+
+    # Keep in step with migrations/versions (see 0003_query_indexes)
+    __table_args__ = (
+        # Keyset pagination in (name, id) order; exact duplicate grouping
+        Index("ix_drug_skus_name_id", "name", "id"),
+        # Status filters, and status-scoped "changed since" lookups
+        Index("ix_drug_skus_status_last_modified", "status", "last_modified"),
+        # The review queue is a small, hot slice of the catalog
+        Index(
+            "ix_drug_skus_pending_review", "id",
+            postgresql_where=text("status = 'PENDING_REVIEW'"),
+            sqlite_where=text("status = 'PENDING_REVIEW'"),
+        ),
+        # Incremental exports, filtered and ordered by when a row last changed
+        # (export.CHANGED_AT)
+        Index("ix_drug_skus_changed_at", func.coalesce(last_modified, created_at), id),
+    )
+
+class CatalogVersion(Base):
+    """Single-row counter bumped in every transaction that writes drug_skus.
+
+    Search ETags are derived from it.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+class SKUChange(Base):
+    """Append-only log of writes to drug_skus; ids are change-feed offsets"""
+    __tablename__ = "sku_changes"
+
+    id = Column(Integer, primary_key=True)
+    sku_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # create, update or delete
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    # Never reuse offsets on SQLite, even after pruning
+    __table_args__ = {"sqlite_autoincrement": True}
+
+def bump_catalog_version():
+    """UPDATE statement to run inside a write transaction, before commit"""
+    return (
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+    )
 
 # Get database URL from environment or use SQLite as default
 DATABASE_URL = os.environ.get(
@@ -40,18 +103,47 @@ DATABASE_URL = os.environ.get(
     "sqlite:///./sku_database.db"
 )
 
-# Create engine with appropriate parameters based on database type
-if DATABASE_URL.startswith("postgresql"):
-    # PostgreSQL engine without check_same_thread
-    engine = create_engine(DATABASE_URL)
-else:
-    # SQLite engine with check_same_thread=False
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
+# Pool sizing, pre-ping/recycle and SQLite pragmas come from the
+# environment (see db_pool.py)
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL, "sync")), "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def async_database_url(url: str):
+    """Map a sync DATABASE_URL onto the matching asyncio driver"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ("postgresql", "postgres"):
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+# Async engine used by the API routes so queries never block the event loop
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+async_engine = configure_engine(
+    create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, "async", is_async=True)),
+    "async",
+)
+
+# expire_on_commit=False so committed objects can still be serialized
+# without an implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 # Create all tables
 def init_db():
     Base.metadata.create_all(bind=engine)
+    install_search_index(engine)
+    try:
+        with engine.begin() as conn:
+            if conn.scalar(select(CatalogVersion.id).where(CatalogVersion.id == 1)) is None:
+                conn.execute(insert(CatalogVersion).values(id=1, version=0))
+    except IntegrityError:
+        # Another worker created the row first
+        pass
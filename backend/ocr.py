@@ -0,0 +1,270 @@
+"""OCR pipeline for drug label images.
+
+Tesseract is CPU-bound and holds the calling thread for seconds, so the API
+never runs it on the event loop. OCRWorkerPool runs run_ocr() in a bounded
+process pool and rejects work once the pool and its queue are full.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, BinaryIO, Dict, Hashable, Iterator, Optional, Tuple, Union
+from PIL import Image
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+import zipfile
+import pytesseract
+
+from ocr_cache import OCRResultCache, content_key
+from ocr_preprocess import PreprocessConfig, draft_for_decode, preprocess_image
+from sku_text_parser import default_parser
+
+logger = logging.getLogger(__name__)
+
+# Worker processes; defaults to one per CPU
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 1))
+# Images allowed to wait for a free worker before requests are turned away
+OCR_QUEUE_DEPTH = int(os.environ.get("OCR_QUEUE_DEPTH", OCR_WORKERS * 2))
+# Largest number of images accepted by one batch request
+OCR_BATCH_MAX_IMAGES = int(os.environ.get("OCR_BATCH_MAX_IMAGES", 500))
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".gif", ".webp")
+# Archive members larger than this (uncompressed) are skipped
+MAX_ARCHIVE_MEMBER_BYTES = 50 * 1024 * 1024
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def run_ocr(contents: bytes, config: PreprocessConfig = PreprocessConfig()) -> Dict[str, Any]:
+    """Decode, preprocess, OCR and parse one image. Runs inside a pool worker."""
+    timings = {}
+
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(contents))
+    draft_for_decode(image, config)
+    image.load()
+    timings["decode_ms"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    image, dpi = preprocess_image(image, config)
+    timings["preprocess_ms"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    extracted_text = pytesseract.image_to_string(image, config=f"--dpi {dpi}" if dpi else "")
+    timings["tesseract_ms"] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    sku_data = parse_sku_from_text(extracted_text)
+    confidence = calculate_ocr_confidence(sku_data)
+    timings["parse_ms"] = _elapsed_ms(started)
+
+    return {
+        "extracted_text": extracted_text,
+        "sku_data": sku_data,
+        "confidence": confidence,
+        "timings": timings,
+    }
+
+
+def _seekable(source: Union[bytes, BinaryIO]) -> BinaryIO:
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def is_archive(filename: Optional[str], source: Union[bytes, BinaryIO]) -> bool:
+    """``source`` is the file's contents or a seekable file holding them"""
+    return (filename or "").lower().endswith(".zip") or zipfile.is_zipfile(_seekable(source))
+
+
+def iter_archive_images(source: Union[bytes, BinaryIO]) -> Iterator[Tuple[str, zipfile.ZipFile, zipfile.ZipInfo]]:
+    """Yield (name, archive, member) for each image in a zip archive.
+
+    Members are returned undecompressed so callers can inflate them one at
+    a time. Only the archive's directory is read here, so a file-backed
+    ``source`` is not loaded into memory.
+    """
+    archive = zipfile.ZipFile(_seekable(source))
+    for member in archive.infolist():
+        name = member.filename
+        basename = os.path.basename(name)
+        if member.is_dir() or name.startswith("__MACOSX/") or basename.startswith("."):
+            continue
+        if not basename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if member.file_size > MAX_ARCHIVE_MEMBER_BYTES:
+            logger.warning("Skipping oversized archive member %s (%d bytes)", name, member.file_size)
+            continue
+        yield name, archive, member
+
+
+def read_batch_image(archive: Optional[zipfile.ZipFile], source: Any, max_bytes: int) -> bytes:
+    """Contents of one batch item: an archive member, or a whole file.
+
+    Blocking; run it in a thread. Raises UnreadableImage for a file over
+    ``max_bytes`` (checked before reading it) or one that cannot be read.
+    """
+    try:
+        if archive is not None:
+            return archive.read(source)
+        size = source.seek(0, os.SEEK_END)
+        if size > max_bytes:
+            raise UnreadableImage(f"Image is {size} bytes, limit is {max_bytes}")
+        source.seek(0)
+        return source.read()
+    except UnreadableImage:
+        raise
+    except Exception as e:
+        raise UnreadableImage(f"Could not read image: {str(e)}") from e
+
+
+class OCRPoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class UnreadableImage(Exception):
+    """A batch item that could not be read, so was never OCRed"""
+
+
+class OCRWorkerPool:
+    """Bounded process pool for OCR jobs.
+
+    At most ``workers`` images are processed at once and at most
+    ``queue_depth`` more may wait; beyond that submit() fails fast with
+    OCRPoolSaturated instead of piling up unbounded work. Images already in
+    ``cache`` are answered without touching the pool. The executor is
+    created on first use so importing this module never spawns processes.
+    """
+
+    def __init__(
+        self,
+        workers: int = OCR_WORKERS,
+        queue_depth: int = OCR_QUEUE_DEPTH,
+        cache: Optional[OCRResultCache] = None,
+        preprocess: Optional[PreprocessConfig] = None,
+    ):
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self.cache = cache
+        self.preprocess = preprocess or PreprocessConfig.from_env()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def saturated(self) -> bool:
+        return self._in_flight >= self.workers + self.queue_depth
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that already runs an event loop and
+            # driver threads is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("Started OCR pool with %d workers", self.workers)
+        return self._executor
+
+    async def submit(self, contents: bytes, enforce_limit: bool = True) -> Dict[str, Any]:
+        started = time.perf_counter()
+
+        key = None
+        if self.cache is not None:
+            # Hashing a 10MB photo takes milliseconds; keep it off the loop
+            key = await asyncio.to_thread(content_key, contents, self.preprocess.signature())
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return {**cached, "cached": True, "timings": {"total_ms": _elapsed_ms(started)}}
+
+        if enforce_limit and self.saturated:
+            raise OCRPoolSaturated(
+                f"OCR pool saturated ({self._in_flight} images in flight)"
+            )
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), run_ocr, contents, self.preprocess)
+        finally:
+            self._in_flight -= 1
+
+        if key is not None:
+            await self.cache.put(key, result)
+
+        timings = result["timings"]
+        timings["total_ms"] = _elapsed_ms(started)
+        # Whatever was not spent in a pipeline stage was spent hashing,
+        # waiting for a worker and pickling the image across
+        stage_ms = sum(value for stage, value in timings.items() if stage != "total_ms")
+        timings["queue_ms"] = round(max(0.0, timings["total_ms"] - stage_ms), 2)
+        result["cached"] = False
+        return result
+
+    async def map_unordered(
+        self, jobs: AsyncIterator[Tuple[Hashable, bytes]]
+    ) -> AsyncIterator[Tuple[Hashable, Optional[Dict[str, Any]], Optional[BaseException]]]:
+        """Run (key, contents) jobs across the pool, yielding
+        (key, result, error) in completion order.
+
+        A batch keeps at most one job per worker in flight, pulling the
+        next job from ``jobs`` only when a slot frees up, so it neither
+        floods the pool nor holds more than ``workers`` images at once.
+        A job whose contents is an exception (the image could not be
+        read) is yielded as failed without reaching a worker.
+        """
+        pending = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.workers:
+                    try:
+                        key, contents = await jobs.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    if isinstance(contents, BaseException):
+                        task = asyncio.get_running_loop().create_future()
+                        task.set_exception(contents)
+                    else:
+                        task = asyncio.ensure_future(self.submit(contents, enforce_limit=False))
+                    pending[task] = key
+
+                if not pending:
+                    return
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = pending.pop(task)
+                    error = task.exception()
+                    yield key, None if error else task.result(), error
+        finally:
+            # Client went away mid-stream: drop whatever has not started
+            for task in pending:
+                task.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.close()
+
+
+def parse_sku_from_text(text: str) -> Dict[str, Any]:
+    """Parse OCR text to extract SKU information"""
+    return default_parser.parse(text)
+
+
+def calculate_ocr_confidence(sku_data: Dict[str, Any]) -> float:
+    """Calculate confidence score based on extracted data completeness"""
+    filled_fields = sum(1 for value in sku_data.values() if value and value.strip())
+    total_fields = len(sku_data)
+    return filled_fields / total_fields
@@ -0,0 +1,175 @@
+"""Content-addressed cache of OCR results.
+
+Results are keyed by a SHA-256 of the image bytes, so re-uploads of the same
+label skip tesseract entirely. Entries live in an in-memory LRU and, when
+OCR_CACHE_PATH is set, in a SQLite file shared across workers and restarts.
+Both tiers evict least-recently-used entries once their byte budget is spent.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_ENTRIES = int(os.environ.get("OCR_CACHE_ENTRIES", 1024))
+OCR_CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+OCR_CACHE_PATH = os.environ.get("OCR_CACHE_PATH") or None
+OCR_CACHE_DISK_MAX_BYTES = int(os.environ.get("OCR_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+
+# Fields of an OCR result worth keeping; timings describe one run only
+CACHED_FIELDS = ("extracted_text", "sku_data", "confidence")
+
+
+def content_key(contents: bytes, variant: str = "") -> str:
+    """Cache key for an image; variant distinguishes OCR configurations"""
+    digest = hashlib.sha256(contents).hexdigest()
+    return f"{digest}:{variant}" if variant else digest
+
+
+class _DiskTier:
+    """SQLite-backed LRU tier. All methods are blocking."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_last_used ON ocr_cache(last_used)")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._conn.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0] if row else None
+
+    def put(self, key: str, payload: str) -> int:
+        """Store payload and return how many entries were evicted to make room"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            return self._evict()
+
+    def _evict(self) -> int:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM ocr_cache ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if not row:
+                break
+            self._conn.execute("DELETE FROM ocr_cache WHERE key = ?", (row[0],))
+            total -= row[1]
+            evicted += 1
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache"
+            ).fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OCRResultCache:
+    """Two-tier LRU cache of OCR results keyed by content hash"""
+
+    def __init__(
+        self,
+        max_entries: int = OCR_CACHE_ENTRIES,
+        max_bytes: int = OCR_CACHE_MAX_BYTES,
+        disk_path: Optional[str] = OCR_CACHE_PATH,
+        disk_max_bytes: int = OCR_CACHE_DISK_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._disk = _DiskTier(disk_path, disk_max_bytes) if disk_path else None
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    def _remember(self, key: str, payload: str):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.counters["memory_evictions"] += 1
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self._entries.get(key)
+        if payload is not None:
+            self._entries.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return json.loads(payload)
+
+        if self._disk:
+            try:
+                payload = await asyncio.to_thread(self._disk.get, key)
+            except sqlite3.Error as e:
+                logger.warning("OCR disk cache read failed: %s", e)
+            if payload is not None:
+                self._remember(key, payload)
+                self.counters["disk_hits"] += 1
+                return json.loads(payload)
+
+        self.counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, result: Dict[str, Any]):
+        payload = json.dumps({field: result[field] for field in CACHED_FIELDS})
+        self._remember(key, payload)
+        if self._disk:
+            try:
+                self.counters["disk_evictions"] += await asyncio.to_thread(self._disk.put, key, payload)
+            except sqlite3.Error as e:
+                # A broken disk tier must not fail the OCR request
+                logger.warning("OCR disk cache write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory": {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            },
+            "disk": self._disk.stats() if self._disk else None,
+        }
+
+    def close(self):
+        if self._disk:
+            self._disk.close()
@@ -0,0 +1,74 @@
+"""Keyset (cursor) pagination and row-count helpers for SKU listings"""
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+import base64
+import json
+
+from explain import Explain
+from models import DrugSKU
+
+# Supported sort orders. Each ends in the primary key so the key is unique.
+SORT_KEYS = {
+    "id": (DrugSKU.id,),
+    "name": (DrugSKU.name, DrugSKU.id),
+}
+
+
+def sort_columns(sort: str):
+    if sort not in SORT_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort '{sort}', expected one of: {', '.join(SORT_KEYS)}",
+        )
+    return SORT_KEYS[sort]
+
+
+def encode_cursor(sort: str, row) -> str:
+    """Opaque cursor pointing just past row in the given sort order"""
+    payload = {"s": sort, "k": [getattr(row, col.key) for col in SORT_KEYS[sort]]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        values = payload["k"]
+        cursor_sort = payload["s"]
+        # Cursors come back from clients, so check the shape before any
+        # value reaches a query
+        if not isinstance(values, list) or not all(
+            isinstance(value, (str, int)) and not isinstance(value, bool) for value in values
+        ):
+            raise ValueError("cursor keys must be a list of strings and integers")
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort or len(values) != len(SORT_KEYS[sort]):
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+    return values
+
+
+def keyset_filter(columns, values):
+    """WHERE clause selecting rows strictly after values in (columns) order"""
+    if len(columns) == 1:
+        return columns[0] > values[0]
+    return tuple_(*columns) > tuple_(*values)
+
+
+async def count_rows(db: AsyncSession, stmt) -> int:
+    """Exact number of rows stmt would return"""
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    return (await db.execute(count_stmt)).scalar_one()
+
+
+async def estimate_count(db: AsyncSession, stmt) -> int:
+    """Row estimate from the planner where available, otherwise an exact count"""
+    if db.bind.dialect.name != "postgresql":
+        return await count_rows(db, stmt)
+
+    plan = (await db.execute(Explain(stmt, format_json=True))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,202 @@
+"""N+1 and slow-query detector for development and tests.
+
+Listeners on an engine's cursor events record every statement into the
+active QueryAudit objects. Statements are grouped by shape (the SQL with
+IN lists collapsed). A shape that runs more than ``repeat_threshold``
+times in one audit is reported as a likely N+1. Any statement slower
+than QUERY_AUDIT_SLOW_MS is logged with its EXPLAIN plan.
+
+Two ways to use it:
+
+- QUERY_AUDIT=1: main.py adds QueryAuditMiddleware, which audits each
+  request and logs repeated shapes at WARNING. Off by default, because
+  it does extra work on every statement.
+- Tests: the ``query_audit`` fixture (tests/conftest.py) wraps
+  ``audit_queries``. The block fails when it runs more statements than
+  ``max_queries`` or repeats a shape:
+
+      with query_audit(max_queries=3):
+          client.get("/api/skus")
+
+A statement batched by insertmanyvalues (bulk inserts) is not counted as
+a repeat.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+import logging
+import os
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+from explain import explain_prefix
+from logging_config import log_event
+
+logger = logging.getLogger(__name__)
+
+QUERY_AUDIT = os.environ.get("QUERY_AUDIT", "").lower() in ("1", "true", "yes", "on")
+QUERY_AUDIT_REPEAT_THRESHOLD = int(os.environ.get("QUERY_AUDIT_REPEAT_THRESHOLD", 5))
+QUERY_AUDIT_SLOW_MS = float(os.environ.get("QUERY_AUDIT_SLOW_MS", 100))
+QUERY_AUDIT_EXPLAIN = os.environ.get("QUERY_AUDIT_EXPLAIN", "1").lower() not in ("0", "false", "no", "off")
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+# IN (?, ?, ?) and its expanded variants become IN (?)
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("select", "with", "update", "delete")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryBudgetExceeded(AssertionError):
+    """An audited block ran too many statements or repeated one"""
+
+
+class QueryAudit:
+    """Statements seen while one audit was active"""
+
+    def __init__(self, repeat_threshold: int = QUERY_AUDIT_REPEAT_THRESHOLD):
+        self.repeat_threshold = repeat_threshold
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.slow: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, seconds: float, repeatable: bool = True):
+        self.statements += 1
+        self.seconds += seconds
+        if repeatable:
+            self.shapes[statement_shape(statement)] += 1
+        if seconds * 1000 >= QUERY_AUDIT_SLOW_MS:
+            self.slow.append((seconds, statement))
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Shapes run more than repeat_threshold times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > self.repeat_threshold]
+
+    def report(self) -> str:
+        lines = [f"{self.statements} statements in {self.seconds * 1000:.1f} ms"]
+        for shape, count in self.shapes.most_common():
+            lines.append(f"  {count:4d} x {shape}")
+        return "\n".join(lines)
+
+    def check(self, max_queries: Optional[int] = None):
+        """Raise QueryBudgetExceeded on an overrun or a repeated shape"""
+        if max_queries is not None and self.statements > max_queries:
+            raise QueryBudgetExceeded(f"expected at most {max_queries} statements, ran {self.report()}")
+        repeated = self.repeated()
+        if repeated:
+            shape, count = repeated[0]
+            raise QueryBudgetExceeded(
+                f"statement repeated {count} times (threshold {self.repeat_threshold}), "
+                f"likely an N+1:\n  {shape}\n{self.report()}"
+            )
+
+
+# Audits opened with audit_queries(), which see every statement on the
+# audited engines from any thread (TestClient runs the app in its own)
+_open_audits: List[QueryAudit] = []
+# The audit of the request being served (QueryAuditMiddleware)
+_request_audit: ContextVar[Optional[QueryAudit]] = ContextVar("request_audit", default=None)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """Plan for a statement that just ran, on the same connection"""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(explain_prefix(conn.dialect.name) + statement, parameters)
+        # The plan text is the last column on both SQLite and PostgreSQL
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def install_query_audit(engine):
+    """Feed an engine's statements to the active audits (idempotent)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if getattr(sync_engine, "_query_audit_installed", False):
+        return engine
+    sync_engine._query_audit_installed = True
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("audit_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["audit_started"].pop()
+        repeatable = context is None or context.execute_style is not ExecuteStyle.INSERTMANYVALUES
+        request_audit = _request_audit.get()
+        for audit in (*_open_audits, *([request_audit] if request_audit else [])):
+            audit.record(statement, seconds, repeatable)
+
+        if seconds * 1000 < QUERY_AUDIT_SLOW_MS:
+            return
+        plan = None
+        if QUERY_AUDIT_EXPLAIN and not executemany and statement.lstrip()[:6].lower().startswith(_EXPLAINABLE):
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        log_event(
+            logger, logging.WARNING, "slow query", sampled=False,
+            ms=round(seconds * 1000, 1), statement=_WHITESPACE.sub(" ", statement).strip(), plan=plan,
+        )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def drop_timer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("audit_started"):
+            conn.info["audit_started"].pop()
+
+    return engine
+
+
+@contextmanager
+def audit_queries(
+    *engines, max_queries: Optional[int] = None, repeat_threshold: int = QUERY_AUDIT_REPEAT_THRESHOLD,
+) -> Iterator[QueryAudit]:
+    """Audit every statement the engines run inside the block, then check()"""
+    for engine in engines:
+        install_query_audit(engine)
+    audit = QueryAudit(repeat_threshold)
+    _open_audits.append(audit)
+    try:
+        yield audit
+    finally:
+        _open_audits.remove(audit)
+    audit.check(max_queries)
+
+
+class QueryAuditMiddleware:
+    """Audits each HTTP request and logs likely N+1 patterns (QUERY_AUDIT=1)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        audit = QueryAudit()
+        token = _request_audit.set(audit)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_audit.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            for shape, count in audit.repeated():
+                log_event(
+                    logger, logging.WARNING, "repeated query", sampled=False,
+                    route=route, count=count, statements=audit.statements, statement=shape,
+                )
+            log_event(
+                logger, logging.DEBUG, "request queries", sampled=False,
+                route=route, statements=audit.statements, ms=round(audit.seconds * 1000, 1),
+            )
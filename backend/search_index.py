@@ -0,0 +1,177 @@
+"""Substring search index layer for the drug_skus table.
+
+PostgreSQL gets pg_trgm GIN indexes, which the planner uses for LIKE/ILIKE
+with leading wildcards. SQLite gets an FTS5 shadow table with the trigram
+tokenizer, kept in sync with drug_skus by triggers. Engines with neither
+fall back to plain LIKE scans.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import Column, Integer, MetaData, String, Table, inspect, select, text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns covered by the substring index
+SEARCH_COLUMNS = ("ndc", "name", "manufacturer")
+
+# The trigram tokenizer can only match terms of at least three characters
+FTS_MIN_TERM_LENGTH = 3
+
+BACKEND_PG_TRGM = "pg_trgm"
+BACKEND_FTS5 = "fts5"
+BACKEND_LIKE = "like"
+
+_active_backend = BACKEND_LIKE
+
+# Lightweight description of the FTS5 shadow table. It lives in its own
+# MetaData so Base.metadata.create_all never tries to create it.
+_fts_metadata = MetaData()
+drug_skus_fts = Table(
+    "drug_skus_fts",
+    _fts_metadata,
+    Column("rowid", Integer),
+    *(Column(name, String) for name in SEARCH_COLUMNS),
+)
+
+_FTS_COLUMNS = ", ".join(SEARCH_COLUMNS)
+_FTS_NEW_VALUES = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+_FTS_OLD_VALUES = ", ".join(f"old.{name}" for name in SEARCH_COLUMNS)
+
+_SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS drug_skus_fts_ai AFTER INSERT ON drug_skus BEGIN
+        INSERT INTO drug_skus_fts(rowid, {_FTS_COLUMNS})
+        VALUES (new.id, {_FTS_NEW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS drug_skus_fts_ad AFTER DELETE ON drug_skus BEGIN
+        INSERT INTO drug_skus_fts(drug_skus_fts, rowid, {_FTS_COLUMNS})
+        VALUES ('delete', old.id, {_FTS_OLD_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS drug_skus_fts_au AFTER UPDATE OF {_FTS_COLUMNS} ON drug_skus BEGIN
+        INSERT INTO drug_skus_fts(drug_skus_fts, rowid, {_FTS_COLUMNS})
+        VALUES ('delete', old.id, {_FTS_OLD_VALUES});
+        INSERT INTO drug_skus_fts(rowid, {_FTS_COLUMNS})
+        VALUES (new.id, {_FTS_NEW_VALUES});
+    END
+    """,
+]
+
+
+def _install_pg_trgm(engine) -> str:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for name in SEARCH_COLUMNS:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_drug_skus_{name}_trgm "
+                f"ON drug_skus USING gin ({name} gin_trgm_ops)"
+            ))
+    return BACKEND_PG_TRGM
+
+
+def _install_fts5(engine) -> str:
+    with engine.begin() as conn:
+        created = not inspect(conn).has_table("drug_skus_fts")
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS drug_skus_fts USING fts5("
+            f"{_FTS_COLUMNS}, content='drug_skus', content_rowid='id', "
+            f"tokenize='trigram')"
+        ))
+        for trigger in _SQLITE_TRIGGERS:
+            conn.execute(text(trigger))
+        if created:
+            # Index the rows that existed before the shadow table did
+            conn.execute(text("INSERT INTO drug_skus_fts(drug_skus_fts) VALUES ('rebuild')"))
+    return BACKEND_FTS5
+
+
+def install_search_index(engine) -> str:
+    """Create the substring index for the engine's dialect and remember which one is active"""
+    global _active_backend
+
+    installers = {
+        "postgresql": _install_pg_trgm,
+        "sqlite": _install_fts5,
+    }
+    installer = installers.get(engine.dialect.name)
+    backend = BACKEND_LIKE
+    if installer:
+        try:
+            backend = installer(engine)
+        except Exception as e:
+            # e.g. pg_trgm not allow-listed, or SQLite built without FTS5 trigram
+            logger.warning("Search index unavailable, falling back to LIKE scans: %s", e)
+
+    _active_backend = backend
+    logger.info("Substring search backend: %s", backend)
+    return backend
+
+
+@contextmanager
+def bulk_load(engine) -> Iterator[None]:
+    """Skip per-row index upkeep while loading many rows, then index them at once.
+
+    SQLite drops the FTS insert trigger and rebuilds the shadow table
+    afterwards; PostgreSQL drops the trigram indexes and recreates them.
+    Searches scan the table until the block exits, and rows inserted by
+    other writers meanwhile are picked up by the rebuild.
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        with engine.connect() as conn:
+            indexed = inspect(conn).has_table("drug_skus_fts")
+    else:
+        indexed = dialect == "postgresql"
+    if not indexed:
+        yield
+        return
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            conn.execute(text("DROP TRIGGER IF EXISTS drug_skus_fts_ai"))
+        else:
+            for name in SEARCH_COLUMNS:
+                conn.execute(text(f"DROP INDEX IF EXISTS ix_drug_skus_{name}_trgm"))
+    try:
+        yield
+    finally:
+        if dialect == "sqlite":
+            with engine.begin() as conn:
+                conn.execute(text(_SQLITE_TRIGGERS[0]))
+                conn.execute(text("INSERT INTO drug_skus_fts(drug_skus_fts) VALUES ('rebuild')"))
+        else:
+            _install_pg_trgm(engine)
+
+
+def active_backend() -> str:
+    return _active_backend
+
+
+def _fts_phrase(term: str) -> str:
+    """Quote a user term as a single FTS5 phrase"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def substring_filter(column, term: str, case_sensitive: bool = True):
+    """Build a WHERE clause matching rows whose column contains term.
+
+    Mirrors the semantics of ``column.contains(term)`` (or ``ilike`` when
+    case_sensitive is False) but routes through the active index.
+    """
+    if (
+        _active_backend == BACKEND_FTS5
+        and column.key in SEARCH_COLUMNS
+        and len(term) >= FTS_MIN_TERM_LENGTH
+    ):
+        fts_column = drug_skus_fts.c[column.key]
+        matches = select(drug_skus_fts.c.rowid).where(fts_column.match(_fts_phrase(term)))
+        return column.table.c.id.in_(matches)
+
+    # PostgreSQL's trigram GIN index serves LIKE/ILIKE directly
+    if case_sensitive:
+        return column.contains(term)
+    return column.ilike(f"%{term}%")
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Synthetic SKU catalogs for scale testing.
+
+generate_catalog() yields realistic drug_skus records. The output is
+deterministic for a given seed:
+
+- NDCs in the three FDA 10-digit configurations (4-4-2, 5-3-2 and 5-4-1),
+  unique across the catalog. Each manufacturer owns labeler codes, and
+  takes a new one when it runs out of product codes.
+- GTIN-14s that embed the NDC, with a valid GS1 check digit.
+- Manufacturers drawn from a Zipf distribution, so a few of them own
+  most of the catalog, as in real feeds.
+- An exact fraction of rows that repeat an earlier product (same
+  manufacturer, new NDC). Half repeat its name exactly; the rest change
+  its case or spacing, so only ``match=fuzzy`` ties them to it.
+  Every other product name is unique, so duplicate detection finds
+  exactly the duplicates generated here.
+- A configurable status mix.
+
+load_catalog() writes rows through bulk_import.import_records, so
+PostgreSQL loads by COPY, SQLite by chunked executemany INSERTs, and the
+change log stays consistent. The substring search index is rebuilt once
+at the end instead of row by row (search_index.bulk_load), which more
+than doubles throughput on SQLite. Seeded rows have
+created_by = "seed_catalog".
+
+Usage (from backend/):
+    python seed_catalog.py --rows 1000000
+    python seed_catalog.py --rows 5000000 --duplicate-rate 0.02 --status-mix APPROVED=70,DRAFT=30
+    python seed_catalog.py --rows 100000 --output catalog.ndjson.gz
+"""
+from bisect import bisect
+from itertools import accumulate
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import json
+import random
+import time
+
+from bulk_import import BULK_IMPORT_CHUNK_ROWS, import_records
+from models import SKUStatus
+from search_index import bulk_load
+
+SEED_CREATED_BY = "seed_catalog"
+
+DEFAULT_STATUS_MIX = {
+    SKUStatus.APPROVED.value: 0.60,
+    SKUStatus.PENDING_REVIEW.value: 0.15,
+    SKUStatus.DRAFT.value: 0.15,
+    SKUStatus.REJECTED.value: 0.05,
+    SKUStatus.DELETED.value: 0.05,
+}
+
+# (labeler, product, package) digit counts and how often each occurs
+NDC_CONFIGURATIONS = (((4, 4, 2), 0.15), ((5, 3, 2), 0.45), ((5, 4, 1), 0.40))
+
+# Generic ingredient, strengths and dosage forms
+INGREDIENTS = (
+    ("lisinopril", ("2.5 mg", "5 mg", "10 mg", "20 mg", "40 mg"), ("Tablet",)),
+    ("enalapril", ("2.5 mg", "5 mg", "10 mg", "20 mg"), ("Tablet",)),
+    ("ramipril", ("1.25 mg", "2.5 mg", "5 mg", "10 mg"), ("Capsule",)),
+    ("atorvastatin", ("10 mg", "20 mg", "40 mg", "80 mg"), ("Tablet",)),
+    ("simvastatin", ("5 mg", "10 mg", "20 mg", "40 mg"), ("Tablet",)),
+    ("rosuvastatin", ("5 mg", "10 mg", "20 mg", "40 mg"), ("Tablet",)),
+    ("amoxicillin", ("250 mg", "500 mg", "875 mg", "250 mg/5 mL"), ("Capsule", "Tablet", "Oral Suspension")),
+    ("ampicillin", ("250 mg", "500 mg", "1 g"), ("Capsule", "Injection")),
+    ("fluconazole", ("50 mg", "100 mg", "150 mg", "200 mg"), ("Tablet",)),
+    ("omeprazole", ("10 mg", "20 mg", "40 mg"), ("Delayed Release Capsule",)),
+    ("pantoprazole", ("20 mg", "40 mg"), ("Delayed Release Tablet", "Injection")),
+    ("metoprolol", ("25 mg", "50 mg", "100 mg"), ("Tablet", "Extended Release Tablet")),
+    ("atenolol", ("25 mg", "50 mg", "100 mg"), ("Tablet",)),
+    ("propranolol", ("10 mg", "20 mg", "40 mg", "80 mg"), ("Tablet",)),
+    ("losartan", ("25 mg", "50 mg", "100 mg"), ("Tablet",)),
+    ("valsartan", ("40 mg", "80 mg", "160 mg", "320 mg"), ("Tablet",)),
+    ("adalimumab", ("20 mg/0.4 mL", "40 mg/0.8 mL"), ("Injection",)),
+    ("trastuzumab", ("150 mg", "420 mg"), ("Injection",)),
+    ("metformin", ("500 mg", "850 mg", "1000 mg"), ("Tablet", "Extended Release Tablet")),
+    ("sertraline", ("25 mg", "50 mg", "100 mg"), ("Tablet",)),
+    ("gabapentin", ("100 mg", "300 mg", "400 mg", "600 mg"), ("Capsule", "Tablet")),
+    ("levothyroxine", ("25 mcg", "50 mcg", "75 mcg", "100 mcg", "125 mcg"), ("Tablet",)),
+    ("amlodipine", ("2.5 mg", "5 mg", "10 mg"), ("Tablet",)),
+    ("hydrocortisone", ("1%", "2.5%"), ("Cream", "Ointment")),
+    ("insulin glargine", ("100 units/mL",), ("Injection",)),
+)
+
+PACKAGES = {
+    "Tablet": ("30 tablets", "90 tablets", "100 tablets", "500 tablets", "1000 tablets"),
+    "Capsule": ("30 capsules", "90 capsules", "100 capsules", "500 capsules"),
+    "Suspension": ("100 mL bottle", "150 mL bottle"),
+    "Injection": ("1 mL vial", "10 mL vial", "0.8 mL prefilled syringe", "3 mL pen"),
+    "Cream": ("15 g tube", "30 g tube", "454 g jar"),
+    "Ointment": ("15 g tube", "30 g tube"),
+}
+
+MANUFACTURERS = (
+    "Teva Pharmaceuticals USA, Inc.",
+    "Mylan Pharmaceuticals Inc.",
+    "Sandoz Inc.",
+    "Aurobindo Pharma Limited",
+    "Zydus Pharmaceuticals USA Inc.",
+    "Lupin Pharmaceuticals, Inc.",
+    "Sun Pharmaceutical Industries, Inc.",
+    "Amneal Pharmaceuticals LLC",
+    "Cipla USA Inc.",
+    "Apotex Corp.",
+    "Pfizer Laboratories Div Pfizer Inc.",
+    "Merck Sharp & Dohme LLC",
+    "Novartis Pharmaceuticals Corporation",
+    "Hikma Pharmaceuticals USA Inc.",
+    "Dr. Reddy's Laboratories Inc.",
+)
+_MANUFACTURER_SUFFIXES = ("Pharmaceuticals, Inc.", "Laboratories", "Pharma LLC", "Healthcare Corp.", "Generics Inc.")
+
+# A prime number of syllables: any stride that is not a multiple of it
+# permutes the names of a given length
+_SYLLABLES = (
+    "ba", "ce", "da", "fi", "ga", "ke", "lo", "ma", "ne", "pa", "ri", "sa", "to", "va", "xe", "zo",
+    "li", "mi", "nu", "ro", "ti", "vo", "do", "ka", "lu", "mo", "na", "ru", "su", "te", "zi",
+)
+_NAME_STRIDE = 7919
+
+# Rows a duplicate may copy from: the most recent distinct products
+_DUPLICATE_POOL_SIZE = 10000
+
+
+def gtin_check_digit(body: str) -> str:
+    """GS1 mod-10 check digit for the digits that precede it"""
+    total = sum(int(digit) * (3 if i % 2 == 0 else 1) for i, digit in enumerate(reversed(body)))
+    return str(-total % 10)
+
+
+def ndc_to_gtin(ndc: str) -> str:
+    """GTIN-14 for an NDC: indicator 0, the 03 NDC prefix, the 10 NDC digits, check digit"""
+    body = "003" + ndc.replace("-", "")
+    return body + gtin_check_digit(body)
+
+
+def _coined_name(index: int, length: int) -> str:
+    """Pronounceable name, distinct for every index below len(_SYLLABLES) ** length"""
+    value = ((index + 1) * _NAME_STRIDE) % len(_SYLLABLES) ** length
+    syllables = []
+    for _ in range(length):
+        value, digit = divmod(value, len(_SYLLABLES))
+        syllables.append(_SYLLABLES[digit])
+    return "".join(syllables).capitalize()
+
+
+def _name_length(count: int) -> int:
+    length = 3
+    while len(_SYLLABLES) ** length < count:
+        length += 1
+    return length
+
+
+def manufacturer_names(count: int) -> List[str]:
+    """The well-known manufacturers, then coined ones up to ``count``"""
+    names = list(MANUFACTURERS[:count])
+    length = _name_length(count)
+    for i in range(count - len(names)):
+        names.append(f"{_coined_name(i, length)} {_MANUFACTURER_SUFFIXES[i % len(_MANUFACTURER_SUFFIXES)]}")
+    return names
+
+
+def parse_status_mix(spec: str) -> Dict[str, float]:
+    """"APPROVED=70,DRAFT=30" -> weights by status; raises ValueError"""
+    mix = {}
+    for part in spec.split(","):
+        status, _, weight = part.partition("=")
+        try:
+            mix[SKUStatus(status.strip().upper()).value] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid status mix entry '{part}', expected STATUS=WEIGHT")
+    return mix
+
+
+def fuzzy_variant(text: str, rng: random.Random) -> str:
+    """``text`` spelled differently, but equal once case and punctuation are ignored"""
+    for variant in rng.sample((str.upper, str.lower, lambda t: t.replace(" ", "")), 3):
+        changed = variant(text)
+        if changed != text:
+            return changed
+    return text + "."
+
+
+class _NDCAllocator:
+    """Unique NDCs, from labeler codes owned by one manufacturer each"""
+
+    # 4-digit labeler codes never collide with 5-digit ones, even in the
+    # zero-padded 11-digit form used in claims
+    _RANGES = {4: (1000, 9000), 5: (10000, 90000)}
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.taken = {4: 0, 5: 0}
+        self.current: Dict[int, List[Any]] = {}
+        self.layouts = [layout for layout, _ in NDC_CONFIGURATIONS]
+        self.layout_weights = list(accumulate(weight for _, weight in NDC_CONFIGURATIONS))
+
+    def _new_labeler(self) -> List[Any]:
+        layout = self.layouts[bisect(self.layout_weights, self.rng.random() * self.layout_weights[-1])]
+        start, span = self._RANGES[layout[0]]
+        if self.taken[layout[0]] >= span:
+            raise ValueError(f"Out of {layout[0]}-digit labeler codes")
+        # Take codes in a scattered order rather than counting up
+        labeler = start + (self.taken[layout[0]] * _NAME_STRIDE) % span
+        self.taken[layout[0]] += 1
+        return [labeler, layout, 0]
+
+    def next(self, manufacturer: int) -> str:
+        state = self.current.get(manufacturer)
+        if state is None or state[2] >= 10 ** state[1][1]:
+            state = self.current[manufacturer] = self._new_labeler()
+        labeler, (labeler_digits, product_digits, package_digits), taken = state
+        state[2] += 1
+        product = (taken * _NAME_STRIDE) % 10 ** product_digits
+        package = self.rng.randrange(10 ** package_digits)
+        return f"{labeler:0{labeler_digits}d}-{product:0{product_digits}d}-{package:0{package_digits}d}"
+
+
+def generate_catalog(
+    rows: int,
+    seed: int = 0,
+    duplicate_rate: float = 0.05,
+    status_mix: Optional[Dict[str, float]] = None,
+    manufacturers: int = 2000,
+    zipf_exponent: float = 1.1,
+) -> Iterator[Dict[str, Any]]:
+    """Yield ``rows`` drug_skus records (see the module docstring)"""
+    if not 0 <= duplicate_rate < 1:
+        raise ValueError("duplicate_rate must be at least 0 and below 1")
+    if manufacturers < 1:
+        raise ValueError("manufacturers must be at least 1")
+    rng = random.Random(seed)
+    status_mix = status_mix or DEFAULT_STATUS_MIX
+    statuses = list(status_mix)
+    status_weights = list(accumulate(status_mix.values()))
+    makers = manufacturer_names(manufacturers)
+    maker_weights = list(accumulate(rank ** -zipf_exponent for rank in range(1, manufacturers + 1)))
+    name_length = _name_length(rows)
+    ndcs = _NDCAllocator(rng)
+    # (maker index, name, dosage form, strength) of recent distinct products
+    pool: List[Tuple[int, str, str, str]] = []
+    products = 0
+
+    for i in range(rows):
+        # Exactly floor(rows * duplicate_rate) duplicates, evenly spread
+        if pool and int((i + 1) * duplicate_rate) > int(i * duplicate_rate):
+            maker, name, form, strength = rng.choice(pool)
+            manufacturer = makers[maker]
+            if rng.random() < 0.5:
+                name, manufacturer = fuzzy_variant(name, rng), fuzzy_variant(manufacturer, rng)
+        else:
+            maker = bisect(maker_weights, rng.random() * maker_weights[-1])
+            manufacturer = makers[maker]
+            ingredient, strengths, forms = INGREDIENTS[rng.randrange(len(INGREDIENTS))]
+            strength, form = rng.choice(strengths), rng.choice(forms)
+            name = f"{_coined_name(products, name_length)} ({ingredient}) {strength} {form}"
+            products += 1
+            entry = (maker, name, form, strength)
+            if len(pool) < _DUPLICATE_POOL_SIZE:
+                pool.append(entry)
+            else:
+                pool[rng.randrange(_DUPLICATE_POOL_SIZE)] = entry
+
+        ndc = ndcs.next(maker)
+        yield {
+            "ndc": ndc,
+            "name": name,
+            "manufacturer": manufacturer,
+            "dosage_form": form,
+            "strength": strength,
+            "package_size": rng.choice(PACKAGES[form.split()[-1]]),
+            "status": statuses[bisect(status_weights, rng.random() * status_weights[-1])],
+            "gtin": ndc_to_gtin(ndc),
+            "created_by": SEED_CREATED_BY,
+        }
+
+
+def load_catalog(engine, records: Iterable[Dict[str, Any]], chunk_size: int = BULK_IMPORT_CHUNK_ROWS) -> Dict[str, Any]:
+    """Bulk insert generated records, returning the import report"""
+    with bulk_load(engine):
+        return import_records(engine, records, "generated", chunk_size=chunk_size)
+
+
+def write_ndjson(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    opener = gzip.open if path.endswith(".gz") else open
+    count = 0
+    with opener(path, "wt") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic SKU catalog")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05,
+                        help="Fraction of rows repeating an earlier product (default 0.05)")
+    parser.add_argument("--status-mix", type=parse_status_mix,
+                        help="STATUS=WEIGHT,... (default APPROVED=60,PENDING_REVIEW=15,DRAFT=15,REJECTED=5,DELETED=5)")
+    parser.add_argument("--manufacturers", type=int, default=2000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of manufacturer popularity")
+    parser.add_argument("--output", help="Write NDJSON (.gz to compress) instead of the database")
+    parser.add_argument("--chunk-size", type=int, default=BULK_IMPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    records = generate_catalog(
+        args.rows, args.seed, args.duplicate_rate, args.status_mix, args.manufacturers, args.zipf,
+    )
+    started = time.perf_counter()
+    if args.output:
+        count = write_ndjson(args.output, records)
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {count} rows to {args.output} in {elapsed:.1f}s ({count / elapsed:.0f} rows/sec)")
+        return
+
+    from models import engine, init_db
+
+    init_db()
+    report = load_catalog(engine, records, args.chunk_size)
+    # Timed here rather than from the report, to include the index rebuild
+    elapsed = time.perf_counter() - started
+    print(f"{report['rows']} rows in {elapsed:.1f}s ({report['rows'] / elapsed:.0f} rows/sec): "
+          f"{report['inserted']} inserted, {report['skipped']} skipped, {report['failed']} failed")
+    for error in report["errors"][:10]:
+        print(f"  row {error['row']} ({error['ndc']}): {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
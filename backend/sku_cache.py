@@ -0,0 +1,263 @@
+"""Read-through cache for single SKUs and first search pages.
+
+Entries are JSON-ready values: a SKU as a dict, a search page as its
+encoded JSON text. Two backends are available:
+
+- ``memory``: a TTL + LRU dict private to each worker process. A write
+  only invalidates the worker that handled it, so this backend is
+  refused when WEB_CONCURRENCY is above 1; it is the default otherwise.
+- ``redis``: any Redis-protocol server, shared by all workers. It needs
+  the ``redis`` package.
+- ``none``: no caching; the default with several workers.
+
+Invalidation relies on generation counters. A single-SKU write deletes
+that SKU's entry and bumps the search generation. Bulk writes also bump
+the SKU generation. Old entries are never read again and age out
+through the TTL or the LRU. A read that races a write can still cache
+a stale value, and the TTL bounds how long that lasts.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import time
+
+from db_pool import WEB_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+SKU_CACHE_BACKEND = os.environ.get("SKU_CACHE_BACKEND", "memory" if WEB_CONCURRENCY <= 1 else "none").lower()
+SKU_CACHE_REDIS_URL = os.environ.get("SKU_CACHE_REDIS_URL", "redis://localhost:6379/0")
+SKU_CACHE_TTL = float(os.environ.get("SKU_CACHE_TTL", 30))
+SKU_CACHE_MAX_ENTRIES = int(os.environ.get("SKU_CACHE_MAX_ENTRIES", 10000))
+# Larger first pages are not worth holding in memory
+SKU_CACHE_MAX_PAGE_SIZE = int(os.environ.get("SKU_CACHE_MAX_PAGE_SIZE", 100))
+
+NAMESPACE_SKU = "sku"
+NAMESPACE_SEARCH = "search"
+
+
+class MemoryBackend:
+    """Per-process TTL + LRU store. Values are kept as-is, not copied."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = SKU_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    async def close(self):
+        self._entries.clear()
+
+
+class RedisBackend:
+    """Shared store on a Redis-protocol server (Redis, Valkey, KeyDB...)"""
+
+    name = "redis"
+    evictions = 0
+
+    def __init__(self, url: str = SKU_CACHE_REDIS_URL, prefix: str = "skuapp:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("SKU_CACHE_BACKEND=redis requires the redis package (pip install redis)")
+        self._client = redis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        payload = await self._client.get(self._prefix + key)
+        return json.loads(payload) if payload is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._client.set(self._prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._client.delete(self._prefix + key)
+
+    async def counter(self, key: str) -> int:
+        value = await self._client.get(self._prefix + key)
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(self._prefix + key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+    async def close(self):
+        # aclose() replaced close() in redis-py 5
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
+
+
+class SKUCache:
+    """Read-through cache facade used by the API routes.
+
+    Backend errors are logged and treated as misses, so a Redis outage
+    slows requests down instead of failing them.
+    """
+
+    def __init__(self, backend=None, ttl: float = SKU_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = {NAMESPACE_SKU: 0, NAMESPACE_SEARCH: 0}
+        self.misses = {NAMESPACE_SKU: 0, NAMESPACE_SEARCH: 0}
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def _generation(self, namespace: str) -> int:
+        return await self.backend.counter(f"generation:{namespace}")
+
+    async def _key(self, namespace: str, suffix: str) -> str:
+        return f"{namespace}:{await self._generation(namespace)}:{suffix}"
+
+    async def _get(self, namespace: str, suffix: str):
+        """(key, value) for a lookup; key is None when the cache is unusable"""
+        if not self.enabled:
+            return None, None
+        try:
+            key = await self._key(namespace, suffix)
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("SKU cache read failed: %s", e)
+            return None, None
+        if value is None:
+            self.misses[namespace] += 1
+        else:
+            self.hits[namespace] += 1
+        return key, value
+
+    async def _set(self, key: Optional[str], value: Any):
+        if key is None:
+            return
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("SKU cache write failed: %s", e)
+
+    async def get_sku(self, sku_id: int):
+        """Returns (key, cached value or None); pass the key to set_sku"""
+        return await self._get(NAMESPACE_SKU, str(sku_id))
+
+    async def get_search(self, params: Dict[str, Any]):
+        """Returns (key, cached value or None); pass the key to set_search"""
+        canonical = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(canonical.encode()).hexdigest()
+        return await self._get(NAMESPACE_SEARCH, digest)
+
+    async def set_sku(self, key: Optional[str], value: Any):
+        # The key was taken before the database read, so a value read
+        # before a bulk invalidation lands under the old generation
+        await self._set(key, value)
+
+    async def set_search(self, key: Optional[str], value: Any):
+        await self._set(key, value)
+
+    async def invalidate_sku(self, sku_id: int):
+        """After a single-SKU create, update or delete"""
+        if not self.enabled:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.delete(await self._key(NAMESPACE_SKU, str(sku_id)))
+            await self.backend.incr(f"generation:{NAMESPACE_SEARCH}")
+        except Exception as e:
+            self.errors += 1
+            logger.warning("SKU cache invalidation failed: %s", e)
+
+    async def invalidate_all(self):
+        """After bulk writes that may touch any SKU"""
+        if not self.enabled:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.incr(f"generation:{NAMESPACE_SKU}")
+            await self.backend.incr(f"generation:{NAMESPACE_SEARCH}")
+        except Exception as e:
+            self.errors += 1
+            logger.warning("SKU cache invalidation failed: %s", e)
+
+    async def close(self):
+        if self.enabled:
+            await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        def rate(hits, misses):
+            return round(hits / (hits + misses), 4) if hits + misses else None
+
+        stats = {
+            "backend": self.backend.name if self.enabled else None,
+            "ttl_seconds": self.ttl,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+        for namespace in (NAMESPACE_SKU, NAMESPACE_SEARCH):
+            stats[namespace] = {
+                "hits": self.hits[namespace],
+                "misses": self.misses[namespace],
+                "hit_rate": rate(self.hits[namespace], self.misses[namespace]),
+            }
+        total_hits = sum(self.hits.values())
+        stats["hit_rate"] = rate(total_hits, sum(self.misses.values()))
+        if self.enabled:
+            stats["entries"] = self.backend.size()
+            stats["evictions"] = self.backend.evictions
+        return stats
+
+
+def create_cache(backend: str = SKU_CACHE_BACKEND, workers: int = WEB_CONCURRENCY) -> SKUCache:
+    """Cache configured from SKU_CACHE_BACKEND (memory, redis or none)"""
+    if backend in ("none", "off", ""):
+        return SKUCache(None)
+    if backend == "redis":
+        return SKUCache(RedisBackend(SKU_CACHE_REDIS_URL))
+    if backend != "memory":
+        raise ValueError(f"Unknown SKU_CACHE_BACKEND '{backend}'")
+    if workers > 1:
+        # Other workers would keep serving (and 304-ing) what a write replaced
+        raise ValueError(
+            f"SKU_CACHE_BACKEND=memory is per process and cannot be invalidated across "
+            f"WEB_CONCURRENCY={workers} workers; use redis or none"
+        )
+    return SKUCache(MemoryBackend(SKU_CACHE_MAX_ENTRIES))
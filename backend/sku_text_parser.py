@@ -0,0 +1,154 @@
+"""Compiled extractor that turns OCR'd label text into SKU fields.
+
+All patterns are compiled once. Dosage forms and manufacturers are matched
+together by one trie-compiled keyword automaton, so a single scan of the text
+finds every dictionary hit however long the lists grow. The product-name heuristic
+is a single linear pass over the words.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+import re
+
+DOSAGE_FORMS = ("TABLET", "CAPSULE", "INJECTION", "SOLUTION", "CREAM", "OINTMENT", "DROPS", "SYRUP")
+MANUFACTURERS = ("PFIZER", "MERCK", "ABBOTT", "NOVARTIS", "ROCHE", "GSK", "BRISTOL", "JOHNSON", "TEVA")
+
+# NDC (National Drug Code) - format: 12345-123-12 or similar
+NDC_PATTERN = re.compile(r'\b\d{4,5}-\d{2,4}-\d{1,2}\b')
+# Strength (mg, mcg, etc.)
+STRENGTH_PATTERN = re.compile(r'\b\d+\.?\d*\s?(mg|mcg|g|ml|%)\b', re.IGNORECASE)
+
+
+class KeywordAutomaton:
+    """Multi-keyword matcher built from a trie of all keywords.
+
+    The trie is compiled into one regular expression (an Aho-Corasick-style
+    dictionary executed by the C regex engine): at every text position the
+    engine follows a single trie path, so cost grows with the text and the
+    keyword length, not with the number of keywords. The longest keyword at
+    each position is matched; shorter keywords starting there are its
+    prefixes and are recovered from the trie.
+    """
+
+    _TERMINAL = ""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]]):
+        self._trie: Dict[str, Any] = {}
+        for keyword, payload in keywords:
+            if not keyword:
+                continue
+            node = self._trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node.setdefault(self._TERMINAL, []).append(payload)
+
+        pattern = self._node_pattern(self._trie)
+        self._regex = re.compile(pattern, re.DOTALL) if pattern else None
+
+    @classmethod
+    def _node_pattern(cls, node: Dict[str, Any]) -> str:
+        branches = [
+            re.escape(char) + cls._node_pattern(child)
+            for char, child in sorted(node.items())
+            if char != cls._TERMINAL
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if cls._TERMINAL in node:
+            # Greedy: prefer continuing to a longer keyword
+            body = "(?:" + body + ")?"
+        return body
+
+    def iter_matches(self, text: str) -> Iterator[Any]:
+        if self._regex is None:
+            return
+        search = self._regex.search
+        match = search(text)
+        while match:
+            node = self._trie
+            for char in match.group():
+                node = node[char]
+                yield from node.get(self._TERMINAL, ())
+            # Restart one character on so overlapping keywords are found too
+            match = search(text, match.start() + 1)
+
+
+class SKUTextParser:
+    """Precompiled SKU field extractor.
+
+    When several dictionary entries occur in the text, the one listed first
+    wins (not the one appearing first in the text), matching the original
+    list-scan behaviour.
+    """
+
+    def __init__(
+        self,
+        dosage_forms: Sequence[str] = DOSAGE_FORMS,
+        manufacturers: Sequence[str] = MANUFACTURERS,
+    ):
+        self.dosage_forms = tuple(form.upper() for form in dosage_forms)
+        self.manufacturers = tuple(mfg.upper() for mfg in manufacturers)
+        keywords = [(form, ("dosage_form", rank)) for rank, form in enumerate(self.dosage_forms)]
+        keywords += [(mfg, ("manufacturer", rank)) for rank, mfg in enumerate(self.manufacturers)]
+        self._automaton = KeywordAutomaton(keywords)
+
+    def _dictionary_fields(self, text_upper: str) -> Dict[str, str]:
+        best = {}
+        for field, rank in self._automaton.iter_matches(text_upper):
+            if rank < best.get(field, len(self.dosage_forms) + len(self.manufacturers)):
+                best[field] = rank
+
+        fields = {}
+        if "dosage_form" in best:
+            fields["dosage_form"] = self.dosage_forms[best["dosage_form"]].lower()
+        if "manufacturer" in best:
+            fields["manufacturer"] = self.manufacturers[best["manufacturer"]].title()
+        return fields
+
+    @staticmethod
+    def _product_name(words: List[str]) -> str:
+        """Longest phrase of two or more consecutive uppercase/numeric words
+        that starts with an uppercase word longer than three characters.
+
+        Every start inside the same run of uppercase/numeric words extends to
+        the same run end, so only the earliest start in each run can be the
+        longest candidate; one pass over the words is enough.
+        """
+        best = ""
+        start = None
+        for i, word in enumerate(words + [""]):
+            if word and (word.isupper() or word.isdigit()):
+                if start is None and word.isupper() and len(word) > 3:
+                    start = i
+                continue
+            # End of a run
+            if start is not None and i - start >= 2:
+                candidate = " ".join(words[start:i])
+                if len(candidate) > len(best):
+                    best = candidate
+            start = None
+        return best
+
+    def parse(self, text: str) -> Dict[str, Any]:
+        sku_data = {
+            "ndc": "",
+            "name": "",
+            "manufacturer": "",
+            "dosage_form": "",
+            "strength": "",
+            "package_size": ""
+        }
+
+        ndc_match = NDC_PATTERN.search(text)
+        if ndc_match:
+            sku_data["ndc"] = ndc_match.group()
+
+        strength_match = STRENGTH_PATTERN.search(text)
+        if strength_match:
+            sku_data["strength"] = strength_match.group()
+
+        sku_data.update(self._dictionary_fields(text.upper()))
+        sku_data["name"] = self._product_name(text.split())
+        return sku_data
+
+
+default_parser = SKUTextParser()
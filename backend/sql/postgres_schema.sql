@@ -2,6 +2,8 @@
 -- This file contains the DDL statements to create the necessary tables in PostgreSQL
 
 -- Drop tables if they already exist (safe for fresh installation)
+DROP TABLE IF EXISTS catalog_version CASCADE;
+DROP TABLE IF EXISTS sku_changes CASCADE;
 DROP TABLE IF EXISTS drug_skus CASCADE;
 DROP TABLE IF EXISTS images CASCADE;
 DROP TABLE IF EXISTS attributes CASCADE;
@@ -36,6 +38,15 @@ CREATE TABLE images (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create enum type for status
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'skustatus') THEN
+        CREATE TYPE skustatus AS ENUM ('DRAFT', 'PENDING_REVIEW', 'APPROVED', 'REJECTED', 'DELETED');
+    END IF;
+END
+$$;
+
 -- Create drug_skus table for the main application data
 CREATE TABLE drug_skus (
     id SERIAL PRIMARY KEY,
@@ -47,25 +58,43 @@ CREATE TABLE drug_skus (
     package_size TEXT NOT NULL,
     gtin TEXT,
     image_url TEXT,
-    status TEXT NOT NULL,
+    status skustatus NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_modified TIMESTAMP,
     created_by TEXT,
-    reviewed_by TEXT
+    reviewed_by TEXT,
+    version INTEGER NOT NULL DEFAULT 1
 );
 
--- Create index on ndc field for faster lookups
-CREATE INDEX idx_drug_skus_ndc ON drug_skus(ndc);
-CREATE INDEX idx_drug_skus_name ON drug_skus(name);
+-- Indexes for the API's hot queries (ndc lookups use the UNIQUE constraint).
+-- Keep in step with backend/migrations; a database created from this file
+-- is at the latest revision: run "alembic stamp head" once.
+CREATE INDEX ix_drug_skus_name_id ON drug_skus(name, id);
+CREATE INDEX ix_drug_skus_status_last_modified ON drug_skus(status, last_modified);
+CREATE INDEX ix_drug_skus_pending_review ON drug_skus(id) WHERE status = 'PENDING_REVIEW';
+CREATE INDEX ix_drug_skus_changed_at ON drug_skus(coalesce(last_modified, created_at), id);
 
--- Create enum type for status
-DO $$
-BEGIN
-    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'skustatus') THEN
-        CREATE TYPE skustatus AS ENUM ('DRAFT', 'PENDING_REVIEW', 'APPROVED', 'REJECTED', 'DELETED');
-    END IF;
-END
-$$;
+-- Trigram indexes so substring searches (LIKE/ILIKE '%term%') avoid full table scans
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_drug_skus_ndc_trgm ON drug_skus USING gin (ndc gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_drug_skus_name_trgm ON drug_skus USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_drug_skus_manufacturer_trgm ON drug_skus USING gin (manufacturer gin_trgm_ops);
+
+-- Single-row counter bumped by every write to drug_skus (search ETags)
+CREATE TABLE catalog_version (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO catalog_version (id, version) VALUES (1, 0);
+
+-- Append-only log of drug_skus writes; id is the change-feed offset
+CREATE TABLE sku_changes (
+    id SERIAL PRIMARY KEY,
+    sku_id INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    changed_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_sku_changes_changed_at ON sku_changes(changed_at);
 
 -- Add comments for documentation
 COMMENT ON TABLE drug_skus IS 'Main table for storing drug SKU information';
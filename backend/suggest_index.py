@@ -0,0 +1,427 @@
+"""In-memory prefix index behind GET /api/skus/suggest.
+
+Typeahead needs to run on every keystroke, too often for a
+``LIKE '%term%'`` scan. Each worker keeps a sorted array of normalized
+keys (see SortedKeys) instead. The keys are the SKU's name, each of the name's word
+suffixes (so "10mg" finds "Lisinopril 10mg"), its NDC with and without
+dashes, and its manufacturer. A lookup is one bisect plus a short scan.
+Keys are stored in order, so the first k distinct SKUs found are the
+best matches: exact and shorter keys come first, then alphabetical
+order.
+
+The index is built at startup and then follows the sku_changes log (see
+change_feed.py). Writes in this worker wake the follower as soon as they
+commit, and writes from other workers are picked up within
+CHANGE_FEED_POLL_SECONDS. Small batches of changes are applied in
+place. Large ones, such as a bulk import, are merged in one sort.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+import asyncio
+import heapq
+import logging
+import os
+import re
+import sys
+import time
+
+from models import AsyncSessionLocal, DrugSKU, SKUChange, engine
+from change_feed import CHANGE_FEED_POLL_SECONDS, OP_DELETE, ChangeNotifier, fetch_changes, is_gap, log_bounds
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_INDEX_ENABLED = os.environ.get("SUGGEST_INDEX_ENABLED", "1").lower() not in ("0", "false", "no")
+SUGGEST_MAX_LIMIT = int(os.environ.get("SUGGEST_MAX_LIMIT", 50))
+# Upper bound on keys examined per lookup, so a one-letter prefix over a
+# huge catalog stays fast even when a status filter rejects most hits
+SUGGEST_MAX_SCAN = int(os.environ.get("SUGGEST_MAX_SCAN", 5000))
+# Change batches touching more SKUs than this are merged with one sort
+# instead of inserting key by key
+SUGGEST_MERGE_THRESHOLD = 256
+# Pending changes the follower applies at once; a longer backlog rebuilds
+SUGGEST_FOLLOW_BATCH = int(os.environ.get("SUGGEST_FOLLOW_BATCH", 20000))
+_BUILD_BATCH = 10000
+
+FIELD_NAME = 0
+FIELD_NDC = 1
+FIELD_MANUFACTURER = 2
+FIELD_LABELS = ("name", "ndc", "manufacturer")
+
+_SPACES = re.compile(r"\s+")
+_NON_DIGITS = re.compile(r"\D")
+
+# (ndc, name, manufacturer, status)
+Doc = Tuple[Optional[str], str, str, str]
+
+
+def normalize(text: Optional[str]) -> str:
+    return _SPACES.sub(" ", text or "").strip().casefold()
+
+
+def index_keys(ndc: Optional[str], name: str, manufacturer: str) -> List[Tuple[str, int]]:
+    """Distinct (key, field) pairs to index for one SKU.
+
+    Keys are interned: word suffixes such as "tablets" and manufacturer
+    names repeat across many SKUs.
+    """
+    keys = []
+    name = normalize(name)
+    if name:
+        keys.append((name, FIELD_NAME))
+        # Suffixes starting at each later word
+        for match in re.finditer(" ", name):
+            keys.append((name[match.end():], FIELD_NAME))
+    ndc = normalize(ndc)
+    if ndc:
+        keys.append((ndc, FIELD_NDC))
+        digits = _NON_DIGITS.sub("", ndc)
+        if digits and digits != ndc:
+            keys.append((digits, FIELD_NDC))
+    manufacturer = normalize(manufacturer)
+    if manufacturer:
+        keys.append((manufacturer, FIELD_MANUFACTURER))
+    return [(sys.intern(key), field) for key, field in dict.fromkeys(keys)]
+
+
+def _status_value(status: Any) -> str:
+    return getattr(status, "value", status)
+
+
+class SortedKeys:
+    """(key, SKU id, field) entries kept sorted, in buckets.
+
+    Each bucket is a sorted key list with parallel compact id/field
+    arrays. An insert or delete only shifts one bucket, so an update
+    costs about the same at 10k SKUs as at 1M. ``maxes`` holds the last
+    key of each bucket, for bisecting to the right one.
+    """
+
+    LOAD = 1000
+
+    def __init__(self, entries: Iterable[Tuple[str, int, int]] = ()):
+        """``entries`` must already be sorted"""
+        self._keys: List[List[str]] = []
+        self._ids: List[array] = []
+        self._fields: List[array] = []
+        self._maxes: List[str] = []
+        self._len = 0
+        bucket = []
+        for entry in entries:
+            bucket.append(entry)
+            if len(bucket) == self.LOAD:
+                self._append_bucket(bucket)
+                bucket = []
+        if bucket:
+            self._append_bucket(bucket)
+
+    def _append_bucket(self, entries):
+        self._keys.append([key for key, _, _ in entries])
+        self._ids.append(array("q", (sku_id for _, sku_id, _ in entries)))
+        self._fields.append(array("b", (field for _, _, field in entries)))
+        self._maxes.append(entries[-1][0])
+        self._len += len(entries)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int]]:
+        for keys, ids, fields in zip(self._keys, self._ids, self._fields):
+            yield from zip(keys, ids, fields)
+
+    def _position(self, key: str, sku_id: int, field: int) -> Tuple[int, int]:
+        """(bucket, index) of the first entry >= (key, sku_id, field).
+
+        Entries sharing a key are ordered by id and field, as in a fresh
+        build, and may run on into the following buckets.
+        """
+        b = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+        while (
+            b + 1 < len(self._keys)
+            and self._maxes[b] == key
+            and (self._keys[b + 1][0], self._ids[b + 1][0], self._fields[b + 1][0]) <= (key, sku_id, field)
+        ):
+            b += 1
+        keys, ids, fields = self._keys[b], self._ids[b], self._fields[b]
+        lo = bisect_left(keys, key)
+        hi = bisect_right(keys, key, lo)
+        i = bisect_left(ids, sku_id, lo, hi)
+        while i < hi and ids[i] == sku_id and fields[i] < field:
+            i += 1
+        return b, i
+
+    def insert(self, key: str, sku_id: int, field: int):
+        if not self._keys:
+            self._append_bucket([(key, sku_id, field)])
+            return
+        b, i = self._position(key, sku_id, field)
+        keys, ids, fields = self._keys[b], self._ids[b], self._fields[b]
+        keys.insert(i, key)
+        ids.insert(i, sku_id)
+        fields.insert(i, field)
+        self._maxes[b] = keys[-1]
+        self._len += 1
+        if len(keys) > 2 * self.LOAD:
+            half = len(keys) // 2
+            self._keys[b + 1:b + 1] = [keys[half:]]
+            self._ids[b + 1:b + 1] = [ids[half:]]
+            self._fields[b + 1:b + 1] = [fields[half:]]
+            del keys[half:], ids[half:], fields[half:]
+            self._maxes[b:b + 1] = [keys[-1], self._keys[b + 1][-1]]
+
+    def remove(self, key: str, sku_id: int, field: int) -> bool:
+        if not self._keys:
+            return False
+        b, i = self._position(key, sku_id, field)
+        keys, ids, fields = self._keys[b], self._ids[b], self._fields[b]
+        if i == len(keys) or (keys[i], ids[i], fields[i]) != (key, sku_id, field):
+            return False
+        del keys[i], ids[i], fields[i]
+        self._len -= 1
+        if keys:
+            self._maxes[b] = keys[-1]
+        else:
+            del self._keys[b], self._ids[b], self._fields[b], self._maxes[b]
+        return True
+
+    def iter_from(self, key: str) -> Iterator[Tuple[str, int, int]]:
+        """Entries in order, starting at the first one >= ``key``"""
+        b = bisect_left(self._maxes, key)
+        if b == len(self._keys):
+            return
+        i = bisect_left(self._keys[b], key)
+        for keys, ids, fields in zip(self._keys[b:], self._ids[b:], self._fields[b:]):
+            for j in range(i, len(keys)):
+                yield keys[j], ids[j], fields[j]
+            i = 0
+
+    def memory_bytes(self, seen: set) -> int:
+        total = sum(sys.getsizeof(part) for part in (self._keys, self._ids, self._fields, self._maxes))
+        for keys, ids, fields in zip(self._keys, self._ids, self._fields):
+            total += sys.getsizeof(keys) + sys.getsizeof(ids) + sys.getsizeof(fields)
+            for key in keys:
+                if id(key) not in seen:
+                    seen.add(id(key))
+                    total += sys.getsizeof(key)
+        return total
+
+
+class SuggestIndex:
+    """Prefix index over name, NDC and manufacturer.
+
+    ``entries`` holds the sorted keys. ``docs`` keeps each SKU's display
+    fields, which are also used to find the old keys when an SKU changes.
+    Small updates happen in place on the event loop. Builds and merges
+    construct new structures and swap them in.
+    """
+
+    def __init__(self):
+        self.entries = SortedKeys()
+        self.docs: Dict[int, Doc] = {}
+        self.offset = 0
+        self.ready = False
+        self.build_seconds: Optional[float] = None
+        self.changes_applied = 0
+        self.rebuilds = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _load(self, docs: Dict[int, Doc]):
+        entries = SortedKeys(sorted(
+            (key, sku_id, field)
+            for sku_id, (ndc, name, manufacturer, _) in docs.items()
+            for key, field in index_keys(ndc, name, manufacturer)
+        ))
+        # Swap both in at once; lookups never see a partial build
+        self.entries, self.docs = entries, docs
+
+    # -- building ---------------------------------------------------------
+
+    def build(self, engine: Engine):
+        """Load every SKU through the sync engine; run it in a threadpool.
+
+        The log offset is read before the rows, so changes committed while
+        loading are replayed afterwards (applying a change is idempotent).
+        """
+        started = time.perf_counter()
+        docs = {}
+        with engine.connect() as conn:
+            offset = conn.scalar(select(func.max(SKUChange.id))) or 0
+            query = select(DrugSKU.id, DrugSKU.ndc, DrugSKU.name, DrugSKU.manufacturer, DrugSKU.status)
+            result = conn.execution_options(yield_per=_BUILD_BATCH).execute(query)
+            for sku_id, ndc, name, manufacturer, status in result:
+                docs[sku_id] = (ndc, name, manufacturer, _status_value(status))
+
+        self._load(docs)
+        self.offset = offset
+        self.ready = True
+        self.build_seconds = time.perf_counter() - started
+        logger.info("Suggest index built: %d SKUs, %d keys in %.2fs", len(docs), len(self.entries), self.build_seconds)
+
+    # -- incremental updates -----------------------------------------------
+
+    def upsert(self, sku_id: int, ndc: Optional[str], name: str, manufacturer: str, status: Any):
+        doc = (ndc, name, manufacturer, _status_value(status))
+        old = self.docs.get(sku_id)
+        if old is not None and old[:3] == doc[:3]:
+            # Status-only change: the keys stay put
+            self.docs[sku_id] = doc
+            return
+        if old is not None:
+            for key, field in index_keys(*old[:3]):
+                self.entries.remove(key, sku_id, field)
+        for key, field in index_keys(ndc, name, manufacturer):
+            self.entries.insert(key, sku_id, field)
+        self.docs[sku_id] = doc
+
+    def remove(self, sku_id: int):
+        old = self.docs.pop(sku_id, None)
+        if old is not None:
+            for key, field in index_keys(*old[:3]):
+                self.entries.remove(key, sku_id, field)
+
+    def merge(self, changed: Dict[int, Optional[Doc]]):
+        """Apply many changes (id -> doc, None to delete) with one sort.
+
+        Builds new structures and swaps them in, so it may run in a thread
+        while lookups continue on the event loop.
+        """
+        docs = dict(self.docs)
+        kept = [entry for entry in self.entries if entry[1] not in changed]
+        added = []
+        for sku_id, doc in changed.items():
+            if doc is None:
+                docs.pop(sku_id, None)
+                continue
+            docs[sku_id] = doc
+            added.extend((key, sku_id, field) for key, field in index_keys(*doc[:3]))
+        added.sort()
+        entries = SortedKeys(heapq.merge(kept, added))
+        self.entries, self.docs = entries, docs
+
+    def _collapse(self, changes: List[Dict[str, Any]]) -> Dict[int, Optional[Doc]]:
+        """Latest doc (None once deleted) per SKU in a batch of changes"""
+        latest: Dict[int, Optional[Doc]] = {}
+        for change in changes:
+            sku = change["sku"]
+            if change["op"] == OP_DELETE or sku is None:
+                latest[change["sku_id"]] = None
+            else:
+                latest[change["sku_id"]] = (sku["ndc"], sku["name"], sku["manufacturer"], _status_value(sku["status"]))
+        return latest
+
+    def _apply_in_place(self, latest: Dict[int, Optional[Doc]]):
+        for sku_id, doc in latest.items():
+            if doc is None:
+                self.remove(sku_id)
+            else:
+                self.upsert(sku_id, *doc)
+
+    def _advance(self, changes: List[Dict[str, Any]]):
+        self.offset = changes[-1]["offset"]
+        self.changes_applied += len(changes)
+
+    def apply_changes(self, changes: List[Dict[str, Any]]):
+        """Apply change_feed.fetch_changes() entries, in offset order"""
+        if not changes:
+            return
+        latest = self._collapse(changes)
+        if len(latest) > SUGGEST_MERGE_THRESHOLD:
+            self.merge(latest)
+        else:
+            self._apply_in_place(latest)
+        self._advance(changes)
+
+    async def follow(self, notifier: ChangeNotifier, poll_interval: float = CHANGE_FEED_POLL_SECONDS):
+        """Keep the index in step with the change log; run as a background task.
+
+        Large batches are merged in a worker thread. A backlog bigger than
+        one batch, or one that was pruned away, triggers a full rebuild,
+        which is cheaper than merging over and over.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            wake = notifier.current()
+            try:
+                async with AsyncSessionLocal() as db:
+                    oldest, latest = await log_bounds(db)
+                    gap = is_gap(self.offset, oldest, latest)
+                    changes = [] if gap else await fetch_changes(db, self.offset, SUGGEST_FOLLOW_BATCH + 1)
+                if gap or len(changes) > SUGGEST_FOLLOW_BATCH:
+                    logger.info("Suggest index is far behind the change log; rebuilding")
+                    self.rebuilds += 1
+                    await loop.run_in_executor(None, self.build, engine)
+                    continue
+                if changes:
+                    latest = self._collapse(changes)
+                    if len(latest) > SUGGEST_MERGE_THRESHOLD:
+                        await loop.run_in_executor(None, self.merge, latest)
+                    else:
+                        self._apply_in_place(latest)
+                    self._advance(changes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Suggest index update failed: %s", e)
+            await notifier.wait(wake, poll_interval)
+
+    # -- lookups -----------------------------------------------------------
+
+    def suggest(self, prefix: str, limit: int = 10, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top ``limit`` SKUs with a key starting with ``prefix``"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        docs = self.docs
+        results = []
+        seen = set()
+        for scanned, (key, sku_id, field) in enumerate(self.entries.iter_from(prefix)):
+            if len(results) >= limit or scanned >= SUGGEST_MAX_SCAN or not key.startswith(prefix):
+                break
+            if sku_id in seen:
+                continue
+            seen.add(sku_id)
+            doc = docs.get(sku_id)
+            if doc is None:
+                continue
+            ndc, name, manufacturer, sku_status = doc
+            if status is None or sku_status == status:
+                results.append({
+                    "id": sku_id,
+                    "ndc": ndc,
+                    "name": name,
+                    "manufacturer": manufacturer,
+                    "status": sku_status,
+                    "match": FIELD_LABELS[field],
+                })
+        return results
+
+    # -- introspection -----------------------------------------------------
+
+    def memory_bytes(self) -> int:
+        """Approximate deep size of the index; shared strings count once"""
+        seen = set()
+        total = self.entries.memory_bytes(seen) + sys.getsizeof(self.docs)
+        for sku_id, doc in self.docs.items():
+            total += sys.getsizeof(sku_id) + sys.getsizeof(doc)
+            for value in doc:
+                if value is not None and id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": SUGGEST_INDEX_ENABLED,
+            "ready": self.ready,
+            "skus": len(self.docs),
+            "keys": len(self.entries),
+            "offset": self.offset,
+            "build_seconds": round(self.build_seconds, 3) if self.build_seconds is not None else None,
+            "changes_applied": self.changes_applied,
+            "rebuilds": self.rebuilds,
+            "memory_bytes": self.memory_bytes(),
+        }
@@ -0,0 +1,63 @@
+"""Shared test setup: a throwaway SQLite database built by the Alembic
+migrations, the query_audit fixture, and scratch databases for tests that
+must not share rows with the app's.
+
+Test modules import main (which calls init_db()) inside fixtures, after
+the migrations have run, so the schema under test is the migrated one.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# models reads these on import, so they are set before any test module loads
+_db_dir = tempfile.mkdtemp(prefix="sku-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+# Cache hits would make query counts depend on test order
+os.environ["SKU_CACHE_BACKEND"] = "none"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture
+def query_audit():
+    """Context manager failing the test on too many statements or an N+1.
+
+        with query_audit(max_queries=3) as audit:
+            client.get("/api/skus")
+    """
+    from functools import partial
+
+    from models import async_engine, engine
+    from query_audit import audit_queries
+
+    return partial(audit_queries, engine, async_engine)
+
+
+@pytest.fixture
+def scratch_engine(tmp_path):
+    """Sync engine on an empty SQLite file with the app's schema and search index"""
+    from sqlalchemy import create_engine, insert
+
+    from models import Base, CatalogVersion
+    from search_index import install_search_index
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'scratch.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(CatalogVersion).values(id=1, version=0))
+    install_search_index(engine)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,103 @@
+"""
+Bulk import outcomes: skip vs upsert counts, per-row validation errors,
+and a database error in one row not sinking the rest of its chunk.
+
+Usage (from backend/):
+    python -m pytest tests/test_bulk_import.py
+"""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select, text
+
+from bulk_import import MODE_SKIP, MODE_UPSERT, BulkImportError, import_records
+from models import DrugSKU, SKUChange
+
+
+def record(ndc, name="Amoxicillin 500mg", **fields):
+    return {
+        "ndc": ndc, "name": name, "manufacturer": "Acme", "dosage_form": "capsule",
+        "strength": "500mg", "package_size": "30", "status": "DRAFT", **fields,
+    }
+
+
+def names(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(DrugSKU.ndc, DrugSKU.name)).all())
+
+
+def change_count(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(SKUChange))
+
+
+def test_skip_and_upsert_counts(scratch_engine):
+    report = import_records(scratch_engine, [record("1"), record("2"), record("3")], "ndjson")
+    assert (report["inserted"], report["updated"], report["skipped"], report["failed"]) == (3, 0, 0, 0)
+
+    again = [record("2", "Renamed"), record("3", "Renamed"), record("4")]
+    report = import_records(scratch_engine, again, "ndjson", mode=MODE_SKIP)
+    assert (report["inserted"], report["updated"], report["skipped"], report["failed"]) == (1, 0, 2, 0)
+    assert {error["ndc"] for error in report["errors"]} == {"2", "3"}
+    assert names(scratch_engine)["2"] == "Amoxicillin 500mg"
+
+    again = [record("2", "Renamed"), record("3", "Renamed"), record("5")]
+    report = import_records(scratch_engine, again, "ndjson", mode=MODE_UPSERT)
+    assert (report["inserted"], report["updated"], report["skipped"], report["failed"]) == (1, 2, 0, 0)
+    assert names(scratch_engine)["3"] == "Renamed"
+    # One change-log row per written SKU: 3 + 1 + 3
+    assert change_count(scratch_engine) == 7
+
+
+def test_upsert_keeps_existing_image_url(scratch_engine):
+    import_records(scratch_engine, [record("1", image_url="https://img.example/1.png"), record("2")], "ndjson")
+
+    again = [record("1", "Renamed"), record("2", image_url="https://img.example/2.png")]
+    report = import_records(scratch_engine, again, "ndjson", mode=MODE_UPSERT)
+    assert report["updated"] == 2
+    with scratch_engine.connect() as conn:
+        rows = {row.ndc: row for row in conn.execute(select(DrugSKU.ndc, DrugSKU.name, DrugSKU.image_url))}
+    assert (rows["1"].name, rows["1"].image_url) == ("Renamed", "https://img.example/1.png")
+    # Like PUT, upsert never writes image_url
+    assert rows["2"].image_url is None
+
+
+def test_invalid_rows_are_reported_and_skipped(scratch_engine):
+    rows = [
+        record("1"),
+        record("2", status="LIVE"),
+        {"ndc": "3", "name": "No manufacturer"},
+        record("1", "Same NDC again"),
+        "not an object",
+        record("4"),
+    ]
+    report = import_records(scratch_engine, rows, "ndjson")
+    assert (report["inserted"], report["failed"]) == (2, 4)
+    errors = {error["row"]: error["error"] for error in report["errors"]}
+    assert "Invalid status" in errors[2]
+    assert "Missing required fields: manufacturer" in errors[3]
+    assert "first seen at row 1" in errors[4]
+    assert errors[5] == "Record is not an object"
+
+
+def test_database_error_is_isolated_to_its_row(scratch_engine):
+    with scratch_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TRIGGER reject_boom BEFORE INSERT ON drug_skus WHEN new.name = 'boom' "
+            "BEGIN SELECT RAISE(ABORT, 'boom rejected'); END"
+        ))
+
+    rows = [record("1"), record("2", "boom"), record("3"), record("4")]
+    report = import_records(scratch_engine, rows, "ndjson", chunk_size=4)
+    assert (report["inserted"], report["failed"]) == (3, 1)
+    assert report["errors"][0]["row"] == 2
+    assert "boom rejected" in report["errors"][0]["error"]
+    assert set(names(scratch_engine)) == {"1", "3", "4"}
+    # The retried rows were logged once each, the failed one not at all
+    assert change_count(scratch_engine) == 3
+
+
+def test_unsupported_database():
+    engine = SimpleNamespace(dialect=SimpleNamespace(name="mysql"))
+    with pytest.raises(BulkImportError, match="not mysql"):
+        import_records(engine, [record("1")], "ndjson")
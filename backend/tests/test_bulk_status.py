@@ -0,0 +1,143 @@
+"""
+Bulk status outcomes: a stale last_modified is a conflict even when the
+write it missed landed in the same second, a write between the read and
+the UPDATE is never overwritten, and locks are taken in the same order
+as every other writer.
+
+Usage (from backend/):
+    python -m pytest tests/test_bulk_status.py
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from bulk_status import NO_VERSION, transition_status
+from models import DrugSKU, SKUStatus
+
+
+def sku(ndc, status="DRAFT"):
+    return {
+        "ndc": ndc, "name": "Metformin 500mg", "manufacturer": "Acme",
+        "dosage_form": "tablet", "strength": "500mg", "package_size": "60", "status": status,
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    return TestClient(app)
+
+
+def create(client, ndc, status="DRAFT"):
+    response = client.post("/api/skus", json=sku(ndc, status))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def transition(client, **body):
+    response = client.patch("/api/skus", json=body)
+    assert response.status_code == 200, response.text
+    return {result["id"]: result for result in response.json()["results"]}
+
+
+def test_stale_last_modified_from_the_same_second_is_a_conflict(client):
+    created = create(client, "92000-001-01")
+    seen = client.put(f"/api/skus/{created['id']}", json={**sku("92000-001-01"), "strength": "750mg"}).json()
+    client.put(f"/api/skus/{created['id']}", json={**sku("92000-001-01"), "strength": "850mg"})
+
+    results = transition(client, status="APPROVED", items=[{"id": created["id"], "last_modified": seen["last_modified"]}])
+    assert results[created["id"]]["outcome"] == "conflict"
+    assert client.get(f"/api/skus/{created['id']}").json()["status"] == "DRAFT"
+
+    current = client.get(f"/api/skus/{created['id']}").json()
+    results = transition(client, status="APPROVED", items=[{"id": created["id"], "last_modified": current["last_modified"]}])
+    assert results[created["id"]]["outcome"] == "updated"
+    assert results[created["id"]]["last_modified"] != current["last_modified"]
+
+
+def test_status_mismatch_unchanged_and_not_found(client):
+    draft = create(client, "92000-002-01")
+    pending = create(client, "92000-002-02", "PENDING_REVIEW")
+    approved = create(client, "92000-002-03", "APPROVED")
+
+    results = transition(
+        client, status="APPROVED", from_status="PENDING_REVIEW",
+        ids=[draft["id"], pending["id"], approved["id"], 999999],
+    )
+    assert results[draft["id"]]["outcome"] == "status_mismatch"
+    assert results[pending["id"]]["outcome"] == "updated"
+    assert results[approved["id"]]["outcome"] == "status_mismatch"
+    assert results[999999]["outcome"] == "not_found"
+
+    results = transition(client, status="APPROVED", ids=[pending["id"], approved["id"]])
+    assert results[pending["id"]]["outcome"] == "unchanged"
+    assert results[approved["id"]]["outcome"] == "unchanged"
+    # No-op transitions leave the row alone
+    assert client.get(f"/api/skus/{approved['id']}").json()["last_modified"] is None
+
+
+def run_transition(scratch_engine, ids, between=None):
+    """transition_status on scratch_engine; returns (outcomes, SQL run).
+
+    ``between(db)`` runs right after the SKU rows have been read.
+    """
+    statements = []
+
+    async def run():
+        async_engine = create_async_engine(scratch_engine.url.set(drivername="sqlite+aiosqlite"))
+        event.listen(
+            async_engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        async with AsyncSession(async_engine) as db:
+            execute = db.execute
+
+            async def execute_after_read(statement, *args, **kwargs):
+                result = await execute(statement, *args, **kwargs)
+                if db.execute is execute_after_read and statement.is_select:
+                    db.execute = execute
+                    await between(db)
+                return result
+
+            if between is not None:
+                db.execute = execute_after_read
+            results = await transition_status(db, SKUStatus.APPROVED, dict.fromkeys(ids, NO_VERSION))
+        await async_engine.dispose()
+        return {result["id"]: result["outcome"] for result in results}
+
+    return asyncio.run(run()), statements
+
+
+@pytest.fixture
+def scratch_ids(scratch_engine):
+    with scratch_engine.begin() as conn:
+        conn.execute(insert(DrugSKU), [sku("1"), sku("2")])
+        return dict(conn.execute(select(DrugSKU.ndc, DrugSKU.id)).all())
+
+
+def test_catalog_version_is_locked_before_the_skus(scratch_engine, scratch_ids):
+    outcomes, statements = run_transition(scratch_engine, scratch_ids.values())
+    assert set(outcomes.values()) == {"updated"}
+    # Same lock order as main.commit_sku_write and bulk_import._write_chunk
+    words = [statement.split()[:2] for statement in statements]
+    assert words[0] == ["UPDATE", "catalog_version"]
+    assert words[1][0] == "SELECT"
+    assert words[2] == ["UPDATE", "drug_skus"]
+
+
+def test_write_between_read_and_update_is_a_conflict(scratch_engine, scratch_ids):
+    async def concurrent_write(db):
+        # Stands in for another writer's UPDATE on a database where the
+        # catalog_version lock would not keep it out
+        await db.execute(update(DrugSKU).where(DrugSKU.id == scratch_ids["1"]).values(strength="1000mg"))
+
+    outcomes, _ = run_transition(scratch_engine, scratch_ids.values(), between=concurrent_write)
+    assert outcomes == {scratch_ids["1"]: "conflict", scratch_ids["2"]: "updated"}
+    with scratch_engine.connect() as conn:
+        rows = {row.ndc: row for row in conn.execute(select(DrugSKU.ndc, DrugSKU.status, DrugSKU.strength, DrugSKU.version))}
+    assert (rows["1"].status, rows["1"].strength, rows["1"].version) == (SKUStatus.DRAFT, "1000mg", 2)
+    assert (rows["2"].status, rows["2"].version) == (SKUStatus.APPROVED, 2)
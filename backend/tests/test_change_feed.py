@@ -0,0 +1,135 @@
+"""
+Change feed: every write appends sku_changes rows in offset order, both
+the JSON pages and the SSE stream resume after a given offset, an offset
+the log cannot continue from is reset, and the log is pruned while the
+app runs.
+
+Usage (from backend/):
+    python -m pytest tests/test_change_feed.py
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from change_feed import ChangeNotifier, iter_change_events
+from models import SKUChange, engine
+
+SKU = {
+    "ndc": "94000-001-01", "name": "Levothyroxine 50mcg", "manufacturer": "Acme",
+    "dosage_form": "tablet", "strength": "50mcg", "package_size": "90", "status": "DRAFT",
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    return TestClient(app)
+
+
+def latest_offset():
+    with engine.connect() as conn:
+        return conn.scalar(select(func.coalesce(func.max(SKUChange.id), 0)))
+
+
+@pytest.fixture(scope="module")
+def writes(client):
+    """(offset before the writes, SKU id, the ops written in order)"""
+    start = latest_offset()
+    sku_id = client.post("/api/skus", json=SKU).json()["id"]
+    client.put(f"/api/skus/{sku_id}", json={**SKU, "strength": "75mcg"})
+    client.patch("/api/skus", json={"status": "APPROVED", "ids": [sku_id]})
+    client.patch(f"/api/skus/{sku_id}", json={"package_size": "30"})
+    client.delete(f"/api/skus/{sku_id}")
+    return start, sku_id, ["create", "update", "update", "update", "delete"]
+
+
+def test_writes_append_changes_in_offset_order(client, writes):
+    start, sku_id, ops = writes
+    page = client.get("/api/skus/changes", params={"since": start}).json()
+    changes = page["changes"]
+
+    offsets = [change["offset"] for change in changes]
+    assert offsets == sorted(offsets) and len(set(offsets)) == len(offsets)
+    assert offsets[0] > start
+    assert [(change["sku_id"], change["op"]) for change in changes] == [(sku_id, op) for op in ops]
+    assert page["next_offset"] == offsets[-1] == latest_offset()
+    # Events carry the SKU's current state, and it is gone
+    assert all(change["sku"] is None for change in changes)
+
+
+def test_pages_resume_from_next_offset(client, writes):
+    start, _, ops = writes
+    seen = []
+    since = start
+    while True:
+        page = client.get("/api/skus/changes", params={"since": since, "limit": 2}).json()
+        if not page["changes"]:
+            break
+        assert len(page["changes"]) <= 2
+        seen.extend(change["offset"] for change in page["changes"])
+        since = page["next_offset"]
+    everything = client.get("/api/skus/changes", params={"since": start}).json()["changes"]
+    assert seen == [change["offset"] for change in everything]
+    assert len(seen) == len(ops)
+    assert since == latest_offset()
+
+
+def test_stream_resumes_after_offset(client, writes):
+    start, _, ops = writes
+    expected = [change["offset"] for change in client.get("/api/skus/changes", params={"since": start}).json()["changes"]]
+    resume_at = expected[1]
+
+    async def read_events():
+        events = []
+        stream = iter_change_events(resume_at, ChangeNotifier(), poll_interval=0.05)
+        try:
+            async for message in stream:
+                fields = dict(line.split(": ", 1) for line in message.splitlines() if ": " in line and not line.startswith(":"))
+                events.append((fields.get("event"), int(fields["id"]) if "id" in fields else None, fields.get("data")))
+                if len(events) == len(expected) - 1:
+                    break
+        finally:
+            await stream.aclose()
+        return events
+
+    events = asyncio.run(asyncio.wait_for(read_events(), timeout=10))
+    assert events[0][:2] == ("ready", resume_at)
+    assert [offset for _, offset, _ in events[1:]] == expected[2:]
+    assert [event for event, _, _ in events[1:]] == ops[2:]
+    assert json.loads(events[-1][2])["sku"] is None
+
+
+def test_offset_past_the_log_is_reset(client, writes):
+    latest = latest_offset()
+    page = client.get("/api/skus/changes", params={"since": latest + 1000}).json()
+    assert page["reset"] is True
+    assert page["next_offset"] <= latest
+
+    # Following from there catches up to the end of the log
+    since = page["next_offset"]
+    while True:
+        page = client.get("/api/skus/changes", params={"since": since}).json()
+        assert page["reset"] is False
+        if not page["changes"]:
+            break
+        since = page["next_offset"]
+    assert since == latest
+
+
+def test_log_is_pruned_periodically(monkeypatch):
+    import change_feed
+
+    calls = []
+    monkeypatch.setattr(change_feed, "prune_change_log", calls.append)
+
+    async def run():
+        task = asyncio.create_task(change_feed.prune_periodically(engine, interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(calls) >= 2 and set(calls) == {engine}
@@ -0,0 +1,62 @@
+"""
+Conditional GETs: a 304 only while the client's copy is current, even
+when writes land within the same second.
+
+Usage (from backend/):
+    python -m pytest tests/test_conditional.py
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+SKU = {
+    "ndc": "91000-001-01", "name": "Foo", "manufacturer": "Acme",
+    "dosage_form": "tablet", "strength": "10mg", "package_size": "30", "status": "DRAFT",
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def sku_id(client):
+    response = client.post("/api/skus", json=SKU)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_unchanged_sku_is_not_modified(client, sku_id):
+    etag = client.get(f"/api/skus/{sku_id}").headers["ETag"]
+    response = client.get(f"/api/skus/{sku_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    # Sparse responses share the full SKU's tag
+    response = client.get(f"/api/skus/{sku_id}", params={"fields": "name"}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_updates_in_the_same_second_change_the_etag(client, sku_id):
+    client.put(f"/api/skus/{sku_id}", json={**SKU, "name": "Bar"})
+    seen = client.get(f"/api/skus/{sku_id}")
+    client.put(f"/api/skus/{sku_id}", json={**SKU, "name": "Baz"})
+
+    response = client.get(f"/api/skus/{sku_id}", headers={"If-None-Match": seen.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Baz"
+    assert response.headers["ETag"] != seen.headers["ETag"]
+
+    current = response.headers["ETag"]
+    assert client.get(f"/api/skus/{sku_id}", headers={"If-None-Match": current}).status_code == 304
+
+
+def test_search_etag_changes_on_write(client, sku_id):
+    etag = client.get("/api/skus", params={"name": "Ba"}).headers["ETag"]
+    assert client.get("/api/skus", params={"name": "Ba"}, headers={"If-None-Match": etag}).status_code == 304
+
+    client.patch(f"/api/skus/{sku_id}", json={"strength": "20mg"})
+    response = client.get("/api/skus", params={"name": "Ba"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["strength"] == "20mg"
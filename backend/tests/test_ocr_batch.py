@@ -0,0 +1,61 @@
+"""
+Batch OCR streaming: an image that cannot be read (too large, or a
+corrupt archive member) gets its own error line and the batch carries on
+to the summary. OCR itself is stubbed out, so Tesseract is not needed.
+
+Usage (from backend/):
+    python -m pytest tests/test_ocr_batch.py
+"""
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def corrupt_zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("good.png", b"fine" * 10)
+        archive.writestr("bad.png", b"label" * 100)
+    data = bytearray(buffer.getvalue())
+    # Flip bytes inside bad.png's compressed data; its header and the
+    # central directory stay valid, so the archive still opens
+    start = data.index(b"bad.png") + len("bad.png")
+    for i in range(start + 2, start + 8):
+        data[i] ^= 0xFF
+    return bytes(data)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import main
+
+    async def fake_ocr(contents, enforce_limit=True):
+        return {"text": contents.decode(errors="replace")[:10], "timings": {}}
+
+    monkeypatch.setattr(main.ocr_pool, "submit", fake_ocr)
+    monkeypatch.setattr(main, "observe_ocr", lambda result: None)
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 100)
+    return TestClient(main.app)
+
+
+def test_unreadable_images_are_reported_per_item(client):
+    files = [
+        ("files", ("small.png", b"x" * 50, "image/png")),
+        ("files", ("huge.png", b"x" * 500, "image/png")),
+        ("files", ("labels.zip", corrupt_zip(), "application/zip")),
+    ]
+    response = client.post("/api/extract-ocr/batch", files=files)
+    assert response.status_code == 200, response.text
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    summary = lines.pop()["summary"]
+    assert (summary["images"], summary["succeeded"], summary["failed"]) == (4, 2, 2)
+    by_name = {line["filename"]: line for line in lines}
+    assert by_name["small.png"]["success"] and by_name["good.png"]["success"]
+    assert not by_name["huge.png"]["success"]
+    assert "limit is 100" in by_name["huge.png"]["error"]
+    assert not by_name["bad.png"]["success"]
+    assert by_name["bad.png"]["error"].startswith("Could not read image")
@@ -0,0 +1,62 @@
+"""
+Keyset cursors: pages follow each other, and a tampered or malformed
+cursor is a 400, never a 500.
+
+Usage (from backend/):
+    python -m pytest tests/test_pagination.py
+"""
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def sku(ndc, name):
+    return {
+        "ndc": ndc, "name": name, "manufacturer": "Acme",
+        "dosage_form": "tablet", "strength": "10mg", "package_size": "30", "status": "DRAFT",
+    }
+
+
+def cursor(payload) -> str:
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    client = TestClient(app)
+    for i in range(3):
+        client.post("/api/skus", json=sku(f"97000-001-0{i}", f"Paging Drug {i}"))
+    return client
+
+
+def search(client, **params):
+    return client.get("/api/skus", params={"name": "Paging Drug", "sort": "name", "pageSize": 2, **params})
+
+
+def test_next_cursor_continues_the_listing(client):
+    first = search(client).json()
+    second = search(client, cursor=first["next_cursor"]).json()
+    names = [item["name"] for item in first["items"] + second["items"]]
+    assert names == ["Paging Drug 0", "Paging Drug 1", "Paging Drug 2"]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("tampered", [
+    "not base64!",
+    cursor(["name", 1]),
+    cursor({"s": "name"}),
+    cursor({"s": "name", "k": 1}),
+    cursor({"s": "name", "k": None}),
+    cursor({"s": "name", "k": "Paging Drug 0"}),
+    cursor({"s": "name", "k": [{"a": 1}, 1]}),
+    cursor({"s": "name", "k": [True, 1]}),
+    cursor({"s": "name", "k": ["Paging Drug 0"]}),
+    cursor({"s": "id", "k": [1]}),
+])
+def test_tampered_cursor_is_a_bad_request(client, tampered):
+    assert search(client, cursor=tampered).status_code == 400
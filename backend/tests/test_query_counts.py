@@ -0,0 +1,137 @@
+"""
+Statement budgets for the API's routes.
+
+Each test runs one request inside the ``query_audit`` fixture, which
+fails if the request runs more statements than its budget or repeats a
+statement shape past the N+1 threshold (see query_audit.py). A failure
+means a change added round trips to a route; raise a budget only on
+purpose.
+
+Usage (from backend/):
+    python -m pytest tests/test_query_counts.py
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from query_audit import QueryBudgetExceeded
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    # Not entered as a context manager: startup would start the suggest
+    # index follower, whose polling would land in every audit
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def skus(client):
+    ids = []
+    for i in range(12):
+        response = client.post("/api/skus", json={
+            "ndc": f"90000-{i:03d}-01",
+            "name": f"Audit Drug {i % 4}",
+            "manufacturer": "Acme",
+            "dosage_form": "tablet",
+            "strength": "10mg",
+            "package_size": "100",
+            "status": "DRAFT",
+        })
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+def test_create(client, query_audit):
+    # NDC check, INSERT, catalog version, change log, refresh
+    with query_audit(max_queries=5):
+        response = client.post("/api/skus", json={
+            "ndc": "90000-999-01", "name": "Audit Create", "manufacturer": "Acme",
+            "dosage_form": "tablet", "strength": "5mg", "package_size": "30", "status": "DRAFT",
+        })
+    assert response.status_code == 200, response.text
+
+
+def test_get(client, skus, query_audit):
+    with query_audit(max_queries=1):
+        assert client.get(f"/api/skus/{skus[0]}").status_code == 200
+
+
+def test_search_offset_page(client, skus, query_audit):
+    # Catalog version (ETag), count, page
+    with query_audit(max_queries=3):
+        response = client.get("/api/skus", params={"name": "Audit Drug", "pageSize": 5})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 5
+
+
+def test_search_keyset_page(client, skus, query_audit):
+    with query_audit(max_queries=2):
+        response = client.get("/api/skus", params={"name": "Audit Drug", "cursor": "", "sort": "name", "include_total": False})
+    assert response.status_code == 200
+
+
+def test_update(client, skus, query_audit):
+    with query_audit(max_queries=5):
+        assert client.patch(f"/api/skus/{skus[1]}", json={"strength": "20mg"}).status_code == 200
+
+
+def test_delete(client, skus, query_audit):
+    with query_audit(max_queries=4):
+        assert client.delete(f"/api/skus/{skus[-1]}").status_code == 200
+
+
+def test_duplicates_is_one_statement(client, skus, query_audit):
+    # However many groups there are
+    with query_audit(max_queries=1):
+        response = client.get("/api/skus/duplicates")
+    assert response.status_code == 200
+    assert len(response.json()) >= 4
+
+
+def test_bulk_status(client, skus, query_audit):
+    with query_audit(max_queries=4):
+        response = client.patch("/api/skus", json={"status": "PENDING_REVIEW", "ids": skus[:8]})
+    assert response.status_code == 200
+    assert response.json()["updated"] == 8
+
+
+def test_export(client, skus, query_audit):
+    # Watermark, then one streamed SELECT
+    with query_audit(max_queries=2):
+        response = client.get("/api/skus/export")
+    assert response.status_code == 200
+
+
+def test_change_feed(client, skus, query_audit):
+    with query_audit(max_queries=2):
+        assert client.get("/api/skus/changes").status_code == 200
+
+
+def test_detects_per_row_lookups(skus, query_audit):
+    # The add_sample_data.py pattern: one lookup per row instead of one IN query
+    from models import DrugSKU, engine
+
+    with pytest.raises(QueryBudgetExceeded, match="likely an N\\+1"):
+        with query_audit():
+            with engine.connect() as conn:
+                for i in range(12):
+                    conn.execute(select(DrugSKU.id).where(DrugSKU.ndc == f"90000-{i:03d}-01"))
+
+
+def test_in_list_is_one_shape(skus, query_audit):
+    from models import DrugSKU, engine
+
+    with query_audit(max_queries=12, repeat_threshold=20) as audit:
+        with engine.connect() as conn:
+            for size in range(1, 13):
+                conn.execute(select(DrugSKU.id).where(DrugSKU.id.in_(skus[:size])))
+    assert len(audit.shapes) == 1
+
+
+def test_budget_overrun_fails(client, skus, query_audit):
+    with pytest.raises(QueryBudgetExceeded, match="at most 1 statements"):
+        with query_audit(max_queries=1):
+            client.get("/api/skus")
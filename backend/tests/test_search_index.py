@@ -0,0 +1,70 @@
+"""
+Substring search on SQLite goes through the FTS5 trigram table, and the
+triggers keep that table in step with drug_skus.
+
+Usage (from backend/):
+    python -m pytest tests/test_search_index.py
+"""
+import pytest
+from sqlalchemy import delete, func, insert, select, update
+
+from models import DrugSKU
+from search_index import BACKEND_FTS5, active_backend, substring_filter
+
+
+def sku(ndc, name, manufacturer="Acme"):
+    return {
+        "ndc": ndc, "name": name, "manufacturer": manufacturer,
+        "dosage_form": "tablet", "strength": "10mg", "package_size": "30", "status": "DRAFT",
+    }
+
+
+@pytest.fixture
+def engine(scratch_engine):
+    with scratch_engine.begin() as conn:
+        conn.execute(insert(DrugSKU), [
+            sku("11111-111-11", "Lisinopril 10mg"),
+            sku("22222-222-22", "Atorvastatin 20mg"),
+            sku("33333-333-33", "Simvastatin 40mg", "Statco"),
+        ])
+    return scratch_engine
+
+
+def search(engine, column, term, case_sensitive=True):
+    with engine.connect() as conn:
+        return sorted(conn.scalars(
+            select(DrugSKU.ndc).where(substring_filter(column, term, case_sensitive)).order_by(DrugSKU.ndc)
+        ))
+
+
+def test_uses_fts5(engine):
+    assert active_backend() == BACKEND_FTS5
+    sql = str(substring_filter(DrugSKU.name, "statin").compile(engine))
+    assert "drug_skus_fts.name MATCH" in sql
+    assert search(engine, DrugSKU.name, "vastatin") == ["22222-222-22", "33333-333-33"]
+    assert search(engine, DrugSKU.manufacturer, "Statco") == ["33333-333-33"]
+    assert search(engine, DrugSKU.ndc, "222-2") == ["22222-222-22"]
+
+
+def test_short_terms_fall_back_to_like(engine):
+    # The trigram tokenizer cannot match fewer than three characters
+    sql = str(substring_filter(DrugSKU.name, "mg").compile(engine))
+    assert "MATCH" not in sql and "LIKE" in sql
+    assert len(search(engine, DrugSKU.name, "mg")) == 3
+
+
+def test_triggers_follow_updates_and_deletes(engine):
+    with engine.begin() as conn:
+        conn.execute(update(DrugSKU).where(DrugSKU.ndc == "11111-111-11").values(name="Losartan 50mg"))
+        conn.execute(delete(DrugSKU).where(DrugSKU.ndc == "33333-333-33"))
+
+    assert search(engine, DrugSKU.name, "Lisinopril") == []
+    assert search(engine, DrugSKU.name, "Losartan") == ["11111-111-11"]
+    assert search(engine, DrugSKU.name, "statin") == ["22222-222-22"]
+    assert search(engine, DrugSKU.manufacturer, "Statco") == []
+
+    # An update that leaves the indexed columns alone does not touch the index
+    with engine.begin() as conn:
+        conn.execute(update(DrugSKU).where(DrugSKU.ndc == "22222-222-22").values(strength="80mg"))
+        indexed = conn.scalar(select(func.count()).select_from(DrugSKU).where(substring_filter(DrugSKU.name, "statin")))
+    assert indexed == 1
@@ -0,0 +1,76 @@
+"""
+Synthetic catalog generator: identifiers are valid, and the duplicates it
+plants are exactly the ones duplicate detection finds.
+
+Usage (from backend/):
+    python -m pytest tests/test_seed_catalog.py
+"""
+import re
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, select
+
+from seed_catalog import generate_catalog, gtin_check_digit, load_catalog, parse_status_mix
+
+NDC_FORMAT = re.compile(r"^(\d{4}-\d{4}-\d{2}|\d{5}-\d{3}-\d{2}|\d{5}-\d{4}-\d)$")
+
+
+def test_gtin_check_digit():
+    # UPC-A 036000291452, as a GTIN-14 body
+    assert gtin_check_digit("0003600029145") == "2"
+
+
+def test_identifiers_are_valid_and_unique():
+    rows = list(generate_catalog(5000))
+    ndcs = [row["ndc"] for row in rows]
+    assert len(set(ndcs)) == len(ndcs)
+    assert all(NDC_FORMAT.match(ndc) for ndc in ndcs)
+    for row in rows:
+        gtin = row["gtin"]
+        assert len(gtin) == 14 and gtin[3:].startswith(row["ndc"].replace("-", ""))
+        assert gtin_check_digit(gtin[:-1]) == gtin[-1]
+
+
+def test_deterministic_with_status_mix_and_skew():
+    rows = list(generate_catalog(5000, seed=7, status_mix=parse_status_mix("APPROVED=3,DRAFT=1")))
+    assert rows == list(generate_catalog(5000, seed=7, status_mix=parse_status_mix("APPROVED=3,DRAFT=1")))
+
+    statuses = Counter(row["status"] for row in rows)
+    assert set(statuses) == {"APPROVED", "DRAFT"}
+    assert 0.7 < statuses["APPROVED"] / len(rows) < 0.8
+    # Zipf: the most common manufacturer far outnumbers the median one
+    counts = sorted(Counter(row["manufacturer"] for row in rows).values(), reverse=True)
+    assert counts[0] > 20 * counts[len(counts) // 2]
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        next(generate_catalog(10, duplicate_rate=1))
+    with pytest.raises(ValueError, match="STATUS=WEIGHT"):
+        parse_status_mix("LIVE=1")
+
+
+def test_load_matches_duplicate_detection(scratch_engine):
+    from duplicates import MATCH_EXACT, MATCH_FUZZY, duplicate_key
+    from models import DrugSKU
+    from search_index import substring_filter
+
+    report = load_catalog(scratch_engine, generate_catalog(2000, duplicate_rate=0.1), chunk_size=500)
+    assert report["inserted"] == 2000
+
+    def duplicate_rows(match):
+        key = duplicate_key(match)
+        groups = (
+            select(func.count().label("size")).select_from(DrugSKU)
+            .group_by(key).having(func.count() > 1).subquery()
+        )
+        return conn.scalar(select(func.coalesce(func.sum(groups.c.size - 1), 0)))
+
+    with scratch_engine.connect() as conn:
+        assert duplicate_rows(MATCH_FUZZY) == 200
+        assert 0 < duplicate_rows(MATCH_EXACT) < 200
+        # The substring index was rebuilt after the load
+        indexed = conn.scalar(select(func.count()).where(substring_filter(DrugSKU.name, "statin")))
+        scanned = conn.scalar(select(func.count()).where(DrugSKU.name.contains("statin")))
+        assert indexed == scanned > 0
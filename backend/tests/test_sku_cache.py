@@ -0,0 +1,53 @@
+"""
+SKU cache: a write through the API invalidates the cached read, and the
+per-process memory backend is refused when there are several workers.
+
+Usage (from backend/):
+    python -m pytest tests/test_sku_cache.py
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from sku_cache import MemoryBackend, SKUCache, create_cache
+
+SKU = {
+    "ndc": "93000-001-01", "name": "Omeprazole 20mg", "manufacturer": "Acme",
+    "dosage_form": "capsule", "strength": "20mg", "package_size": "30", "status": "DRAFT",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import main
+
+    # conftest turns caching off for the rest of the suite
+    monkeypatch.setattr(main, "sku_cache", SKUCache(MemoryBackend()))
+    return TestClient(main.app)
+
+
+def test_write_invalidates_cached_read(client):
+    import main
+
+    sku_id = client.post("/api/skus", json=SKU).json()["id"]
+    first = client.get(f"/api/skus/{sku_id}")
+    assert client.get(f"/api/skus/{sku_id}").json() == first.json()
+    assert main.sku_cache.hits["sku"] == 1
+
+    client.put(f"/api/skus/{sku_id}", json={**SKU, "strength": "40mg"})
+    response = client.get(f"/api/skus/{sku_id}")
+    assert response.json()["strength"] == "40mg"
+    assert response.headers["ETag"] != first.headers["ETag"]
+    stale = client.get(f"/api/skus/{sku_id}", headers={"If-None-Match": first.headers["ETag"]})
+    assert stale.status_code == 200
+
+    client.patch("/api/skus", json={"status": "APPROVED", "ids": [sku_id]})
+    assert client.get(f"/api/skus/{sku_id}").json()["status"] == "APPROVED"
+
+
+def test_memory_backend_needs_a_single_worker():
+    assert create_cache("memory", workers=1).backend.name == "memory"
+    assert not create_cache("none", workers=4).enabled
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY=4"):
+        create_cache("memory", workers=4)
+    with pytest.raises(ValueError, match="Unknown"):
+        create_cache("memcached")
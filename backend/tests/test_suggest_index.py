@@ -0,0 +1,89 @@
+"""
+Suggest index incremental updates: after following the change log, the
+index matches a fresh build, whether the changes were applied in place
+or merged with one sort.
+
+Usage (from backend/):
+    python -m pytest tests/test_suggest_index.py
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+import suggest_index
+from change_feed import ChangeNotifier
+from models import SKUChange, engine
+from suggest_index import SuggestIndex
+
+
+def sku(ndc, name, manufacturer="Acme"):
+    return {
+        "ndc": ndc, "name": name, "manufacturer": manufacturer,
+        "dosage_form": "tablet", "strength": "10mg", "package_size": "30", "status": "DRAFT",
+    }
+
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+
+    return TestClient(app)
+
+
+def follow_to_end(index):
+    """Run the follower until it has applied every logged change"""
+    with engine.connect() as conn:
+        latest = conn.scalar(select(func.max(SKUChange.id)))
+
+    async def run():
+        task = asyncio.create_task(index.follow(ChangeNotifier(), poll_interval=0.05))
+        try:
+            while index.offset < latest:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def assert_matches_fresh_build(index):
+    fresh = SuggestIndex()
+    fresh.build(engine)
+    assert index.docs == fresh.docs
+    assert list(index.entries) == list(fresh.entries)
+
+
+def names(index, prefix):
+    return [result["name"] for result in index.suggest(prefix, limit=50)]
+
+
+@pytest.mark.parametrize("merge", [False, True], ids=["in_place", "merge"])
+def test_follower_matches_a_fresh_build(client, monkeypatch, merge):
+    if merge:
+        monkeypatch.setattr(suggest_index, "SUGGEST_MERGE_THRESHOLD", 0)
+    tag = "M" if merge else "P"
+    index = SuggestIndex()
+    index.build(engine)
+
+    renamed = client.post("/api/skus", json=sku(f"95{tag}-001", f"Zolpidem{tag} 5mg")).json()["id"]
+    deleted = client.post("/api/skus", json=sku(f"95{tag}-002", f"Zafirlukast{tag} 20mg")).json()["id"]
+    kept = client.post("/api/skus", json=sku(f"95{tag}-003", f"Zonisamide{tag} 25mg", "Zenith")).json()["id"]
+    follow_to_end(index)
+    assert names(index, f"zolpidem{tag}") == [f"Zolpidem{tag} 5mg"]
+
+    client.put(f"/api/skus/{renamed}", json=sku(f"95{tag}-001", f"Zaleplon{tag} 10mg"))
+    client.delete(f"/api/skus/{deleted}")
+    client.patch("/api/skus", json={"status": "APPROVED", "ids": [kept]})
+    follow_to_end(index)
+
+    assert names(index, f"zolpidem{tag}") == []
+    assert names(index, f"zaleplon{tag}") == [f"Zaleplon{tag} 10mg"]
+    # Word suffixes move with the rename
+    assert f"Zaleplon{tag} 10mg" in names(index, "10mg")
+    assert names(index, f"zafirlukast{tag}") == []
+    assert index.suggest(f"95{tag}-002") == []
+    assert index.suggest(f"zonisamide{tag}", status="APPROVED")[0]["id"] == kept
+    assert index.suggest(f"zonisamide{tag}", status="DRAFT") == []
+    assert_matches_fresh_build(index)
@@ -0,0 +1,98 @@
+"""Content-addressed storage for uploaded SKU images.
+
+Uploads are copied to disk in fixed-size chunks and hashed on the way, so
+neither large images nor bursts of concurrent uploads are held in memory.
+Files are named by their SHA-256, which makes re-uploads of the same image
+free. Thumbnails for list views are generated after the response is sent.
+"""
+from typing import Tuple
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
+import hashlib
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+THUMBNAIL_DIR = os.path.join(UPLOAD_DIR, "thumbs")
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+THUMBNAIL_SIZE = (256, 256)
+
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    # Keep ordinary extensions only; the name on disk is the hash anyway
+    if 1 < len(ext) <= 6 and ext[1:].isalnum():
+        return ext
+    return ""
+
+
+def thumbnail_name(filename: str) -> str:
+    return os.path.splitext(filename)[0] + ".jpg"
+
+
+async def save_upload(file: UploadFile) -> Tuple[str, str, int, bool]:
+    """Stream an upload to UPLOAD_DIR under its content hash.
+
+    Returns (filename, sha256, size, duplicate). Raises 413 once the upload
+    passes UPLOAD_MAX_BYTES, without reading the rest of it.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds the {UPLOAD_MAX_BYTES} byte limit",
+                    )
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+
+        sha256 = digest.hexdigest()
+        filename = sha256 + _extension(file.filename)
+        final_path = os.path.join(UPLOAD_DIR, filename)
+        duplicate = os.path.exists(final_path)
+        if duplicate:
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, final_path)
+        return filename, sha256, size, duplicate
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def make_thumbnail(filename: str):
+    """Write a small JPEG preview of an uploaded image. Runs as a background task."""
+    source = os.path.join(UPLOAD_DIR, filename)
+    target = os.path.join(THUMBNAIL_DIR, thumbnail_name(filename))
+    if os.path.exists(target):
+        return
+    try:
+        os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+        with Image.open(source) as image:
+            # Let the JPEG decoder do most of the downscaling
+            image.draft("RGB", THUMBNAIL_SIZE)
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(THUMBNAIL_SIZE)
+            # Write under a temporary name so readers never see half a file
+            partial = target + ".part"
+            image.convert("RGB").save(partial, "JPEG", quality=80, optimize=True)
+            os.replace(partial, target)
+    except Exception as e:
+        # Not every upload is an image the UI can preview
+        logger.warning("Thumbnail generation failed for %s: %s", filename, e)